@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+API asyncio cho convert_excel / preview_conversion.
+
+- Việc convert chạy trong executor tùy chọn: None = thread pool mặc định của
+  event loop, ThreadPoolExecutor riêng, hoặc ProcessPoolExecutor để chạy song
+  song thật (tiến trình + lệnh hủy đi qua multiprocessing.Manager)
+- Tiến trình theo hàng (ProgressEvent: số hàng, ETA) nhận qua async iterator
+  ConversionProgress
+- Hủy bằng cơ chế có sẵn của asyncio (task.cancel(), asyncio.wait_for timeout...):
+  worker dừng ở điểm kiểm tra kế tiếp (cancel_event của convert_excel, kiểm tra
+  giữa các khối hàng), xóa file output dở dang; hàm chờ worker dừng hẳn rồi mới
+  ném lại CancelledError
+
+Ví dụ:
+    progress = ConversionProgress()
+    task = asyncio.create_task(convert_excel_async("in.xlsx", "out.xlsx", progress=progress))
+    async for event in progress:
+        print(f"{event.sheet}: {event.rows_done}/{event.total_rows} hàng, còn ~{event.eta}s")
+    stats = await task
+"""
+from __future__ import annotations
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import List
+
+from convert_excel_tcvn3 import (
+    ConversionLog,
+    ConversionStats,
+    ProgressEvent,
+    convert_excel,
+    preview_conversion,
+)
+
+# multiprocessing.Manager dùng chung (tạo lười) cho executor dạng process
+_MANAGER = None
+_MANAGER_LOCK = threading.Lock()
+
+
+class ConversionProgress:
+    """
+    Async iterator các ProgressEvent của một lần convert; kết thúc khi convert
+    xong, lỗi hoặc bị hủy. Mỗi object chỉ dùng cho 1 lần convert.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._closed = False
+        self.last: ProgressEvent | None = None
+
+    def _put(self, event: ProgressEvent) -> None:
+        if not self._closed:
+            self.last = event
+            self._queue.put_nowait(event)
+
+    def _close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._queue.put_nowait(None)
+
+    def __aiter__(self) -> "ConversionProgress":
+        return self
+
+    async def __anext__(self) -> ProgressEvent:
+        event = await self._queue.get()
+        if event is None:
+            self._queue.put_nowait(None)  # Các lần lặp sau cũng dừng ngay
+            raise StopAsyncIteration
+        return event
+
+
+def _manager():
+    global _MANAGER
+    with _MANAGER_LOCK:
+        if _MANAGER is None:
+            import multiprocessing
+            _MANAGER = multiprocessing.Manager()
+        return _MANAGER
+
+
+async def _run_in_executor(fn, args: tuple, kwargs: dict, executor: Executor | None,
+                           progress: ConversionProgress | None):
+    """
+    Chạy fn(*args, on_progress=sink, cancel_event=cancel, **kwargs) trong executor.
+    Với ProcessPoolExecutor, sink/cancel là proxy của multiprocessing.Manager (pickle được).
+    """
+    if "on_progress" in kwargs or "cancel_event" in kwargs:
+        raise TypeError("Dùng progress=ConversionProgress() và task.cancel() thay cho on_progress/cancel_event")
+    loop = asyncio.get_running_loop()
+    forwarded = None
+    if isinstance(executor, ProcessPoolExecutor):
+        manager = _manager()
+        cancel = manager.Event()
+        queue = manager.Queue() if progress is not None else None
+        sink = queue.put if queue is not None else None
+        if queue is not None:
+            # Thread chuyển tiến trình từ queue của Manager về event loop
+            forwarded = asyncio.Event()
+
+            def forward() -> None:
+                while True:
+                    event = queue.get()
+                    if event is None:
+                        break
+                    loop.call_soon_threadsafe(progress._put, event)
+                loop.call_soon_threadsafe(forwarded.set)
+
+            threading.Thread(target=forward, name="tcvn3-progress", daemon=True).start()
+    else:
+        cancel = threading.Event()
+        sink = functools.partial(loop.call_soon_threadsafe, progress._put) if progress is not None else None
+
+    future = loop.run_in_executor(
+        executor, functools.partial(fn, *args, on_progress=sink, cancel_event=cancel, **kwargs)
+    )
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # Báo worker dừng ở điểm kiểm tra kế tiếp và chờ nó dừng hẳn
+        cancel.set()
+        await asyncio.wait([future])
+        if not future.cancelled():
+            future.exception()  # ConversionCancelled của worker: đã xử lý, không log lại
+        raise
+    finally:
+        if forwarded is not None:
+            queue.put(None)
+            await forwarded.wait()
+        if progress is not None:
+            progress._close()
+
+
+async def convert_excel_async(
+    input_path: str | Path,
+    output_path: str | Path,
+    executor: Executor | None = None,
+    progress: ConversionProgress | None = None,
+    **kwargs,
+) -> ConversionStats:
+    """
+    Bản asyncio của convert_excel.
+
+    Args:
+        input_path: Đường dẫn file Excel input
+        output_path: Đường dẫn file Excel output
+        executor: Executor chạy convert (None = thread pool mặc định của event loop);
+            ProcessPoolExecutor để nhiều file chạy song song thật
+        progress: ConversionProgress nhận sự kiện tiến trình (async for)
+        **kwargs: Tùy chọn của convert_excel (trừ on_progress, cancel_event); tần suất
+            sự kiện chỉnh bằng progress_every_rows/progress_interval_ms
+
+    Returns:
+        ConversionStats
+
+    Raises:
+        asyncio.CancelledError: Task bị hủy (worker đã dừng khi hàm ném lỗi)
+    """
+    return await _run_in_executor(convert_excel, (input_path, output_path), kwargs, executor, progress)
+
+
+async def preview_conversion_async(
+    input_path: str | Path,
+    executor: Executor | None = None,
+    progress: ConversionProgress | None = None,
+    **kwargs,
+) -> List[ConversionLog]:
+    """
+    Bản asyncio của preview_conversion (tham số như convert_excel_async;
+    tiến trình báo theo từng sheet).
+
+    Returns:
+        List[ConversionLog]
+    """
+    return await _run_in_executor(preview_conversion, (input_path,), kwargs, executor, progress)
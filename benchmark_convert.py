@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: engine vectorized (_convert_sheet_values) so với vòng lặp df.iloc cũ.
+
+Sinh một sheet giả lập (chuỗi lặp lại nhiều như file thật: tên tỉnh, đơn vị,
+trạng thái...), kiểm tra 2 cách cho cùng ConversionStats rồi đo thời gian.
+Sau đó so convert_strings (cả lô 1 lần) với gọi tcvn3_to_unicode từng chuỗi.
+
+Usage:
+  python benchmark_convert.py
+  python benchmark_convert.py --rows 200000 --cols 12 --strings 1000000
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from convert_excel_tcvn3 import (
+    ConversionLog,
+    ConversionStats,
+    _ConversionRules,
+    _convert_sheet_values,
+    convert_strings,
+    load_tcvn3_map,
+    looks_like_unicode_vietnamese,
+    tcvn3_to_unicode,
+)
+
+SAMPLE_VALUES = [
+    "Hµ Néi", "Thµnh phè Hå ChÝ Minh", "§· duyÖt", "Chê phª duyÖt", "C¸i", "Phßng kÕ to¸n",
+    "Hà Nội", "Đà Nẵng", "Hoàn thành", "Hello World", "2024-11-09", "   ",
+    123, 45.6, None, np.nan, True,
+]
+
+
+def legacy_convert_sheet(df: pd.DataFrame, sheet: str, stats: ConversionStats) -> pd.DataFrame:
+    """Vòng lặp df.iloc từng cell (engine trước đây), giữ lại để so sánh"""
+    for row_idx in range(len(df)):
+        for col_idx in range(len(df.columns)):
+            cell_value = df.iloc[row_idx, col_idx]
+            stats.total_cells += 1
+            if isinstance(cell_value, str) and cell_value.strip():
+                stats.string_cells += 1
+                original = cell_value
+                is_unicode = looks_like_unicode_vietnamese(original)
+                if is_unicode:
+                    stats.already_unicode += 1
+                    continue
+                converted = tcvn3_to_unicode(original)
+                if converted != original:
+                    stats.converted_cells += 1
+                    df.iloc[row_idx, col_idx] = converted
+                    stats.logs.append(ConversionLog(
+                        sheet=sheet, row=row_idx + 1, col=col_idx, col_name=f"Col_{col_idx}",
+                        original=original, converted=converted, was_unicode=is_unicode,
+                    ))
+                else:
+                    stats.unchanged_cells += 1
+    return df
+
+
+def make_sheet(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+    data = [[rng.choice(SAMPLE_VALUES) for _ in range(cols)] for _ in range(rows)]
+    return pd.DataFrame(data, dtype=object)
+
+
+def bench_strings(n: int, seed: int = 0) -> None:
+    """convert_strings so với vòng lặp gọi classifier + tcvn3_to_unicode cho từng chuỗi"""
+    rng = random.Random(seed)
+    texts = [v for v in SAMPLE_VALUES if isinstance(v, str)]
+    # Giá trị field từ database: phần lớn lặp lại, ~5% kèm mã số (gần như không lặp)
+    values = [f"{rng.choice(texts)} {rng.randrange(n // 10 or 1)}" if rng.random() < 0.05
+              else rng.choice(texts) for _ in range(n)]
+    print(f"🔤 Lô {n:,} chuỗi ({len(set(values)):,} chuỗi khác nhau)")
+    
+    t0 = time.perf_counter()
+    expected = []
+    for v in values:
+        expected.append(v if looks_like_unicode_vietnamese(v) else tcvn3_to_unicode(v))
+    t_old = time.perf_counter() - t0
+    
+    t0 = time.perf_counter()
+    result = convert_strings(values)
+    t_new = time.perf_counter() - t0
+    
+    assert result.values == expected
+    print("✅ Kết quả giống hệt nhau")
+    print(f"  - Từng chuỗi:       {t_old:8.3f}s")
+    print(f"  - convert_strings:  {t_new:8.3f}s")
+    print(f"  ⚡ Nhanh hơn {t_old / t_new:,.1f} lần")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark engine convert")
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--cols", type=int, default=10)
+    ap.add_argument("--strings", type=int, default=500000, help="Số chuỗi cho convert_strings (0 = bỏ qua)")
+    args = ap.parse_args()
+
+    load_tcvn3_map()
+    df = make_sheet(args.rows, args.cols)
+    print(f"📊 Sheet giả lập: {args.rows:,} hàng x {args.cols} cột = {df.size:,} cells")
+
+    rules = _ConversionRules.from_options(
+        looks_like_unicode_vietnamese, tcvn3_to_unicode,
+        skip_unicode=True, to_tcvn3=False, skip_selection=None,
+    )
+
+    t0 = time.perf_counter()
+    new_stats = ConversionStats()
+    new_values = _convert_sheet_values(df.to_numpy(dtype=object), "Sheet1", rules, new_stats)
+    t_new = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    old_stats = ConversionStats()
+    old_df = legacy_convert_sheet(df.copy(), "Sheet1", old_stats)
+    t_old = time.perf_counter() - t0
+
+    fields = ("total_cells", "string_cells", "already_unicode", "converted_cells", "unchanged_cells")
+    for name in fields:
+        assert getattr(new_stats, name) == getattr(old_stats, name), name
+    assert new_stats.logs == old_stats.logs
+    assert pd.DataFrame(new_values).equals(old_df.reset_index(drop=True))
+    print("✅ Kết quả và ConversionStats giống hệt nhau")
+
+    print(f"  - Vòng lặp df.iloc: {t_old:8.3f}s")
+    print(f"  - Vectorized:       {t_new:8.3f}s")
+    print(f"  ⚡ Nhanh hơn {t_old / t_new:,.1f} lần")
+    
+    if args.strings:
+        bench_strings(args.strings)
+
+
+if __name__ == "__main__":
+    main()
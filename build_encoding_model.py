@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Build model tần suất ký tự/bigram cho detect_source_encoding().
+
+Model gồm 3 nhãn: "unicode" (tiếng Việt Unicode), "tcvn3" (cùng văn bản đó
+mã hóa .VnTime qua unicode_to_tcvn3) và "ascii" (tiếng Anh/ký hiệu, kể cả © ® µ).
+Kết quả ghi ra encoding_model.json, load lười khi chạy.
+
+Usage:
+  python build_encoding_model.py --build
+  python build_encoding_model.py --test "Thµnh phè Hå ChÝ Minh"
+"""
+from __future__ import annotations
+import argparse
+import json
+import math
+from collections import Counter
+from pathlib import Path
+from typing import Dict
+
+from convert_excel_tcvn3 import (
+    ENCODING_MODEL_JSON,
+    _model_key,
+    detect_source_encoding,
+    load_tcvn3_map,
+    unicode_to_tcvn3,
+)
+
+# Hệ số nội suy bigram/unigram và smoothing cho ký tự chưa gặp
+LAMBDA = 0.8
+ALPHA = 0.5
+VOCAB = 65536
+
+VIET_CORPUS = """
+Cộng hòa xã hội chủ nghĩa Việt Nam. Độc lập - Tự do - Hạnh phúc.
+Thành phố Hồ Chí Minh, Hà Nội, Hải Phòng, Đà Nẵng, Cần Thơ, Huế, Nha Trang, Vũng Tàu.
+Tỉnh Quảng Ninh, Bắc Ninh, Nghệ An, Thanh Hóa, Đồng Nai, Bình Dương, Khánh Hòa, Lâm Đồng.
+Quận Ba Đình, phường Điện Biên, huyện Thường Tín, xã Nhị Khê, thị trấn Đông Anh.
+Công ty trách nhiệm hữu hạn thương mại và dịch vụ xuất nhập khẩu.
+Báo cáo tài chính quý một năm hai nghìn không trăm hai mươi tư.
+Bảng lương nhân viên tháng mười hai, phụ cấp ăn trưa, bảo hiểm xã hội, thuế thu nhập cá nhân.
+Họ và tên: Nguyễn Văn An, Trần Thị Bích Ngọc, Lê Hoàng Long, Phạm Minh Tuấn, Vũ Thị Hương.
+Đỗ Quang Dũng, Hoàng Thị Thu Trang, Bùi Đức Thắng, Đặng Thùy Linh, Ngô Bảo Châu.
+Ngày sinh, nơi sinh, quê quán, dân tộc Kinh, tôn giáo không, số chứng minh nhân dân.
+Phòng kế toán, phòng nhân sự, phòng kinh doanh, ban giám đốc, tổ chức hành chính.
+Đơn vị tính: cái, chiếc, bộ, hộp, thùng, kilôgam, mét vuông, lít, tấn, đồng.
+Số lượng, đơn giá, thành tiền, tổng cộng, chiết khấu, thuế giá trị gia tăng.
+Ghi chú: hàng đã giao đủ, khách hàng thanh toán bằng chuyển khoản ngân hàng.
+Trạng thái: đang xử lý, đã duyệt, chờ phê duyệt, đã hủy, hoàn thành, tạm dừng.
+Trường trung học phổ thông, đại học quốc gia, học viện, giáo viên chủ nhiệm, học sinh giỏi.
+Bệnh viện đa khoa tỉnh, trạm y tế xã, bác sĩ điều trị, khám chữa bệnh, bảo hiểm y tế.
+Ủy ban nhân dân, hội đồng nhân dân, sở tài nguyên và môi trường, sở kế hoạch và đầu tư.
+Quyết định bổ nhiệm, biên bản họp, tờ trình, công văn, thông báo, kế hoạch năm.
+Người lao động được hưởng đầy đủ các chế độ theo quy định của pháp luật hiện hành.
+Mùa xuân năm ấy, cả làng rộn ràng chuẩn bị đón Tết, trẻ em được mặc quần áo mới.
+Dòng sông quê hương uốn lượn quanh những cánh đồng lúa chín vàng trải dài tít tắp.
+Chúng tôi xin chân thành cảm ơn quý khách đã tin tưởng và sử dụng sản phẩm của công ty.
+Hợp đồng có hiệu lực kể từ ngày ký, được lập thành hai bản có giá trị pháp lý như nhau.
+Địa chỉ: số nhà mười lăm, ngõ ba trăm, đường Giải Phóng, quận Hoàng Mai, Hà Nội.
+Điện thoại liên hệ, thư điện tử, mã số thuế, tài khoản ngân hàng, chi nhánh.
+Kết quả học tập: xuất sắc, giỏi, khá, trung bình, yếu. Hạnh kiểm: tốt, khá.
+Nguyên vật liệu, công cụ dụng cụ, tài sản cố định, khấu hao, chi phí quản lý doanh nghiệp.
+Ông bà, cha mẹ, anh chị em, con cháu, họ hàng, hàng xóm, bạn bè, đồng nghiệp.
+Những người đứng đầu các cơ quan, tổ chức chịu trách nhiệm thi hành quyết định này.
+Giấy chứng nhận quyền sử dụng đất, quyền sở hữu nhà ở và tài sản khác gắn liền với đất.
+Bản quyền © 2024 Công ty cổ phần ABC. Nhãn hiệu® đã đăng ký. Kích thước hạt 10 µm, nhiệt độ 25 °C.
+Giá: 1.500.000đ, 20% VAT, © Báo điện tử, sản phẩm của Tập đoàn XYZ® tại Việt Nam.
+Ước tính sản lượng lúa vụ đông xuân tăng so với cùng kỳ năm trước nhờ thời tiết thuận lợi.
+"""
+
+ASCII_CORPUS = """
+The quick brown fox jumps over the lazy dog. Hello World 123.
+Copyright © 2024 ACME Corporation. All rights reserved. Brand® and Product™ are trademarks.
+Total amount: $1,234.56 (including VAT 10%). Invoice No. INV-2024-0001, due date 2024-11-09.
+Email: support@example.com, phone +1 (555) 010-2030, website https://www.example.com/about
+Particle size 10 µm, temperature 25 °C, tolerance ± 0.5 mm, resistance 4.7 kΩ.
+Name, Address, City, Country, Postal Code, Department, Status: Approved, Pending, Rejected.
+Sales report for Q1, revenue growth year over year, operating expenses and net income.
+Project Manager, Software Engineer, Accountant, Human Resources, Customer Service.
+Please find attached the monthly report and let me know if you have any questions.
+Unit price, quantity, subtotal, discount, grand total, payment method: bank transfer.
+Order ID, SKU, description, weight (kg), dimensions (cm), shipping fee, notes.
+Microsoft Excel, Google Sheets, Windows 10, Office 365, Python 3.11, SQL Server 2019.
+Meeting notes: discuss budget, review timeline, assign tasks, follow up next week.
+Résumé, café, naïve, façade, coöperate, São Paulo, München, Zürich, Málaga.
+"""
+
+
+def _train(text: str) -> Dict:
+    """Đếm unigram/bigram và tính sẵn log-xác suất nội suy"""
+    keys = _model_key(text)
+    uni = Counter(keys)
+    bi = Counter(zip(keys, keys[1:]))
+    total = sum(uni.values())
+    p_uni = {ch: (c + ALPHA) / (total + ALPHA * VOCAB) for ch, c in uni.items()}
+    p_unk = ALPHA / (total + ALPHA * VOCAB)
+
+    bigram = {}
+    for (a, b), c in bi.items():
+        p = LAMBDA * c / uni[a] + (1 - LAMBDA) * p_uni[b]
+        bigram[a + b] = round(math.log(p), 4)
+    backoff = {ch: round(math.log((1 - LAMBDA) * p), 4) for ch, p in p_uni.items()}
+    return {
+        "bigram": bigram,
+        "backoff": backoff,
+        "unk": round(math.log((1 - LAMBDA) * p_unk), 4),
+    }
+
+
+def build_model(out_path: Path = ENCODING_MODEL_JSON) -> None:
+    load_tcvn3_map()
+    viet = VIET_CORPUS
+    model = {
+        "unicode": _train(viet),
+        "tcvn3": _train(unicode_to_tcvn3(viet)),
+        "ascii": _train(ASCII_CORPUS),
+    }
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump(model, f, ensure_ascii=False, indent=1)
+    print(f"✅ Đã ghi model: {out_path}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build model nhận diện bảng mã")
+    ap.add_argument("--build", action="store_true", help="Build encoding_model.json")
+    ap.add_argument("--test", type=str, help="Nhận diện một chuỗi")
+    args = ap.parse_args()
+
+    if args.build:
+        build_model()
+    if args.test:
+        label, confidence = detect_source_encoding(args.test)
+        print(f"{args.test!r} → {label} ({confidence:.2%})")
+    if not args.build and not args.test:
+        ap.print_help()
+
+
+if __name__ == "__main__":
+    main()
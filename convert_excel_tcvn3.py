@@ -1,25 +1,114 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
+import codecs
+import hashlib
 import json
+import math
+import os
+import pickle
 import re
+import shutil
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
-from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+from dataclasses import dataclass, field, fields, replace
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
 # Đường dẫn đến file map
 MAP_JSON = Path(__file__).parent / "tcvn3_map.json"
 MAP_CSV = Path(__file__).parent / "tcvn3_map.csv"
 BUILD_SCRIPT = Path(__file__).parent / "build_tcvn3_map.py"
+# Model tần suất ký tự/bigram cho detect_source_encoding (build_encoding_model.py)
+ENCODING_MODEL_JSON = Path(__file__).parent / "encoding_model.json"
+# Chuỗi ít chữ cái hơn ngần này (VD "®", "©") không đủ bằng chứng để nhận là TCVN3
+DETECT_MIN_LETTERS = 2
 
 # Biến global để cache map
 _TCVN3_TO_UNI: Dict[str, str] = {}
 _TCVN3_REGEX = None
+# Bảng str.translate (index = ord), chỉ build được khi mọi key là 1 code point
+_TCVN3_TABLE: List[str] | None = None
+# Map ngược Unicode -> TCVN3 (compile 1 lần cùng lúc load map)
+_UNI_TO_TCVN3: Dict[str, str] = {}
+_UNI_TO_TCVN3_REGEX = None
+_UNI_TO_TCVN3_TABLE: List[str] | None = None
+# Ký tự Unicode không biểu diễn chính xác được trong .VnTime (xem tcvn3_unrepresentable)
+_TCVN3_LOSSY_RE = None
+
+# Chiều chuyển đổi hỗ trợ bởi convert_excel / preview_conversion
+DIRECTIONS = ("to_unicode", "to_tcvn3")
+# Phiên bản định dạng checkpoint (đổi khi cấu trúc pickle/state.json thay đổi)
+CHECKPOINT_VERSION = 2
+# Cache kết quả theo nội dung (ResultCache): phiên bản định dạng entry và dung lượng mặc định
+RESULT_CACHE_VERSION = 2
+RESULT_CACHE_MAX_BYTES = 2 << 30
+# Kích thước khối đọc của convert_text_file
+TEXT_CHUNK_BYTES = 8 << 20
+# Ký tự nối các chuỗi của convert_strings để convert cả lô trong 1 lần (không có trong map nào)
+_BATCH_SEP = "\x00"
+# Engine đọc/ghi workbook của convert_excel
+ENGINES = ("pandas", "streaming", "inplace", "xml")
+# Số hàng mỗi khối khi engine="streaming"
+STREAMING_CHUNK_ROWS = 2000
+# on_progress của convert_excel: gửi sự kiện khi xong thêm ngần này hàng hoặc sau ngần này ms
+PROGRESS_EVERY_ROWS = 50000
+PROGRESS_INTERVAL_MS = 500
+# Font TCVN3: ".VnTime", ".VnArialH"... (cả "VnTime" không dấu chấm), trừ font VNI ("VNI-Times")
+_TCVN3_FONT_RE = re.compile(r"\.?vn(?!i[-_ ])", re.IGNORECASE)
+# Font Unicode thay cho font TCVN3 sau khi convert (remap_fonts); font "H" dùng chung font thường
+TCVN3_FONT_MAP: Dict[str, str] = {
+    ".VnTime": "Times New Roman",
+    ".VnTimeH": "Times New Roman",
+    ".VnArial": "Arial",
+    ".VnArialH": "Arial",
+    ".VnArial Narrow": "Arial Narrow",
+    ".VnArial NarrowH": "Arial Narrow",
+    ".VnCourier New": "Courier New",
+    ".VnCourier NewH": "Courier New",
+    ".VnCentury Schoolbook": "Century Schoolbook",
+    ".VnCentury SchoolbookH": "Century Schoolbook",
+    ".VnBook-Antiqua": "Book Antiqua",
+    ".VnBook-AntiquaH": "Book Antiqua",
+}
+# Cách phân loại cell: whitelist (looks_like_unicode_vietnamese) hoặc model thống kê
+DETECTORS = ("whitelist", "statistical")
+
+# Model nhận diện bảng mã đã load: nhãn -> (bigram logp, backoff logp, unk logp)
+_ENCODING_MODEL: Dict[str, Tuple[Dict[str, float], Dict[str, float], float]] = {}
+# Gộp chữ số về "0", khoảng trắng về " " trước khi tra model
+_MODEL_FOLD = str.maketrans({**{d: "0" for d in "123456789"}, "\t": " ", "\n": " ", "\r": " "})
+
+# Bảng charmap 256 byte cho codec "tcvn3" (build khi đăng ký codec)
+_TCVN3_DECODING_TABLE: str | None = None
+_TCVN3_ENCODING_TABLE = None
+_TCVN3_CODEC_REGISTERED = False
+TCVN3_CODEC_NAMES = ("tcvn3", "vntime")
+
+# Engine convert mặc định cho tcvn3_to_unicode ("translate" hoặc "regex")
+_CONVERTER_BACKEND = "translate"
+
+# Registry các bảng mã tiếng Việt cũ: tên -> CharsetSpec (khai báo bên dưới)
+CHARSETS: Dict[str, "CharsetSpec"] = {}
+# Converter đã compile, load lười và cache theo từng bảng mã
+_CHARSET_CONVERTERS: Dict[str, "CharsetConverter"] = {}
+
+# Regex compile từ whitelist + unicodedata (xem _compile_unicode_check)
+_UNI_BAD_RE = None
+_ALPHA_RE = None
+# Cùng 2 tập ký tự dưới dạng bảng bool 65536 phần tử cho bản vectorized (_looks_like_unicode_batch)
+_UNI_BAD_MASK: np.ndarray | None = None
+_ALPHA_MASK: np.ndarray | None = None
 
 # Tập ký tự tiếng Việt hợp lệ (Latin + dấu chuẩn + số, khoảng trắng, punctuation phổ biến)
 _VIET_UNI_OK = set(
@@ -48,25 +137,303 @@ class ConversionStats:
     total_cells: int = 0
     string_cells: int = 0
     already_unicode: int = 0
+    already_legacy: int = 0  # Chỉ dùng khi direction="to_tcvn3": cell đã là TCVN3
     converted_cells: int = 0
     unchanged_cells: int = 0
+    # Chỉ dùng khi direction="to_tcvn3": cell có ký tự .VnTime không biểu diễn chính xác
+    # được (chữ hoa có dấu thanh → chữ thường, ký tự trùng mã TCVN3 như µ)
+    lossy_cells: int = 0
     sheets_processed: int = 0
+    # Memo cache (chỉ khác 0 khi bật memo_size / enable_memo_cache)
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_evictions: int = 0
     logs: List[ConversionLog] = None
     
     def __post_init__(self):
         if self.logs is None:
             self.logs = []
+    
+    def merge(self, other: "ConversionStats") -> None:
+        """Cộng dồn thống kê (và nối log) của một phần việc khác vào đây"""
+        for f in fields(self):
+            if f.name != "logs":
+                setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+        self.logs.extend(other.logs)
+
+
+class ConversionCancelled(Exception):
+    """Convert bị hủy giữa chừng (cancel từ GUI, asyncio task bị cancel...)"""
+
+
+@dataclass
+class ProgressEvent:
+    """
+    Một sự kiện tiến trình convert (on_progress của convert_excel,
+    async_converter.ConversionProgress).
+    
+    Số hàng tổng lấy từ dimension của worksheet (0 = không rõ, VD file .xls);
+    eta = None khi chưa đủ dữ liệu để ước lượng.
+    """
+    sheet: str
+    sheet_idx: int
+    total_sheets: int
+    rows_done: int = 0          # Số hàng đã xong (cả workbook)
+    total_rows: int = 0         # Tổng số hàng (cả workbook)
+    sheet_rows_done: int = 0    # Số hàng đã xong của sheet hiện tại
+    sheet_rows: int = 0         # Số hàng của sheet hiện tại
+    elapsed: float = 0.0        # Giây từ lúc bắt đầu
+    eta: float | None = None    # Số giây còn lại ước lượng
+    
+    @property
+    def percent(self) -> float | None:
+        """Phần trăm theo số hàng, None nếu không rõ tổng số hàng"""
+        return 100.0 * self.rows_done / self.total_rows if self.total_rows else None
+
+
+class _ProgressTracker:
+    """
+    Gom tiến trình theo hàng của một lần convert/preview cho các engine.
+    
+    - progress_callback(sheet, sheet_idx, total_sheets) kiểu cũ vẫn được gọi 1 lần mỗi sheet
+    - on_progress(ProgressEvent) được gọi đầu mỗi sheet, khi xong, và giữa chừng
+      khi đã thêm every_rows hàng hoặc đã qua interval_ms kể từ sự kiện trước
+    - cancel_event (bất kỳ object nào có is_set(): threading.Event, Event của
+      multiprocessing.Manager...) được kiểm tra ở mỗi lần báo tiến trình;
+      đã set → ném ConversionCancelled
+    """
+    
+    def __init__(
+        self,
+        progress_callback=None,
+        on_progress: Callable[[ProgressEvent], None] | None = None,
+        cancel_event=None,
+        every_rows: int = PROGRESS_EVERY_ROWS,
+        interval_ms: int = PROGRESS_INTERVAL_MS,
+        sheet_rows: Dict[str, int] | None = None,
+    ):
+        self.progress_callback = progress_callback
+        self.on_progress = on_progress
+        self.cancel_event = cancel_event
+        self.every_rows = max(1, every_rows)
+        self.interval = interval_ms / 1000
+        self.sheet_rows = sheet_rows or {}
+        self.total_rows = sum(self.sheet_rows.values())
+        self.started = self._last_time = time.perf_counter()
+        self._last_rows = 0
+        self.rows_before = 0  # Số hàng của các sheet đã xong
+        self.sheet = ""
+        self.sheet_idx = 0
+        self.total_sheets = 0
+        self.current_rows = 0
+        self.current_done = 0
+    
+    @property
+    def rows_done(self) -> int:
+        return self.rows_before + self.current_done
+    
+    def check_cancel(self) -> None:
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            if not self.sheet:
+                raise ConversionCancelled("Đã hủy trước khi bắt đầu")
+            raise ConversionCancelled(f"Đã hủy ở sheet {self.sheet!r} ({self.rows_done:,} hàng đã xong)")
+    
+    def _enter(self, sheet: str, sheet_idx: int, total_sheets: int) -> None:
+        self.rows_before += max(self.current_rows, self.current_done)
+        self.current_rows = self.current_done = 0
+        self.check_cancel()
+        self.sheet, self.sheet_idx, self.total_sheets = sheet, sheet_idx, total_sheets
+        self.current_rows = self.sheet_rows.get(sheet, 0)
+    
+    def start_sheet(self, sheet: str, sheet_idx: int, total_sheets: int) -> None:
+        """Bắt đầu một sheet (engine xử lý tuần tự)"""
+        self._enter(sheet, sheet_idx, total_sheets)
+        if self.progress_callback:
+            self.progress_callback(sheet, sheet_idx, total_sheets)
+        self._emit()
+    
+    def sheet_done(self, sheet: str, sheet_idx: int, total_sheets: int) -> None:
+        """Một sheet/part đã xong (engine song song báo theo thứ tự xong)"""
+        self._enter(sheet, sheet_idx, total_sheets)
+        self.current_done = self.current_rows
+        if self.progress_callback:
+            self.progress_callback(sheet, sheet_idx, total_sheets)
+        self._emit()
+    
+    def advance(self, sheet_rows_done: int) -> None:
+        """Đã xong sheet_rows_done hàng của sheet hiện tại; kiểm tra lệnh hủy"""
+        self.check_cancel()
+        self.current_done = sheet_rows_done
+        if self.on_progress is None:
+            return
+        now = time.perf_counter()
+        if self.rows_done - self._last_rows >= self.every_rows or now - self._last_time >= self.interval:
+            self._emit(now)
+    
+    def finish(self) -> None:
+        """Đã xong toàn bộ: gửi sự kiện cuối (100%)"""
+        self.current_done = self.current_rows = max(self.current_rows, self.current_done)
+        self._emit()
+    
+    def _emit(self, now: float | None = None) -> None:
+        if self.on_progress is None:
+            return
+        now = time.perf_counter() if now is None else now
+        elapsed = now - self.started
+        rows_done = self.rows_done
+        total_rows = max(self.total_rows, rows_done) if self.total_rows else 0
+        eta = None
+        if total_rows and rows_done:
+            eta = elapsed * (total_rows - rows_done) / rows_done
+        self._last_time, self._last_rows = now, rows_done
+        self.on_progress(ProgressEvent(
+            self.sheet, self.sheet_idx, self.total_sheets,
+            rows_done=rows_done,
+            total_rows=total_rows,
+            sheet_rows_done=self.current_done,
+            sheet_rows=max(self.current_rows, self.current_done),
+            elapsed=elapsed,
+            eta=eta,
+        ))
+
 
+class MemoCache:
+    """
+    LRU cache có giới hạn cho kết quả từng chuỗi, dùng chung cho
+    tcvn3_to_unicode (slot 0) và looks_like_unicode_vietnamese (slot 1).
+    
+    Mỗi chuỗi chiếm 1 entry chứa cả 2 kết quả, nên một chuỗi vừa được phân loại
+    vừa được convert chỉ tốn 1 chỗ trong cache.
+    """
+    _MISSING = object()
+    
+    def __init__(self, maxsize: int = 100_000):
+        if maxsize <= 0:
+            raise ValueError("maxsize phải > 0")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[str, list] = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def lookup(self, s: str, slot: int, compute: Callable[[str], Any]) -> Any:
+        """Trả kết quả đã cache của s ở slot, tính bằng compute(s) nếu chưa có"""
+        with self._lock:
+            entry = self._data.get(s)
+            if entry is not None:
+                self._data.move_to_end(s)
+                value = entry[slot]
+                if value is not self._MISSING:
+                    self.hits += 1
+                    _count_memo(0)
+                    return value
+        
+        value = compute(s)
+        
+        evicted = 0
+        with self._lock:
+            self.misses += 1
+            entry = self._data.get(s)
+            if entry is None:
+                entry = [self._MISSING, self._MISSING]
+                self._data[s] = entry
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+                    evicted = 1
+            entry[slot] = value
+        _count_memo(1, evicted)
+        return value
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+# Memo cache dùng chung (None = tắt)
+_MEMO: MemoCache | None = None
+# [hits, misses, evictions] của lần convert đang chạy trong thread hiện tại (_memo_scope);
+# bộ đếm của MemoCache là tổng của mọi thread nên không tách được theo lần convert
+_MEMO_SCOPE = threading.local()
+
+
+def _count_memo(kind: int, evicted: int = 0) -> None:
+    """Ghi 1 hit (kind=0) hoặc 1 miss (kind=1, kèm số eviction) vào bộ đếm của thread hiện tại"""
+    counters = getattr(_MEMO_SCOPE, "counters", None)
+    if counters is not None:
+        counters[kind] += 1
+        counters[2] += evicted
+
+
+def enable_memo_cache(maxsize: int = 100_000) -> MemoCache:
+    """
+    Bật memo cache cho tcvn3_to_unicode / looks_like_unicode_vietnamese.
+    
+    Hữu ích khi dữ liệu lặp lại nhiều (tên tỉnh, đơn vị, trạng thái...).
+    
+    Args:
+        maxsize: Số chuỗi tối đa giữ trong cache, quá thì loại chuỗi ít dùng nhất
+        
+    Returns:
+        MemoCache đang dùng (đọc hits/misses/evictions để chỉnh maxsize)
+    """
+    global _MEMO
+    _MEMO = MemoCache(maxsize)
+    return _MEMO
+
+
+def disable_memo_cache() -> None:
+    """Tắt memo cache"""
+    global _MEMO
+    _MEMO = None
 
-def load_tcvn3_map() -> Dict[str, str]:
+
+@contextmanager
+def _memo_scope(memo_size: int | None, stats: ConversionStats):
+    """
+    Bật memo cache trong phạm vi một lần convert (nếu memo_size và chưa có cache
+    dùng chung), rồi ghi số hit/miss/eviction phát sinh vào stats.
+    
+    Bộ đếm riêng cho từng thread nên các lần convert chạy song song trong cùng
+    process không cộng lẫn của nhau; phần việc chạy trong process worker mở
+    scope riêng và trả số đếm về qua ConversionStats của nó.
+    """
+    own = bool(memo_size) and _MEMO is None
+    memo = enable_memo_cache(memo_size) if own else _MEMO
+    outer = getattr(_MEMO_SCOPE, "counters", None)
+    counters = _MEMO_SCOPE.counters = [0, 0, 0]
+    try:
+        yield memo
+    finally:
+        _MEMO_SCOPE.counters = outer
+        stats.cache_hits += counters[0]
+        stats.cache_misses += counters[1]
+        stats.cache_evictions += counters[2]
+        if own:
+            disable_memo_cache()
+
+
+def load_tcvn3_map(register_codec: bool = False) -> Dict[str, str]:
     """
     Load bảng map TCVN3 -> Unicode từ file JSON hoặc CSV.
     Nếu file không tồn tại, tự động chạy build_tcvn3_map.py để tạo.
+    
+    Args:
+        register_codec: Nếu True, đăng ký codec "tcvn3" (alias "vntime") để dùng
+            được open(..., encoding="tcvn3"), bytes.decode("tcvn3"), codecs.iterdecode...
     """
-    global _TCVN3_TO_UNI, _TCVN3_REGEX
+    global _TCVN3_TO_UNI, _TCVN3_REGEX, _TCVN3_TABLE
+    global _UNI_TO_TCVN3, _UNI_TO_TCVN3_REGEX, _UNI_TO_TCVN3_TABLE, _TCVN3_LOSSY_RE
     
     # Nếu đã load rồi, return luôn
     if _TCVN3_TO_UNI:
+        if register_codec:
+            register_tcvn3_codec()
         return _TCVN3_TO_UNI
     
     # Ưu tiên load từ JSON
@@ -123,16 +490,400 @@ def load_tcvn3_map() -> Dict[str, str]:
                 f"và không tìm thấy script build ({BUILD_SCRIPT.name})"
             )
     
-    # Tạo regex pattern từ keys
+    # Tạo regex pattern + bảng translate từ keys
     if _TCVN3_TO_UNI:
         _TCVN3_REGEX = re.compile("|".join(map(re.escape, _TCVN3_TO_UNI.keys())))
+        _TCVN3_TABLE = _build_translate_table(_TCVN3_TO_UNI)
+        
+        # Map ngược: nếu nhiều key TCVN3 cùng ra một ký tự, giữ key đầu tiên
+        _UNI_TO_TCVN3 = {}
+        for k, v in _TCVN3_TO_UNI.items():
+            _UNI_TO_TCVN3.setdefault(v, k)
+        # .VnTime không có chữ hoa có dấu thanh (Ò, Ý...; chỉ font .VnTimeH có): ghi bằng mã
+        # chữ thường thay vì để nguyên code point, vốn trùng mã của chữ khác (Ò = "ề")
+        lossy = set()
+        for v in list(_UNI_TO_TCVN3):
+            upper = v.upper()
+            if len(upper) == 1 and upper != v and upper not in _UNI_TO_TCVN3:
+                _UNI_TO_TCVN3[upper] = _UNI_TO_TCVN3[v]
+                lossy.add(upper)
+        # Ký tự trùng mã TCVN3 mà không phải kết quả của map (µ → đọc lại thành "à")
+        lossy.update(k for k in _TCVN3_TO_UNI if len(k) == 1 and k not in _UNI_TO_TCVN3)
+        _TCVN3_LOSSY_RE = re.compile("[" + re.escape("".join(sorted(lossy))) + "]") if lossy else None
+        # Sắp xếp key dài trước để regex alternation ưu tiên match dài nhất
+        _UNI_TO_TCVN3_REGEX = re.compile(
+            "|".join(map(re.escape, sorted(_UNI_TO_TCVN3, key=len, reverse=True)))
+        )
+        _UNI_TO_TCVN3_TABLE = _build_translate_table(_UNI_TO_TCVN3)
+        if _UNI_BAD_RE is None:
+            _compile_unicode_check()
+        if register_codec:
+            register_tcvn3_codec()
     
     return _TCVN3_TO_UNI
 
 
+def _build_translate_table(mapping: Dict[str, str]) -> List[str] | None:
+    """
+    Tạo bảng cho str.translate từ map 1 ký tự -> chuỗi.
+    
+    Dùng list dày (index = code point) thay vì dict: str.translate tra list
+    nhanh hơn ~3 lần; ký tự vượt quá độ dài list gây IndexError (LookupError)
+    nên được giữ nguyên.
+    
+    Returns:
+        List bảng dịch, hoặc None nếu map có key nhiều ký tự (chỉ dùng được regex)
+    """
+    if not mapping or any(len(k) != 1 for k in mapping):
+        return None
+    table = [chr(i) for i in range(max(map(ord, mapping)) + 1)]
+    for k, v in mapping.items():
+        table[ord(k)] = v
+    return table
+
+
+# Chữ cái chỉ có trong tiếng Việt Unicode (ă đ ĩ ũ ơ ư và khối U+1EA0-U+1EF9): văn bản
+# bảng mã cũ đọc bằng cp1252 không bao giờ chứa chúng → chuỗi đã là Unicode
+_VIET_ONLY_RE = re.compile("[\u0102\u0103\u0110\u0111\u0128\u0129\u0168\u0169\u01a0\u01a1\u01af\u01b0\u1ea0-\u1ef9]")
+
+# VIQR (RFC 1456): dấu thanh/dấu phụ chỉ có nghĩa khi đứng ngay sau nguyên âm của
+# một âm tiết tiếng Việt; "\" đứng trước dấu → giữ nguyên ký tự dấu (VD: "ddi\.")
+_VIQR_TONES = "'`?~."
+_VIQR_VOWEL = r"[aeiouy][(^+]?"
+_VIQR_SYLLABLE_RE = re.compile(
+    r"(?P<initial>ngh|ng|nh|ch|gh|gi|kh|ph|qu|th|tr|dd|[bcdghklmnpqrstvx])?"
+    rf"(?P<nucleus>(?:{_VIQR_VOWEL})+(?:[{re.escape(_VIQR_TONES)}](?:{_VIQR_VOWEL})*)?)"
+    r"(?P<final>ng|nh|ch|[cmnpt])?"
+    rf"(?P<tail>[{re.escape(_VIQR_TONES)}]*)",
+    re.IGNORECASE,
+)
+_VIQR_WORD_RE = re.compile(r"\\[" + re.escape(_VIQR_TONES + "(^+") + r"]|[A-Za-z][A-Za-z'`?~.(^+]*")
+# Các nguyên âm (đơn, đôi, ba) hợp lệ của tiếng Việt, viết theo VIQR không dấu thanh
+_VIQR_NUCLEI = frozenset("""
+    a a( a^ e e^ i o o^ o+ u u+ y
+    ai ao au a^u ay a^y eo e^u ia ie^ iu oa oa( oe oi o^i o+i oo ua ua^ ue^ ui uo^ uo+
+    u+o+ uy u+a u+i u+u ye^
+    oai oay oeo ua^y uo^i u+o+i u+o+u uye^ uya uyu ye^u ie^u
+""".split())
+
+
+def _viqr_syllable(word: str):
+    """Match âm tiết VIQR hợp lệ của cả word, hoặc None"""
+    m = _VIQR_SYLLABLE_RE.fullmatch(word)
+    if m is None:
+        return None
+    base = m.group("nucleus").lower().translate({ord(c): None for c in _VIQR_TONES})
+    return m if base in _VIQR_NUCLEI else None
+
+
+def _viqr_is_evidence(m) -> bool:
+    """
+    Âm tiết chắc chắn là VIQR: có dấu phụ ( ^ +, "dd", dấu ` ~, hoặc dấu thanh
+    đứng giữa âm tiết. Dấu ' . ? ở cuối từ ("so?", "No.") có thể chỉ là dấu câu.
+    """
+    nucleus = m.group("nucleus")
+    if (m.group("initial") or "").lower() == "dd" or any(c in nucleus for c in "(^+`~"):
+        return True
+    has_tone = any(c in nucleus for c in _VIQR_TONES)
+    return has_tone and (nucleus[-1] not in _VIQR_TONES or bool(m.group("final")))
+
+
+def _viqr_has_evidence(s: str) -> bool:
+    """Chuỗi có ít nhất một âm tiết chắc chắn là VIQR"""
+    for m in _VIQR_WORD_RE.finditer(s):
+        syl = _viqr_syllable(m.group(0))
+        if syl is not None and _viqr_is_evidence(syl):
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class CharsetSpec:
+    """Mô tả một bảng mã cũ trong registry"""
+    map_path: Path
+    description: str = ""
+    normalize: str | None = None  # Chuẩn hóa sau khi dịch (VD: "NFC" cho dấu rời cp1258)
+    ascii_based: bool = False  # Bảng mã dùng ký tự ASCII (VIQR): convert theo âm tiết, có "\" escape
+    # Regex các chuỗi chỉ có trong văn bản chưa convert của bảng mã này (VD: "oâ" của VNI);
+    # None → dùng looks_like_unicode_vietnamese (TCVN3)
+    signature: str | None = None
+
+
+@dataclass
+class CharsetConverter:
+    """Bộ convert đã compile (regex + bảng translate, 2 chiều) cho một bảng mã"""
+    name: str
+    spec: CharsetSpec
+    to_uni: Dict[str, str]
+    regex: Any = None
+    table: List[str] | None = None
+    from_uni: Dict[str, str] = field(default_factory=dict)
+    from_uni_regex: Any = None
+    from_uni_table: List[str] | None = None
+    signature: Any = None
+    
+    @classmethod
+    def compile(cls, name: str, spec: CharsetSpec, mapping: Dict[str, str]) -> "CharsetConverter":
+        """Compile map thành regex (key dài trước) + bảng translate cho cả 2 chiều"""
+        conv = cls(name=name, spec=spec, to_uni=dict(mapping))
+        conv.regex = re.compile("|".join(map(re.escape, sorted(mapping, key=len, reverse=True))))
+        conv.table = _build_translate_table(mapping)
+        for k, v in mapping.items():
+            conv.from_uni.setdefault(v, k)
+        conv.from_uni_regex = re.compile(
+            "|".join(map(re.escape, sorted(conv.from_uni, key=len, reverse=True)))
+        )
+        conv.from_uni_table = _build_translate_table(conv.from_uni)
+        if spec.signature is not None:
+            conv.signature = re.compile(spec.signature)
+        return conv
+    
+    def to_unicode(self, s: str, backend: str | None = None) -> str:
+        """Chuyển chuỗi từ bảng mã này sang Unicode"""
+        if not s:
+            return s
+        if self.spec.ascii_based:
+            # Chỉ dịch trong âm tiết tiếng Việt: "address", "example.com" giữ nguyên;
+            # chuỗi không có âm tiết VIQR chắc chắn nào → ' . ? cuối từ là dấu câu
+            loose = _viqr_has_evidence(s)
+            s = _VIQR_WORD_RE.sub(lambda m: self._viqr_word(m, loose), s)
+        elif self.table is not None and (backend or _CONVERTER_BACKEND) == "translate":
+            s = s.translate(self.table)
+        else:
+            s = self.regex.sub(lambda m: self.to_uni[m.group(0)], s)
+        if self.spec.normalize:
+            s = unicodedata.normalize(self.spec.normalize, s)
+        return s
+    
+    def from_unicode(self, s: str) -> str:
+        """Chuyển chuỗi Unicode (NFC hoặc NFD) sang bảng mã này"""
+        if not s:
+            return s
+        if self.spec.normalize:
+            # Bảng mã dùng dấu rời (cp1258) cần tách dấu theo quy tắc riêng, chưa hỗ trợ
+            raise ValueError(f"Bảng mã {self.name!r} chưa hỗ trợ chiều Unicode → {self.name}")
+        s = unicodedata.normalize("NFC", s)
+        if self.from_uni_table is not None:
+            return s.translate(self.from_uni_table)
+        return self.from_uni_regex.sub(lambda m: self.from_uni[m.group(0)], s)
+    
+    def _viqr_word(self, m, loose: bool) -> str:
+        word = m.group(0)
+        if word[0] == "\\":
+            return word[1]
+        syl = _viqr_syllable(word)
+        if syl is None or not (loose or _viqr_is_evidence(syl)):
+            return word
+        end = syl.start("tail")
+        return self.regex.sub(lambda k: self.to_uni[k.group(0)], word[:end]) + word[end:]
+    
+    def is_unicode(self, s: str) -> bool:
+        """
+        Chuỗi đã là Unicode (không cần convert từ bảng mã này)?
+        
+        Mỗi bảng mã có cách nhận diện riêng: TCVN3 dùng whitelist
+        (looks_like_unicode_vietnamese); bảng mã có signature (VNI, cp1258) cần
+        convert khi chứa chuỗi đặc trưng chưa convert; VIQR cần convert khi có
+        ít nhất một âm tiết chắc chắn là VIQR (xem _viqr_is_evidence).
+        """
+        if self.spec.ascii_based:
+            return bool(_VIET_ONLY_RE.search(s)) or not _viqr_has_evidence(s)
+        if self.signature is None:
+            return looks_like_unicode_vietnamese(s)
+        if _VIET_ONLY_RE.search(s):
+            return True
+        return self.signature.search(s) is None
+    
+    def is_unicode_batch(self, strings: List[str]) -> np.ndarray:
+        """is_unicode cho cả lô chuỗi (vectorized với whitelist), trả về mảng bool"""
+        if self.signature is None and not self.spec.ascii_based:
+            return _looks_like_unicode_batch(strings)
+        return np.fromiter(map(self.is_unicode, strings), dtype=bool, count=len(strings))
+    
+    def classifier(self, detector: str = "whitelist") -> Callable[[str], bool]:
+        """Trả về hàm(str) -> bool "đã là Unicode" theo detector đã chọn"""
+        if detector not in DETECTORS:
+            raise ValueError(
+                f"detector không hợp lệ: {detector!r}. Chọn một trong: {', '.join(DETECTORS)}"
+            )
+        if detector == "whitelist":
+            return self.is_unicode
+        if self.name != "tcvn3":
+            raise ValueError('detector="statistical" hiện chỉ có model cho source_charset="tcvn3"')
+        return _is_not_tcvn3
+
+
+def _is_not_tcvn3(s: str) -> bool:
+    """Classifier của detector "statistical" (hàm cấp module để pickle được sang worker)"""
+    return detect_source_encoding(s)[0] != "tcvn3"
+
+
+def register_charset(
+    name: str,
+    map_path: str | Path,
+    description: str = "",
+    normalize: str | None = None,
+    ascii_based: bool = False,
+    signature: str | None = None,
+) -> None:
+    """
+    Đăng ký (hoặc thay thế) một bảng mã cũ trong registry.
+    
+    Args:
+        name: Tên bảng mã, dùng cho tham số source_charset
+        map_path: File JSON {chuỗi bảng mã cũ: chuỗi Unicode}
+        description: Mô tả ngắn
+        normalize: Dạng chuẩn hóa Unicode áp dụng sau khi dịch (None = không)
+        ascii_based: True nếu bảng mã viết bằng ký tự ASCII theo kiểu VIQR (dấu chỉ
+            được dịch trong âm tiết tiếng Việt, "\" trước dấu để giữ nguyên)
+        signature: Regex chuỗi chỉ có trong văn bản chưa convert của bảng mã (dùng cho
+            skip_unicode); None → looks_like_unicode_vietnamese
+    """
+    CHARSETS[name] = CharsetSpec(Path(map_path), description, normalize, ascii_based, signature)
+    _CHARSET_CONVERTERS.pop(name, None)
+
+
+register_charset("tcvn3", MAP_JSON, "TCVN3 / ABC (.VnTime, .VnArial...)")
+register_charset(
+    "vni", Path(__file__).parent / "vni_map.json", "VNI Windows (VNI-Times...)",
+    # Ký tự dấu VNI không có trong tiếng Việt (ø û ï...), hoặc nguyên âm + ký tự dấu
+    # không thể đứng cạnh nhau trong Unicode ("oâ", "aù"; trừ "oà" "oá" "oã" như "hoà")
+    signature="[ÆæÎîÑñÖöøØûÛïÏåÅäÄëËüÜ]|[aeouyôAEOUYÔ][ùõÙÕ]|[aeoAEO][âÂ]|[aeAE][áàãÁÀÃ]|[aA][êéèúÊÉÈÚ]",
+)
+register_charset(
+    "viqr", Path(__file__).parent / "viqr_map.json",
+    "VIQR (ASCII: a' a` a? a~ a. a( a^ o+ dd)", ascii_based=True,
+)
+register_charset(
+    "cp1258", Path(__file__).parent / "cp1258_map.json",
+    "Windows-1258 (byte cp1258 bị đọc thành cp1252)", normalize="NFC",
+    # Đ/₫ của cp1258, hoặc dấu thanh rời (Ì ì Ò ò Þ) đứng ngay sau nguyên âm
+    signature="[ÐðÞþ]|[aeiouyâêôõýãAEIOUYÂÊÔÕÝÃ][ÌìÒòÞ]",
+)
+
+
+def get_charset_converter(name: str) -> CharsetConverter:
+    """
+    Lấy converter đã compile của một bảng mã (load file map lần đầu, sau đó dùng cache).
+    
+    "tcvn3" dùng chung map với load_tcvn3_map() (có fallback CSV + tự build).
+    """
+    conv = _CHARSET_CONVERTERS.get(name)
+    if conv is not None:
+        return conv
+    
+    spec = CHARSETS.get(name)
+    if spec is None:
+        raise ValueError(
+            f"Bảng mã không hỗ trợ: {name!r}. Chọn một trong: {', '.join(CHARSETS)}"
+        )
+    
+    if name == "tcvn3" and spec.map_path == MAP_JSON:
+        mapping = load_tcvn3_map()
+    else:
+        if not spec.map_path.exists():
+            raise FileNotFoundError(f"Không tìm thấy file map của {name}: {spec.map_path}")
+        with spec.map_path.open("r", encoding="utf-8") as f:
+            mapping = json.load(f)
+        print(f"✅ Đã tải {len(mapping)} mapping từ {spec.map_path.name}")
+    
+    conv = CharsetConverter.compile(name, spec, mapping)
+    _CHARSET_CONVERTERS[name] = conv
+    return conv
+
+
+def _build_decoding_table(mapping: Dict[str, str]) -> str:
+    """
+    Tạo bảng charmap 256 ký tự: byte .VnTime -> ký tự Unicode.
+    
+    Byte không có trong map giữ nghĩa cp1252 (đúng như Windows/Excel hiển thị),
+    nên bytes.decode("tcvn3") == tcvn3_to_unicode(bytes.decode("cp1252")).
+    Các byte cp1252 không định nghĩa (0x81, 0x8D...) lấy theo latin-1.
+    """
+    table = []
+    for b in range(256):
+        try:
+            table.append(bytes([b]).decode("cp1252"))
+        except UnicodeDecodeError:
+            table.append(chr(b))
+    for k, v in mapping.items():
+        if len(k) == 1 and len(v) == 1 and ord(k) < 256:
+            table[ord(k)] = v
+    return "".join(table)
+
+
+class _Tcvn3Codec(codecs.Codec):
+    def encode(self, input, errors="strict"):
+        return codecs.charmap_encode(input, errors, _TCVN3_ENCODING_TABLE)
+
+    def decode(self, input, errors="strict"):
+        return codecs.charmap_decode(input, errors, _TCVN3_DECODING_TABLE)
+
+
+class _Tcvn3IncrementalEncoder(codecs.IncrementalEncoder):
+    def encode(self, input, final=False):
+        return codecs.charmap_encode(input, self.errors, _TCVN3_ENCODING_TABLE)[0]
+
+
+class _Tcvn3IncrementalDecoder(codecs.IncrementalDecoder):
+    # TCVN3 là mã 1 byte: không cần giữ trạng thái giữa các chunk
+    def decode(self, input, final=False):
+        return codecs.charmap_decode(input, self.errors, _TCVN3_DECODING_TABLE)[0]
+
+
+class _Tcvn3StreamWriter(_Tcvn3Codec, codecs.StreamWriter):
+    pass
+
+
+class _Tcvn3StreamReader(_Tcvn3Codec, codecs.StreamReader):
+    pass
+
+
+def _tcvn3_codec_search(name: str):
+    if name not in TCVN3_CODEC_NAMES or _TCVN3_DECODING_TABLE is None:
+        return None
+    return codecs.CodecInfo(
+        name="tcvn3",
+        encode=_Tcvn3Codec().encode,
+        decode=_Tcvn3Codec().decode,
+        incrementalencoder=_Tcvn3IncrementalEncoder,
+        incrementaldecoder=_Tcvn3IncrementalDecoder,
+        streamwriter=_Tcvn3StreamWriter,
+        streamreader=_Tcvn3StreamReader,
+    )
+
+
+def register_tcvn3_codec() -> None:
+    """
+    Đăng ký codec "tcvn3" (alias "vntime") với module codecs.
+    
+    Codec dùng bảng charmap build từ map đã load, decode/encode ở tốc độ C
+    và có incremental decoder → đọc stream file .VnTime nhiều GB với bộ nhớ cố định.
+    """
+    global _TCVN3_DECODING_TABLE, _TCVN3_ENCODING_TABLE, _TCVN3_CODEC_REGISTERED
+    
+    if not _TCVN3_TO_UNI:
+        load_tcvn3_map()
+    
+    _TCVN3_DECODING_TABLE = _build_decoding_table(_TCVN3_TO_UNI)
+    # Nhiều byte có thể decode ra cùng một ký tự (VD: 0xB5 "µ" -> "à" và 0xE0 "à");
+    # khi encode phải ưu tiên byte .VnTime trong map, nên ghi đè theo map sau cùng
+    encoding_table = {ord(ch): b for b, ch in enumerate(_TCVN3_DECODING_TABLE)}
+    for k, v in _TCVN3_TO_UNI.items():
+        if len(k) == 1 and len(v) == 1 and ord(k) < 256:
+            encoding_table[ord(v)] = ord(k)
+    _TCVN3_ENCODING_TABLE = encoding_table
+    
+    # codecs.register không có unregister cho search function → chỉ đăng ký 1 lần
+    if not _TCVN3_CODEC_REGISTERED:
+        codecs.register(_tcvn3_codec_search)
+        _TCVN3_CODEC_REGISTERED = True
+
+
 def looks_like_unicode_vietnamese(s: str) -> bool:
     """
     Kiểm tra xem chuỗi có phải là tiếng Việt Unicode hợp lệ hay không.
+    Dùng memo cache nếu đã bật (enable_memo_cache / convert_excel(memo_size=...)).
     
     LOGIC TỐI ƯU v2.1:
     1. Empty/whitespace → TRUE (bỏ qua)
@@ -144,27 +895,126 @@ def looks_like_unicode_vietnamese(s: str) -> bool:
         True nếu chuỗi đã là Unicode Việt hợp lệ (bỏ qua không cần convert)
         False nếu có ký tự lạ (có thể là TCVN3)
     """
-    if not s:
-        return True
+    if _MEMO is not None:
+        return _MEMO.lookup(s, 1, _looks_like_unicode_vietnamese)
+    return _looks_like_unicode_vietnamese(s)
+
+
+def _char_class(codepoints: List[int]) -> str:
+    """Gộp danh sách code point (đã sắp xếp) thành character class regex dạng dải"""
+    parts = []
+    i = 0
+    while i < len(codepoints):
+        j = i
+        while j + 1 < len(codepoints) and codepoints[j + 1] == codepoints[j] + 1:
+            j += 1
+        lo, hi = codepoints[i], codepoints[j]
+        parts.append(f"\\U{lo:08x}" if lo == hi else f"\\U{lo:08x}-\\U{hi:08x}")
+        i = j + 1
+    return "[" + "".join(parts) + "]"
+
+
+def _compile_unicode_check() -> None:
+    """
+    Compile logic looks_like_unicode_vietnamese thành regex (một lần, ~0.05s).
     
-    s_stripped = s.strip()
-    if not s_stripped:
-        return True  # Chỉ whitespace
+    Chuỗi bị coi là "không phải Unicode Việt" khi có chữ cái VÀ có ký tự lạ
+    (ngoài _VIET_UNI_OK, category không thuộc Z/P/C/S - tức là L/M/N).
+    Quét bảng Unicode BMP một lần để dựng 2 character class:
+    - _UNI_BAD_RE: ký tự lạ
+    - _ALPHA_RE: chữ cái (str.isalpha)
     
-    # Quick check: Chỉ có số, dấu câu cơ bản (không có chữ)
-    # VD: "123", "---", "...", "2024-11-09", "1,234.56"
-    has_letter = False
+    Chỉ dựng class trên BMP để sre compile thành bitmap (tra O(1) mỗi ký tự);
+    toàn bộ ký tự ngoài BMP được gộp thành 1 dải và xử lý bằng đường chậm.
+    """
+    global _UNI_BAD_RE, _ALPHA_RE, _UNI_BAD_MASK, _ALPHA_MASK
     
-    for ch in s:
+    bad, alpha = [], []
+    category = unicodedata.category
+    for i in range(0x10000):
+        ch = chr(i)
         if ch.isalpha():
-            has_letter = True
-            break
+            alpha.append(i)
+        if category(ch)[0] in "LMN" and ch not in _VIET_UNI_OK:
+            bad.append(i)
+    non_bmp = f"\\U00010000-\\U{sys.maxunicode:08x}"
+    _ALPHA_RE = re.compile(_char_class(alpha)[:-1] + non_bmp + "]")
+    _UNI_BAD_RE = re.compile(_char_class(bad)[:-1] + non_bmp + "]")
+    _UNI_BAD_MASK = np.zeros(0x10000, dtype=bool)
+    _UNI_BAD_MASK[bad] = True
+    _ALPHA_MASK = np.zeros(0x10000, dtype=bool)
+    _ALPHA_MASK[alpha] = True
+
+
+def _looks_like_unicode_vietnamese(s: str) -> bool:
+    """Phần tính thật của looks_like_unicode_vietnamese (không qua memo cache)"""
+    if not s or s.isspace():
+        return True  # Rỗng hoặc chỉ whitespace
+    
+    if _UNI_BAD_RE is None:
+        _compile_unicode_check()
+    
+    # Một lần quét ở tốc độ C tìm ký tự lạ; phần lớn chuỗi dừng ở đây
+    m = _UNI_BAD_RE.search(s)
+    if m is None:
+        return True
+    ch = m.group()
+    if ord(ch) > 0xFFFF:
+        return _looks_like_unicode_vietnamese_slow(s)
+    # Ký tự lạ là chữ cái → chắc chắn có chữ cái → không phải Unicode Việt
+    if ch.isalpha():
+        return False
+    # Ký tự lạ là dấu rời/chữ số lạ: chỉ "lạ" khi chuỗi có chữ cái
+    # (chỉ số + dấu, VD: "123", "2024-11-09" → OK)
+    m = _ALPHA_RE.search(s)
+    if m is None:
+        return True
+    if ord(m.group()) > 0xFFFF:
+        return _looks_like_unicode_vietnamese_slow(s)
+    return False
+
+
+def _looks_like_unicode_batch(strings: List[str]) -> np.ndarray:
+    """
+    looks_like_unicode_vietnamese cho cả lô chuỗi trong một lần tính numpy.
+    
+    Nối các chuỗi, encode UTF-32 thành mảng code point, tra 2 bảng bool
+    _UNI_BAD_MASK / _ALPHA_MASK rồi gộp theo từng chuỗi bằng reduceat:
+    chuỗi "không phải Unicode Việt" khi có ký tự lạ VÀ có chữ cái (giống hệt
+    bản từng chuỗi). Chuỗi có ký tự ngoài BMP dùng lại bản từng chuỗi.
     
+    Returns:
+        Mảng bool cùng độ dài với strings
+    """
+    if _UNI_BAD_RE is None:
+        _compile_unicode_check()
+    result = np.ones(len(strings), dtype=bool)
+    lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+    nonempty = np.flatnonzero(lengths)
+    if not len(nonempty):
+        return result
+    
+    codepoints = np.frombuffer(
+        "".join(strings).encode("utf-32-le", "surrogatepass"), dtype=np.uint32
+    )
+    starts = (np.cumsum(lengths) - lengths)[nonempty]
+    bmp = np.minimum(codepoints, 0xFFFF)
+    has_bad = np.logical_or.reduceat(_UNI_BAD_MASK[bmp], starts)
+    has_alpha = np.logical_or.reduceat(_ALPHA_MASK[bmp], starts)
+    result[nonempty] = ~(has_bad & has_alpha)
+    
+    has_astral = np.logical_or.reduceat(codepoints > 0xFFFF, starts)
+    for i in nonempty[has_astral].tolist():
+        result[i] = _looks_like_unicode_vietnamese(strings[i])
+    return result
+
+
+def _looks_like_unicode_vietnamese_slow(s: str) -> bool:
+    """Duyệt từng ký tự bằng Python, chỉ dùng cho chuỗi có ký tự ngoài BMP (emoji...)"""
     # Nếu không có chữ cái → OK (số, dấu, date...)
-    if not has_letter:
+    if not any(ch.isalpha() for ch in s):
         return True
     
-    # Có chữ cái → Check kỹ hơn
     for ch in s:
         # Cho qua nếu trong whitelist
         if ch in _VIET_UNI_OK:
@@ -205,14 +1055,139 @@ def is_likely_non_text_content(s: str) -> bool:
     return False
 
 
-def tcvn3_to_unicode(s: str) -> str:
+def _convert_translate(s: str) -> str:
+    """Backend str.translate: một lần duyệt ở tốc độ C, không callback Python."""
+    if _TCVN3_TABLE is None:
+        return _convert_regex(s)
+    return s.translate(_TCVN3_TABLE)
+
+
+def _convert_regex(s: str) -> str:
+    """Backend regex (cách cũ): gọi lambda cho từng ký tự khớp. Giữ lại để so sánh."""
+    return _TCVN3_REGEX.sub(lambda m: _TCVN3_TO_UNI.get(m.group(0), m.group(0)), s)
+
+
+# Registry các backend convert: tên -> hàm(str) -> str
+CONVERTER_BACKENDS: Dict[str, Callable[[str], str]] = {
+    "translate": _convert_translate,
+    "regex": _convert_regex,
+}
+
+
+def set_converter_backend(name: str) -> None:
+    """
+    Chọn backend mặc định cho tcvn3_to_unicode.
+    
+    Args:
+        name: Tên backend trong CONVERTER_BACKENDS ("translate" hoặc "regex")
+    """
+    global _CONVERTER_BACKEND
+    if name not in CONVERTER_BACKENDS:
+        raise ValueError(
+            f"Backend không hợp lệ: {name!r}. Chọn một trong: {', '.join(CONVERTER_BACKENDS)}"
+        )
+    _CONVERTER_BACKEND = name
+    if _MEMO is not None:
+        _MEMO.clear()
+
+
+def _model_key(s: str) -> str:
+    """Chuẩn hóa chuỗi trước khi tra model: chữ thường, gộp chữ số và khoảng trắng"""
+    return s.lower().translate(_MODEL_FOLD)
+
+
+def load_encoding_model() -> Dict[str, Tuple[Dict[str, float], Dict[str, float], float]]:
+    """Load model nhận diện bảng mã từ encoding_model.json (chỉ load 1 lần)"""
+    global _ENCODING_MODEL
+    
+    if _ENCODING_MODEL:
+        return _ENCODING_MODEL
+    
+    if not ENCODING_MODEL_JSON.exists():
+        raise FileNotFoundError(
+            f"Không tìm thấy {ENCODING_MODEL_JSON.name}. "
+            f"Hãy chạy build_encoding_model.py --build"
+        )
+    with ENCODING_MODEL_JSON.open("r", encoding="utf-8") as f:
+        raw = json.load(f)
+    _ENCODING_MODEL = {
+        label: (m["bigram"], m["backoff"], m["unk"]) for label, m in raw.items()
+    }
+    return _ENCODING_MODEL
+
+
+def _model_log_likelihood(key: str, bigram: Dict[str, float], backoff: Dict[str, float], unk: float) -> float:
+    """Log-likelihood của chuỗi đã chuẩn hóa (_model_key) theo một model bigram có backoff"""
+    lp = backoff.get(key[0], unk)
+    for i in range(len(key) - 1):
+        v = bigram.get(key[i:i + 2])
+        lp += v if v is not None else backoff.get(key[i + 1], unk)
+    return lp
+
+
+def detect_source_encoding(s: str) -> Tuple[str, float]:
+    """
+    Nhận diện bảng mã của chuỗi bằng model tần suất ký tự/bigram.
+    
+    Chấm điểm log-likelihood của chuỗi theo từng model ("unicode": tiếng Việt
+    Unicode, "tcvn3": tiếng Việt mã .VnTime, "ascii": tiếng Anh/ký hiệu) rồi
+    chuẩn hóa thành xác suất hậu nghiệm. Khác với whitelist, "© 2024 ACME" hay
+    "10 µm" được nhận là "ascii" thay vì bị nghi là TCVN3.
+    
+    Chuỗi có ít hơn DETECT_MIN_LETTERS chữ cái (tính cả ký tự TCVN3 dịch ra chữ)
+    như "®" hay "©" không bao giờ được nhận là "tcvn3": nhãn là model tốt nhất
+    trong các model còn lại. Text VNI ("Haø Noäi") cũng dùng các byte của TCVN3
+    nên được kiểm tra lại: nếu bản dịch VNI giống tiếng Việt hơn bản dịch TCVN3
+    thì nhãn là "vni".
+    
+    Returns:
+        (nhãn, độ tin cậy 0..1)
+    """
+    if not s or s.isascii():
+        # Chuỗi ASCII thuần: không có gì để convert
+        return "ascii", 1.0
+    
+    model = load_encoding_model()
+    if not _TCVN3_TO_UNI:
+        load_tcvn3_map()
+    letters = sum(1 for c in s if c.isalpha() or c in _TCVN3_TO_UNI)
+    key = _model_key(s)
+    scores = {label: _model_log_likelihood(key, *m) for label, m in model.items()}
+    if letters < DETECT_MIN_LETTERS and len(scores) > 1:
+        scores.pop("tcvn3", None)
+    
+    best = max(scores, key=scores.get)
+    top = scores[best]
+    total = sum(math.exp(v - top) for v in scores.values())
+    if best == "tcvn3" and "unicode" in model:
+        # So hai bản dịch bằng model tiếng Việt Unicode
+        vni_to_unicode = get_charset_converter("vni").to_unicode
+        as_tcvn3 = _model_log_likelihood(_model_key(tcvn3_to_unicode(s)), *model["unicode"])
+        as_vni = _model_log_likelihood(_model_key(vni_to_unicode(s)), *model["unicode"])
+        if as_vni > as_tcvn3:
+            return "vni", 1.0 / (1.0 + math.exp(as_tcvn3 - as_vni))
+    return best, 1.0 / total
+
+
+def tcvn3_to_unicode(s: str, backend: str | None = None) -> str:
     """
     Chuyển chuỗi từ mã TCVN3 (.VnTime) sang Unicode.
-    Tự động load map nếu chưa load.
+    Tự động load map nếu chưa load. Dùng memo cache nếu đã bật (chỉ với backend mặc định).
+    
+    Args:
+        s: Chuỗi TCVN3
+        backend: Tên backend ("translate"/"regex"), None = dùng backend mặc định
     """
     if not s:
         return s
     
+    if _MEMO is not None and backend is None:
+        return _MEMO.lookup(s, 0, _tcvn3_to_unicode)
+    return _tcvn3_to_unicode(s, backend)
+
+
+def _tcvn3_to_unicode(s: str, backend: str | None = None) -> str:
+    """Phần tính thật của tcvn3_to_unicode (không qua memo cache)"""
     # Đảm bảo map đã được load
     if not _TCVN3_TO_UNI:
         load_tcvn3_map()
@@ -221,123 +1196,592 @@ def tcvn3_to_unicode(s: str) -> str:
         # Nếu vẫn không có map, return nguyên bản
         return s
     
-    return _TCVN3_REGEX.sub(lambda m: _TCVN3_TO_UNI.get(m.group(0), m.group(0)), s)
+    return CONVERTER_BACKENDS[backend or _CONVERTER_BACKEND](s)
 
 
-def convert_excel(
-    input_path: str | Path,
-    output_path: str | Path,
-    skip_unicode: bool = True,
-    progress_callback=None,
-    skip_selection: dict = None,
-    highlight_converted: bool = False,
-    highlight_color: str = "#FFFF00",
-) -> ConversionStats:
+def unicode_to_tcvn3(s: str) -> str:
     """
-    Chuyển đổi file Excel từ TCVN3 sang Unicode với các tính năng nâng cao.
+    Chuyển chuỗi Unicode sang mã TCVN3 (.VnTime), chiều ngược của tcvn3_to_unicode.
     
-    Args:
-        input_path: Đường dẫn đến file Excel input (TCVN3)
-        output_path: Đường dẫn đến file Excel output (Unicode)
-        skip_unicode: Nếu True, bỏ qua các cell đã là Unicode chuẩn
-        progress_callback: Hàm callback(sheet_name, sheet_index, total_sheets) để báo tiến trình
-        skip_selection: Dict[cell_id, should_skip] - Custom skip selection
-        highlight_converted: Nếu True, đánh dấu màu cells đã convert
-        highlight_color: Màu highlight (hex color)
-        
-    Returns:
-        ConversionStats: Thống kê chi tiết quá trình convert
+    Input dựng sẵn (NFC) hay tổ hợp (NFD, dấu rời dạng combining mark) đều được
+    chuẩn hóa NFC trước, rồi dịch bằng bảng ngược trong một lần str.translate.
+    .VnTime không có chữ hoa có dấu thanh: chúng được ghi thành chữ thường
+    ("ÒNG Ý" → mã của "òNG ý"); dùng tcvn3_unrepresentable để biết chuỗi nào bị mất
+    thông tin (convert_excel đếm vào ConversionStats.lossy_cells).
     """
-    input_path = Path(input_path)
-    output_path = Path(output_path)
+    if not s:
+        return s
     
-    # Đảm bảo map đã được load (sẽ tự động build nếu chưa có)
-    load_tcvn3_map()
+    if not _TCVN3_TO_UNI:
+        load_tcvn3_map()
     
-    stats = ConversionStats()
-
-    # Đọc toàn bộ sheets
-    from openpyxl import load_workbook
-    from openpyxl.styles import PatternFill
+    if not _UNI_TO_TCVN3:
+        return s
     
-    xls = pd.ExcelFile(input_path, engine="openpyxl")
+    # normalize() có quick-check ở tầng C: chuỗi đã NFC gần như không tốn chi phí
+    s = unicodedata.normalize("NFC", s)
+    if _UNI_TO_TCVN3_TABLE is not None:
+        return s.translate(_UNI_TO_TCVN3_TABLE)
+    return _UNI_TO_TCVN3_REGEX.sub(lambda m: _UNI_TO_TCVN3[m.group(0)], s)
+
+
+def tcvn3_unrepresentable(s: str) -> str:
+    """
+    Các ký tự (không lặp, theo thứ tự xuất hiện) của chuỗi Unicode không biểu diễn
+    chính xác được trong .VnTime: chữ hoa có dấu thanh (unicode_to_tcvn3 ghi thành
+    chữ thường) và ký tự trùng mã TCVN3 của chữ khác (VD: µ đọc lại thành "à").
+    """
+    if not _TCVN3_TO_UNI:
+        load_tcvn3_map()
+    if not s or _TCVN3_LOSSY_RE is None:
+        return ""
+    return "".join(dict.fromkeys(_TCVN3_LOSSY_RE.findall(unicodedata.normalize("NFC", s))))
+
+
+def tcvn3_upper_to_unicode(s: str) -> str:
+    """
+    Chuyển chuỗi gõ bằng font TCVN3 chữ hoa (.VnTimeH, .VnArialH...) sang Unicode.
+    
+    Font "H" đặt chữ hoa có dấu vào đúng mã của chữ thường trong .VnTime và
+    hiển thị mọi chữ cái ở dạng hoa, nên kết quả = tcvn3_to_unicode(s).upper().
+    """
+    return tcvn3_to_unicode(s).upper()
+
+
+def font_encoding(font_name: str | None) -> str:
+    """
+    Suy ra bảng mã của text từ tên font.
+    
+    Returns:
+        "tcvn3_upper" cho font TCVN3 chữ hoa (.VnTimeH, .VnArialH...),
+        "tcvn3" cho font TCVN3 thường (.VnTime, .VnArial, cả "VnTime" không dấu chấm),
+        "unicode" cho mọi font khác (Times New Roman, Arial, Calibri...)
+    """
+    name = (font_name or "").strip()
+    if not _TCVN3_FONT_RE.match(name):
+        return "unicode"
+    return "tcvn3_upper" if name.endswith("H") else "tcvn3"
+
+
+def _font_key(name: str) -> str:
+    """Khóa so sánh tên font: không phân biệt hoa thường, bỏ dấu chấm đầu (".VnTime" = "VnTime")"""
+    return name.strip().lstrip(".").lower()
+
+
+def _normalized_font_map(font_map: Dict[str, str] | None = None) -> Dict[str, str]:
+    """TCVN3_FONT_MAP bổ sung/ghi đè bởi font_map, key đã chuẩn hóa bằng _font_key"""
+    return {_font_key(k): v for k, v in {**TCVN3_FONT_MAP, **(font_map or {})}.items()}
+
+
+def unicode_font_for(font_name: str | None, font_map: Dict[str, str] | None = None) -> str | None:
+    """
+    Tên font Unicode thay cho một font TCVN3.
+    
+    Args:
+        font_name: Tên font hiện tại
+        font_map: Map bổ sung/ghi đè TCVN3_FONT_MAP
+    
+    Returns:
+        Tên font mới, hoặc None nếu không cần/không biết đổi
+    """
+    if not font_name:
+        return None
+    return _normalized_font_map(font_map).get(_font_key(font_name))
+
+
+def _always_unicode(s: str) -> bool:
+    return True
+
+
+def _never_unicode(s: str) -> bool:
+    return False
+
+
+# Với font_aware: bảng mã theo font → (classifier, hàm convert), không cần phân loại từng ký tự
+_FONT_RULES: Dict[str, Tuple[Callable[[str], bool], Callable[[str], str]]] = {
+    "unicode": (_always_unicode, tcvn3_to_unicode),
+    "tcvn3": (_never_unicode, tcvn3_to_unicode),
+    "tcvn3_upper": (_never_unicode, tcvn3_upper_to_unicode),
+}
+
+
+def _check_direction(direction: str, source_charset: str = "tcvn3") -> None:
+    if direction not in DIRECTIONS:
+        raise ValueError(
+            f"direction không hợp lệ: {direction!r}. Chọn một trong: {', '.join(DIRECTIONS)}"
+        )
+    if direction == "to_tcvn3" and source_charset != "tcvn3":
+        raise ValueError('direction="to_tcvn3" chỉ dùng với source_charset="tcvn3"')
+
+
+@dataclass
+class _ConversionRules:
+    """Quy tắc quyết định skip/convert cho một cell chuỗi, dùng chung cho các engine"""
+    is_unicode_text: Callable[[str], bool]
+    convert: Callable[[str], str]
+    skip_unicode: bool = True
+    to_tcvn3: bool = False
+    # sheet -> {(row 1-indexed, col 0-indexed)}: cell đã ở dạng đích nhưng user chọn vẫn convert
+    force_convert: Dict[str, set] = field(default_factory=dict)
+    
+    @classmethod
+    def from_options(cls, is_unicode_text, convert, skip_unicode, to_tcvn3, skip_selection):
+        force = {}
+        for cell_id, should_skip in (skip_selection or {}).items():
+            if should_skip:
+                continue
+            # cell_id = f"{sheet}_{row}_{col}", tên sheet có thể chứa "_"
+            sheet, row, col = cell_id.rsplit("_", 2)
+            force.setdefault(sheet, set()).add((int(row), int(col)))
+        return cls(is_unicode_text, convert, skip_unicode, to_tcvn3, force)
+
+
+def _build_rules(
+    skip_unicode: bool = True,
+    skip_selection: dict | None = None,
+    direction: str = "to_unicode",
+    source_charset: str = "tcvn3",
+    detector: str = "whitelist",
+) -> _ConversionRules:
+    """Kiểm tra tùy chọn và tạo _ConversionRules (dùng chung cho convert_excel, docx, pptx)"""
+    _check_direction(direction, source_charset)
+    
+    # Đảm bảo map đã được load (sẽ tự động build nếu chưa có)
+    charset = get_charset_converter(source_charset)
+    
+    to_tcvn3 = direction == "to_tcvn3"
+    return _ConversionRules.from_options(
+        is_unicode_text=charset.classifier(detector),
+        convert=(
+            unicode_to_tcvn3 if to_tcvn3
+            else tcvn3_to_unicode if source_charset == "tcvn3"
+            else charset.to_unicode
+        ),
+        skip_unicode=skip_unicode,
+        to_tcvn3=to_tcvn3,
+        skip_selection=skip_selection,
+    )
+
+
+def _data_width(row) -> int:
+    """
+    Số cột tính tới ô có dữ liệu cuối cùng của hàng (None/"" ở cuối không tính).
+
+    Giống cách pandas (reader openpyxl) cắt hàng: vùng dữ liệu của sheet là
+    (hàng có dữ liệu cuối cùng) × (độ rộng lớn nhất), nên các engine khác đếm
+    total_cells theo vùng này để khớp với engine pandas.
+    """
+    n = len(row)
+    while n and (row[n - 1] is None or row[n - 1] == ""):
+        n -= 1
+    return n
+
+
+def _convert_sheet_values(
+    values: np.ndarray,
+    sheet: str,
+    rules: _ConversionRules,
+    stats: ConversionStats,
+    highlight_coords: list | None = None,
+    row_offset: int = 0,
+) -> np.ndarray:
+    """
+    Engine vectorized: convert toàn bộ giá trị của một sheet (mảng object 2 chiều).
+    
+    Thay vì duyệt df.iloc từng cell:
+    1. Factorize toàn sheet → mỗi giá trị khác nhau chỉ xuất hiện 1 lần
+    2. Phân loại + convert từng giá trị unique (chuỗi lặp lại chỉ tính 1 lần)
+    3. Đếm thống kê bằng numpy trên mảng mã, scatter kết quả về theo lô
+    
+    Kết quả và ConversionStats giống hệt cách duyệt từng cell (thứ tự log theo hàng).
+    row_offset: số hàng đứng trước mảng này trong sheet (khi xử lý sheet theo từng khối hàng).
+    
+    Returns:
+        Mảng giá trị mới (cùng shape)
+    """
+    values = np.array(values, dtype=object, order="C")
+    stats.total_cells += values.size
+    if values.size == 0:
+        return values
+    
+    n_cols = values.shape[1]
+    flat = values.reshape(-1)
+    # NaN/None → mã -1; chuỗi không bao giờ "bằng" số nên mã của chuỗi luôn chính xác
+    codes, uniques = pd.factorize(flat)
+    
+    n = len(uniques)
+    # Thêm 1 phần tử cuối (False/"") để mã -1 tra ra giá trị trung tính
+    u_text = np.zeros(n + 1, dtype=bool)
+    u_target = np.zeros(n + 1, dtype=bool)
+    u_unicode = np.zeros(n + 1, dtype=bool)
+    u_changed = np.zeros(n + 1, dtype=bool)
+    u_lossy = np.zeros(n + 1, dtype=bool)
+    u_converted = np.empty(n + 1, dtype=object)
+    
+    for i, u in enumerate(uniques):
+        if not isinstance(u, str) or not u.strip():
+            continue
+        u_text[i] = True
+        is_unicode = rules.is_unicode_text(u)
+        u_unicode[i] = is_unicode
+        # Cell đã ở dạng đích: Unicode (to_unicode) hoặc TCVN3 (to_tcvn3)
+        u_target[i] = not is_unicode if rules.to_tcvn3 else is_unicode
+        converted = rules.convert(u)
+        u_converted[i] = converted
+        u_changed[i] = converted != u
+        if rules.to_tcvn3:
+            u_lossy[i] = bool(tcvn3_unrepresentable(u))
+    
+    text_mask = u_text[codes]
+    stats.string_cells += int(text_mask.sum())
+    
+    skip_mask = text_mask & u_target[codes] if rules.skip_unicode else np.zeros_like(text_mask)
+    # Custom skip selection: cell user chọn convert dù đã ở dạng đích
+    for row, col in rules.force_convert.get(sheet, ()):
+        row_idx = row - 1 - row_offset
+        if 0 <= row_idx < values.shape[0] and 0 <= col < n_cols:
+            skip_mask[row_idx * n_cols + col] = False
+    
+    n_skipped = int(skip_mask.sum())
+    if rules.to_tcvn3:
+        stats.already_legacy += n_skipped
+    else:
+        stats.already_unicode += n_skipped
+    
+    process_mask = text_mask & ~skip_mask
+    changed_mask = process_mask & u_changed[codes]
+    n_changed = int(changed_mask.sum())
+    stats.converted_cells += n_changed
+    stats.unchanged_cells += int(process_mask.sum()) - n_changed
+    if rules.to_tcvn3:
+        stats.lossy_cells += int((process_mask & u_lossy[codes]).sum())
+    
+    if not n_changed:
+        return values
+    
+    positions = np.flatnonzero(changed_mask)
+    changed_codes = codes[positions]
+    new_values = u_converted[changed_codes]
+    originals = flat[positions]
+    flat[positions] = new_values
+    
+    for pos, code, original, converted in zip(positions.tolist(), changed_codes.tolist(),
+                                              originals, new_values):
+        row_idx, col_idx = divmod(pos, n_cols)
+        row_idx += row_offset
+        if highlight_coords is not None:
+            # Excel uses 1-indexed
+            highlight_coords.append((sheet, row_idx + 1, col_idx + 1))
+        stats.logs.append(ConversionLog(
+            sheet=sheet,
+            row=row_idx + 1,  # 1-indexed for Excel
+            col=col_idx,
+            col_name=f"Col_{col_idx}",  # Generic column name
+            original=original,
+            converted=converted,
+            was_unicode=bool(u_unicode[code]),
+        ))
+    
+    return values
+
+
+def convert_excel(
+    input_path: str | Path,
+    output_path: str | Path,
+    skip_unicode: bool = True,
+    progress_callback=None,
+    skip_selection: dict = None,
+    highlight_converted: bool = False,
+    highlight_color: str = "#FFFF00",
+    direction: str = "to_unicode",
+    source_charset: str = "tcvn3",
+    detector: str = "whitelist",
+    memo_size: int | None = None,
+    engine: str = "pandas",
+    font_aware: bool = False,
+    remap_fonts: bool = False,
+    font_map: Dict[str, str] | None = None,
+    checkpoint: bool = False,
+    resume: bool = False,
+    cache_dir: str | Path | None = None,
+    cache_max_bytes: int = RESULT_CACHE_MAX_BYTES,
+    workers: int | None = None,
+    on_progress: Callable[[ProgressEvent], None] | None = None,
+    cancel_event=None,
+    progress_every_rows: int = PROGRESS_EVERY_ROWS,
+    progress_interval_ms: int = PROGRESS_INTERVAL_MS,
+) -> ConversionStats:
+    """
+    Chuyển đổi file Excel từ TCVN3 sang Unicode với các tính năng nâng cao.
+    
+    Args:
+        input_path: Đường dẫn đến file Excel input (TCVN3)
+        output_path: Đường dẫn đến file Excel output (Unicode)
+        skip_unicode: Nếu True, bỏ qua các cell đã là Unicode chuẩn
+        progress_callback: Hàm callback(sheet_name, sheet_index, total_sheets) để báo tiến trình
+        skip_selection: Dict[cell_id, should_skip] - Custom skip selection
+        highlight_converted: Nếu True, đánh dấu màu cells đã convert
+        highlight_color: Màu highlight (hex color)
+        direction: "to_unicode" (TCVN3 → Unicode, mặc định) hoặc "to_tcvn3"
+            (Unicode → TCVN3; khi đó skip_unicode bỏ qua các cell đã là TCVN3)
+        source_charset: Bảng mã nguồn trong CHARSETS ("tcvn3", "vni", "viqr", "cp1258")
+        detector: "whitelist" (looks_like_unicode_vietnamese) hoặc "statistical"
+            (detect_source_encoding, ít nhận nhầm hơn với ©, ®, µ...)
+        memo_size: Bật memo cache LRU (số chuỗi tối đa) cho lần convert này;
+            số hit/miss/eviction được ghi vào ConversionStats
+        engine: Cách đọc/ghi workbook:
+            - "pandas": đọc cả sheet vào DataFrame (mặc định)
+            - "streaming": openpyxl read_only/write_only theo khối hàng, bộ nhớ
+              không tăng theo kích thước sheet (cho file rất lớn)
+            - "inplace": mở workbook 1 lần, sửa trực tiếp các cell chuỗi và lưu 1 lần;
+              giữ nguyên font, màu, độ rộng cột, merge, number format, công thức
+            - "xml": chỉ rewrite xl/sharedStrings.xml trong file zip, chép nguyên
+              byte mọi part khác (nhanh nhất; thống kê tính theo từng chuỗi của
+              bảng shared strings, không hỗ trợ highlight/skip_selection)
+        font_aware: Dùng font của cell (và của từng run rich text) để quyết định thay
+            cho detector: font .VnTime/.VnArial... → convert, font .VnTimeH... → convert
+            bằng bảng chữ hoa, font khác → coi là Unicode (bỏ qua nếu skip_unicode).
+            Chỉ dùng với engine="inplace", direction="to_unicode", source_charset="tcvn3"
+        remap_fonts: Sau khi convert, đổi font TCVN3 sang font Unicode trong bảng font
+            của xl/styles.xml (.VnTime → Times New Roman, .VnArial → Arial...), 1 lần
+            cho cả file thay vì đặt font từng cell. Dùng được với mọi engine
+        font_map: Map {font cũ: font mới} bổ sung/ghi đè TCVN3_FONT_MAP khi remap_fonts
+        checkpoint: Lưu checkpoint sau mỗi sheet vào thư mục "<output>.checkpoint"
+            (kết quả từng sheet, ConversionStats, tùy chọn skip); xóa khi convert xong.
+            Chỉ dùng với engine="pandas"
+        resume: Tiếp tục từ sheet cuối cùng đã xong của lần chạy bị dừng giữa chừng
+            (OOM, hủy...); bật luôn checkpoint. Checkpoint của input/tùy chọn khác bị bỏ qua
+        cache_dir: Thư mục cache kết quả theo nội dung (sha256 của input + tùy chọn +
+            phiên bản map). Input đã convert với cùng tùy chọn → chép file kết quả và
+            trả về ConversionStats đã lưu ngay, không convert lại
+        cache_max_bytes: Dung lượng tối đa của cache_dir; vượt thì xóa kết quả dùng lâu nhất
+        workers: Số process convert các sheet song song. None = mặc định của engine
+            (1 với "pandas", số CPU với "xml"); "streaming"/"inplace" chỉ chạy 1 process.
+            Thống kê và log được gộp theo thứ tự sheet gốc, giống hệt khi chạy tuần tự
+        on_progress: Hàm callback(ProgressEvent) báo tiến trình theo hàng (số hàng đã
+            xong, tổng số hàng theo dimension của sheet, ETA). "streaming"/"inplace" báo
+            giữa từng khối hàng; "pandas" báo sau khi đọc và sau khi ghi từng sheet
+            (workers > 1: khi mỗi sheet xong); "xml" báo khi mỗi part xong
+        cancel_event: Object có is_set() (threading.Event...); được kiểm tra ở mỗi lần
+            báo tiến trình, đã set → dừng và ném ConversionCancelled
+        progress_every_rows: on_progress được gọi khi xong thêm ngần này hàng...
+        progress_interval_ms: ...hoặc khi đã qua ngần này ms kể từ sự kiện trước
+        
+    Returns:
+        ConversionStats: Thống kê chi tiết quá trình convert
+    
+    Output được ghi ra file tạm ".<tên>.partial<đuôi>" cùng thư mục rồi os.replace
+    khi xong: bị hủy hoặc lỗi giữa chừng thì file tạm bị xóa và output cũ (nếu có)
+    còn nguyên. Checkpoint (nếu bật) được giữ lại để resume.
+    """
+    input_path = Path(input_path)
+    output_path = Path(output_path)
+    rules = _build_rules(skip_unicode, skip_selection, direction, source_charset, detector)
+    
+    if engine not in ENGINES:
+        raise ValueError(f"engine không hợp lệ: {engine!r}. Chọn một trong: {', '.join(ENGINES)}")
+    
+    if engine == "xml" and highlight_converted:
+        raise ValueError('engine="xml" không hỗ trợ highlight_converted')
+    if workers is not None and workers > 1 and engine in ("streaming", "inplace"):
+        raise ValueError(f'engine="{engine}" không hỗ trợ workers > 1')
+    checkpoint = checkpoint or resume
+    if checkpoint and engine != "pandas":
+        raise ValueError('checkpoint/resume chỉ dùng với engine="pandas"')
+    if font_aware and (engine != "inplace" or rules.to_tcvn3 or source_charset != "tcvn3"):
+        raise ValueError(
+            'font_aware chỉ dùng với engine="inplace", direction="to_unicode", source_charset="tcvn3"'
+        )
+    
+    # Tùy chọn ảnh hưởng tới kết quả: dùng cho checkpoint và khóa cache
+    options = {
+        "skip_unicode": skip_unicode,
+        "skip_selection": skip_selection or {},
+        "direction": direction,
+        "source_charset": source_charset,
+        "detector": detector,
+    }
+    
+    cache = cache_key = None
+    if cache_dir is not None:
+        cache = ResultCache(cache_dir, cache_max_bytes)
+        cache_key = cache.key(input_path, {
+            **options,
+            "output_suffix": output_path.suffix.lower(),
+            "highlight_color": highlight_color if highlight_converted else None,
+            "engine": engine,
+            "font_aware": font_aware,
+            "font_map": (font_map or {}) if remap_fonts else None,
+        })
+        cached = cache.get(cache_key, output_path)
+        if cached is not None:
+            print(f"⚡ Dùng kết quả trong cache: {output_path}")
+            return cached
+    
+    stats = ConversionStats()
+    sheet_rows = None
+    if on_progress is not None:
+        from ooxml_converter import worksheet_row_counts
+        # Engine xml báo tiến trình theo tên part
+        sheet_rows = worksheet_row_counts(input_path, by_part=engine == "xml")
+    tracker = _ProgressTracker(
+        progress_callback, on_progress, cancel_event, progress_every_rows, progress_interval_ms, sheet_rows,
+    )
+    partial = output_path.with_name(f".{output_path.stem}.partial{output_path.suffix}")
+    
+    try:
+        with _memo_scope(memo_size, stats):
+            if engine == "xml":
+                from ooxml_converter import convert_xlsx_xml
+                # Engine xml đổi font ngay trong lượt ghi zip
+                convert_xlsx_xml(
+                    input_path, partial, rules, stats, tracker.sheet_done,
+                    workers=workers, font_map=(font_map or {}) if remap_fonts else None,
+                )
+            elif engine == "streaming":
+                _convert_excel_streaming(
+                    input_path, partial, rules, stats, tracker,
+                    highlight_color if highlight_converted else None,
+                )
+            elif engine == "inplace":
+                _convert_excel_inplace(
+                    input_path, partial, rules, stats, tracker,
+                    highlight_color if highlight_converted else None, font_aware,
+                )
+            else:
+                ckpt = None
+                if checkpoint:
+                    # Tọa độ highlight chỉ được lưu khi có highlight → một phần của dấu vân tay
+                    ckpt = _Checkpoint.open(
+                        input_path, output_path, {**options, "highlight": highlight_converted}, resume,
+                    )
+                _convert_excel_pandas(
+                    input_path, partial, rules, stats, tracker,
+                    highlight_color if highlight_converted else None, ckpt, workers or 1,
+                )
+                if ckpt is not None:
+                    ckpt.finish()
+        
+        if remap_fonts and engine != "xml":
+            from ooxml_converter import remap_workbook_fonts
+            remap_workbook_fonts(partial, font_map)
+        os.replace(partial, output_path)
+    except ConversionCancelled:
+        print(f"🛑 Đã hủy convert, không ghi {output_path}")
+        raise
+    finally:
+        # Bị hủy/lỗi: không để lại file dở dang (sau os.replace file tạm không còn)
+        partial.unlink(missing_ok=True)
+    tracker.finish()
+    if stats.lossy_cells:
+        print(f"⚠️ {stats.lossy_cells} cell có chữ hoa có dấu/ký tự không biểu diễn được trong "
+              f".VnTime (chữ hoa có dấu đã ghi thành chữ thường, xem tcvn3_unrepresentable)")
+    
+    if cache is not None:
+        cache.put(cache_key, output_path, stats)
+    
+    print(f"✅ Ghi xong: {output_path}")
+    return stats
+
+
+def _make_fill(highlight_color: str):
+    from openpyxl.styles import PatternFill
+    color = highlight_color.replace("#", "")
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+def _convert_excel_pandas(
+    input_path: Path,
+    output_path: Path,
+    rules: _ConversionRules,
+    stats: ConversionStats,
+    tracker: _ProgressTracker,
+    highlight_color: str | None = None,
+    checkpoint: "_Checkpoint | None" = None,
+    workers: int = 1,
+) -> None:
+    """
+    Engine "pandas": đọc từng sheet vào DataFrame, convert vectorized, ghi bằng ExcelWriter.
+    Nếu có checkpoint: sheet đã xong ở lần chạy trước được lấy lại từ checkpoint,
+    mỗi sheet mới xong được lưu ngay.
+    
+    workers > 1: các sheet được đọc + convert song song trong process pool; kết quả
+    được ghi và cộng dồn thống kê theo đúng thứ tự sheet gốc (giống hệt khi chạy
+    tuần tự), tiến trình được báo mỗi khi một sheet xong (sheet_index = số
+    sheet đã xong - 1, nên phần trăm luôn tăng dù sheet xong không theo thứ tự).
+    """
+    from openpyxl import load_workbook
+    
+    # Đọc toàn bộ sheets
+    xls = pd.ExcelFile(input_path, engine="openpyxl")
     out_writer = pd.ExcelWriter(output_path, engine="openpyxl")
     
     # For highlighting
     converted_cells_coords = []  # List of (sheet_name, row, col)
 
-    total_sheets = len(xls.sheet_names)
-    skip_selection = skip_selection or {}
+    sheet_names = xls.sheet_names
+    total_sheets = len(sheet_names)
+    highlight = bool(highlight_color)
     
-    for sheet_idx, sheet in enumerate(xls.sheet_names):
-        if progress_callback:
-            progress_callback(sheet, sheet_idx, total_sheets)
+    # Sheet đã có trong checkpoint không cần convert lại
+    results = {}
+    if checkpoint is not None:
+        for sheet_idx, sheet in enumerate(sheet_names):
+            saved = checkpoint.load(sheet_idx, sheet)
+            if saved is not None:
+                results[sheet_idx] = saved
+    
+    pending = [i for i in range(total_sheets) if i not in results]
+    pool = None
+    if workers > 1 and len(pending) > 1:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(pending)))
+    
+    def finished(sheet_idx: int, result: tuple) -> None:
+        if checkpoint is not None and sheet_idx in pending:
+            checkpoint.save(sheet_idx, sheet_names[sheet_idx], *result)
+        results[sheet_idx] = result
+    
+    try:
+        if pool is not None:
+            futures = {
+                pool.submit(_convert_pandas_sheet_task, input_path, sheet_names[i], rules,
+                            _CONVERTER_BACKEND, highlight, _MEMO.maxsize if _MEMO is not None else None): i
+                for i in pending
+            }
+            done_count = total_sheets - len(pending)
+            for future in as_completed(futures):
+                sheet_idx = futures[future]
+                finished(sheet_idx, future.result())
+                tracker.sheet_done(sheet_names[sheet_idx], done_count, total_sheets)
+                done_count += 1
+        
+        for sheet_idx, sheet in enumerate(sheet_names):
+            if pool is None:
+                tracker.start_sheet(sheet, sheet_idx, total_sheets)
+                if sheet_idx not in results:
+                    finished(sheet_idx, _convert_pandas_sheet(xls, sheet, rules, highlight))
             
-        df = pd.read_excel(xls, sheet_name=sheet, header=None, dtype=object)  # Không dùng header tự động
-        stats.sheets_processed += 1
-
-        # Xử lý từng cell (bao gồm cả dòng đầu tiên)
-        for row_idx in range(len(df)):
-            for col_idx in range(len(df.columns)):
-                cell_value = df.iloc[row_idx, col_idx]
-                stats.total_cells += 1
-                
-                # Chỉ xử lý các ô là chuỗi
-                if isinstance(cell_value, str) and cell_value.strip():
-                    stats.string_cells += 1
-                    original = cell_value
-                    
-                    # Kiểm tra xem đã là Unicode chuẩn chưa
-                    # Excel row is 1-indexed, so row_idx + 1
-                    cell_id = f"{sheet}_{row_idx + 1}_{col_idx}"
-                    is_unicode = looks_like_unicode_vietnamese(original)
-                    
-                    if skip_unicode and is_unicode:
-                        # Check custom skip selection
-                        should_skip = skip_selection.get(cell_id, True)
-                        if should_skip:
-                            stats.already_unicode += 1
-                            continue
-                        # Else: User wants to convert even Unicode cells
-                    
-                    # Convert
-                    converted = tcvn3_to_unicode(original)
-                    
-                    # Log nếu có thay đổi
-                    if converted != original:
-                        stats.converted_cells += 1
-                        df.iloc[row_idx, col_idx] = converted
-                        
-                        # Track for highlighting
-                        if highlight_converted:
-                            # Excel uses 1-indexed
-                            converted_cells_coords.append((sheet, row_idx + 1, col_idx + 1))
-                        
-                        # Log chi tiết
-                        log = ConversionLog(
-                            sheet=sheet,
-                            row=row_idx + 1,  # 1-indexed for Excel
-                            col=col_idx,
-                            col_name=f"Col_{col_idx}",  # Generic column name
-                            original=original,
-                            converted=converted,
-                            was_unicode=is_unicode,
-                        )
-                        stats.logs.append(log)
-                    else:
-                        stats.unchanged_cells += 1
+            # Ghi và cộng dồn theo thứ tự sheet gốc → kết quả không phụ thuộc thứ tự xong
+            values, sheet_stats, sheet_coords = results.pop(sheet_idx)
+            if pool is None:
+                tracker.advance(len(values))
+            stats.merge(sheet_stats)
+            converted_cells_coords.extend(sheet_coords)
+            df = pd.DataFrame(values)
 
-        df.to_excel(out_writer, sheet_name=sheet, index=False, header=False)
+            df.to_excel(out_writer, sheet_name=sheet, index=False, header=False)
+            tracker.check_cancel()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
 
     out_writer.close()
     
     # Apply highlighting if requested
-    if highlight_converted and converted_cells_coords:
+    if highlight_color and converted_cells_coords:
         try:
             wb = load_workbook(output_path)
-            fill = PatternFill(start_color=highlight_color.replace("#", ""),
-                             end_color=highlight_color.replace("#", ""),
-                             fill_type="solid")
+            fill = _make_fill(highlight_color)
             
             for sheet_name, row, col in converted_cells_coords:
                 if sheet_name in wb.sheetnames:
@@ -349,14 +1793,474 @@ def convert_excel(
             print(f"🎨 Đã đánh dấu {len(converted_cells_coords)} cells")
         except Exception as e:
             print(f"⚠️ Không thể đánh dấu màu: {e}")
+
+
+def _convert_pandas_sheet(
+    source, sheet: str, rules: _ConversionRules, highlight: bool
+) -> Tuple[np.ndarray, ConversionStats, list]:
+    """
+    Đọc và convert một sheet cho engine "pandas".
     
-    print(f"✅ Ghi xong: {output_path}")
-    return stats
+    Args:
+        source: pd.ExcelFile đã mở hoặc đường dẫn file
+    
+    Returns:
+        (giá trị đã convert, ConversionStats của sheet, tọa độ highlight)
+    """
+    df = pd.read_excel(source, sheet_name=sheet, header=None, dtype=object)  # Không dùng header tự động
+    sheet_stats = ConversionStats(sheets_processed=1)
+    sheet_coords = []
+    
+    # Xử lý toàn sheet (bao gồm cả dòng đầu tiên) bằng engine vectorized
+    values = _convert_sheet_values(
+        df.to_numpy(dtype=object), sheet, rules, sheet_stats,
+        sheet_coords if highlight else None,
+    )
+    return values, sheet_stats, sheet_coords
+
+
+def _convert_pandas_sheet_task(
+    input_path: Path, sheet: str, rules: _ConversionRules, backend: str, highlight: bool,
+    memo_size: int | None = None,
+) -> Tuple[np.ndarray, ConversionStats, list]:
+    """
+    _convert_pandas_sheet chạy trong process worker (mọi tham số đều pickle được).
+    memo_size: cỡ memo cache của process cha; số hit/miss trả về trong stats của sheet
+    """
+    if backend != _CONVERTER_BACKEND:
+        set_converter_backend(backend)
+    counts = ConversionStats()
+    with _memo_scope(memo_size, counts):
+        values, sheet_stats, sheet_coords = _convert_pandas_sheet(input_path, sheet, rules, highlight)
+    sheet_stats.merge(counts)
+    return values, sheet_stats, sheet_coords
+
+
+class _Checkpoint:
+    """
+    Checkpoint theo sheet cho engine "pandas", lưu trong thư mục sidecar "<output>.checkpoint":
+    - state.json: dấu vân tay input + tùy chọn (kể cả skip_selection) + phiên bản map và
+      backend convert, danh sách sheet đã xong
+    - sheet_<i>.pkl: giá trị đã convert, ConversionStats (kèm log) và tọa độ highlight của sheet
+    """
+    
+    def __init__(self, directory: Path, fingerprint: dict, done: Dict[str, str]):
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.done = done  # tên sheet -> file pickle
+    
+    @classmethod
+    def open(cls, input_path: Path, output_path: Path, options: dict, resume: bool) -> "_Checkpoint":
+        directory = output_path.with_name(output_path.name + ".checkpoint")
+        st = input_path.stat()
+        fingerprint = {
+            "version": CHECKPOINT_VERSION,
+            "input": str(input_path.resolve()),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "options": options,
+            # Map/model và backend convert khác → sheet đã lưu không còn đúng
+            "map": _map_version(options.get("source_charset", "tcvn3"),
+                                options.get("detector") == "statistical"),
+            "backend": _CONVERTER_BACKEND,
+        }
+        done = {}
+        state_path = directory / "state.json"
+        if resume and state_path.exists():
+            with state_path.open("r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("fingerprint") == fingerprint:
+                done = state.get("done", {})
+                print(f"♻️ Tiếp tục từ checkpoint: {len(done)} sheet đã xong")
+            else:
+                print("⚠️ Checkpoint không khớp input/tùy chọn hiện tại, convert lại từ đầu")
+        if not done and directory.exists():
+            shutil.rmtree(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        ckpt = cls(directory, fingerprint, done)
+        ckpt._write_state()
+        return ckpt
+    
+    def load(self, sheet_idx: int, sheet: str):
+        """(values, ConversionStats, coords) của sheet đã xong, hoặc None"""
+        name = self.done.get(sheet)
+        if name is None:
+            return None
+        with (self.directory / name).open("rb") as f:
+            return pickle.load(f)
+    
+    def save(self, sheet_idx: int, sheet: str, values: np.ndarray,
+             sheet_stats: ConversionStats, coords: list) -> None:
+        name = f"sheet_{sheet_idx}.pkl"
+        tmp = self.directory / (name + ".tmp")
+        with tmp.open("wb") as f:
+            pickle.dump((values, sheet_stats, coords), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.directory / name)
+        self.done[sheet] = name
+        self._write_state()
+    
+    def _write_state(self) -> None:
+        # Ghi file tạm rồi os.replace: state.json luôn ở trạng thái hợp lệ kể cả khi bị kill
+        tmp = self.directory / "state.json.tmp"
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "done": self.done}, f, ensure_ascii=False)
+        os.replace(tmp, self.directory / "state.json")
+    
+    def finish(self) -> None:
+        """Convert xong: xóa thư mục checkpoint"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class ResultCache:
+    """
+    Cache kết quả convert theo nội dung, lưu trong một thư mục local.
+    
+    Khóa = sha256(nội dung input + tùy chọn + phiên bản map/model + RESULT_CACHE_VERSION),
+    nên cùng một file đến từ nhiều nơi (tên khác nhau) chỉ convert 1 lần. Mỗi entry
+    là thư mục <key[:2]>/<key>/ chứa file kết quả và stats.pkl. Khi tổng dung lượng
+    vượt max_bytes, entry dùng lâu nhất (theo mtime, được cập nhật mỗi lần hit) bị xóa.
+    """
+    
+    def __init__(self, directory: str | Path, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+    
+    @staticmethod
+    def key(input_path: str | Path, options: dict) -> str:
+        """Khóa cache của một input với bộ tùy chọn đã cho"""
+        h = hashlib.sha256()
+        with Path(input_path).open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        meta = {
+            "version": RESULT_CACHE_VERSION,
+            "options": options,
+            "map": _map_version(options.get("source_charset", "tcvn3"),
+                                options.get("detector") == "statistical"),
+        }
+        h.update(json.dumps(meta, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        return h.hexdigest()
+    
+    def _entry(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+    
+    def get(self, key: str, output_path: str | Path) -> ConversionStats | None:
+        """Chép kết quả đã cache ra output_path và trả về stats; None nếu chưa có"""
+        entry = self._entry(key)
+        try:
+            with (entry / "stats.pkl").open("rb") as f:
+                stats = pickle.load(f)
+            shutil.copyfile(entry / "output", output_path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(entry)  # Đánh dấu vừa dùng (LRU)
+        return stats
+    
+    def put(self, key: str, output_path: str | Path, stats: ConversionStats) -> None:
+        """Lưu kết quả (ghi vào thư mục tạm rồi đổi tên → không có entry dở dang)"""
+        entry = self._entry(key)
+        if entry.exists():
+            return
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=entry.parent))
+        try:
+            shutil.copyfile(output_path, tmp / "output")
+            with (tmp / "stats.pkl").open("wb") as f:
+                pickle.dump(stats, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, entry)
+        except OSError:
+            # Process khác vừa lưu cùng khóa, hoặc lỗi ghi đĩa: bỏ qua, cache chỉ là tối ưu
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+    
+    def evict(self) -> None:
+        """Xóa entry dùng lâu nhất cho tới khi tổng dung lượng <= max_bytes"""
+        entries = []
+        total = 0
+        for entry in self.directory.glob("??/*"):
+            if entry.name.startswith(".tmp-"):
+                continue
+            size = sum(f.stat().st_size for f in entry.iterdir())
+            entries.append((entry.stat().st_mtime, size, entry))
+            total += size
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+    
+    def clear(self) -> None:
+        """Xóa toàn bộ cache"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+
+def _map_version(source_charset: str, with_model: bool = False) -> str:
+    """Dấu vân tay của file map (và model nhận diện) đang dùng, để cache tự hết hạn khi map đổi"""
+    h = hashlib.sha256()
+    paths = [CHARSETS[source_charset].map_path]
+    if with_model:
+        paths.append(ENCODING_MODEL_JSON)
+    for path in paths:
+        if path.exists():
+            h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def _convert_excel_streaming(
+    input_path: Path,
+    output_path: Path,
+    rules: _ConversionRules,
+    stats: ConversionStats,
+    tracker: _ProgressTracker,
+    highlight_color: str | None = None,
+    chunk_rows: int = STREAMING_CHUNK_ROWS,
+) -> None:
+    """
+    Engine "streaming": đọc bằng openpyxl read_only/iter_rows, ghi bằng workbook write_only.
+    
+    Mỗi lần chỉ giữ một khối chunk_rows hàng trong bộ nhớ (convert bằng engine
+    vectorized), nên bộ nhớ không tăng theo kích thước sheet. Hàng trống được
+    ghi thẳng ra mà không qua bước phân loại; highlight áp dụng ngay khi ghi.
+    Tiến trình (và lệnh hủy) được kiểm tra sau mỗi khối hàng.
+    """
+    from openpyxl import Workbook, load_workbook
+    
+    # data_only=True: giống pandas (công thức → giá trị đã tính)
+    wb_in = load_workbook(input_path, read_only=True, data_only=True)
+    wb_out = Workbook(write_only=True)
+    fill = _make_fill(highlight_color) if highlight_color else None
+    
+    try:
+        total_sheets = len(wb_in.sheetnames)
+        for sheet_idx, sheet in enumerate(wb_in.sheetnames):
+            tracker.start_sheet(sheet, sheet_idx, total_sheets)
+            
+            ws_in = wb_in[sheet]
+            ws_out = wb_out.create_sheet(title=sheet)
+            stats.sheets_processed += 1
+            
+            rows_done = 0
+            chunk: List[tuple] = []
+            # total_cells của sheet = vùng dữ liệu như pandas (cột/hàng trống ở cuối không tính)
+            cells_before = stats.total_cells
+            data_rows = data_width = 0
+            
+            def flush():
+                nonlocal rows_done
+                width = max(len(r) for r in chunk)
+                values = np.empty((len(chunk), width), dtype=object)
+                for i, r in enumerate(chunk):
+                    values[i, :len(r)] = r
+                coords = [] if fill is not None else None
+                values = _convert_sheet_values(values, sheet, rules, stats, coords, rows_done)
+                marked = {(r - 1, c - 1) for _, r, c in coords} if coords else ()
+                for i, row in enumerate(values.tolist()):
+                    if marked:
+                        row = [
+                            _highlight_cell(ws_out, v, fill) if (rows_done + i, j) in marked else v
+                            for j, v in enumerate(row)
+                        ]
+                    ws_out.append(row)
+                rows_done += len(chunk)
+                chunk.clear()
+                tracker.advance(rows_done)
+            
+            for n, row in enumerate(ws_in.iter_rows(values_only=True), 1):
+                width = _data_width(row)
+                if width:
+                    data_rows, data_width = n, max(data_width, width)
+                if not any(isinstance(v, str) for v in row):
+                    # Vùng không có chuỗi: không cần phân loại/convert
+                    if chunk:
+                        flush()
+                    ws_out.append(row)
+                    rows_done += 1
+                    if rows_done % chunk_rows == 0:
+                        tracker.advance(rows_done)
+                    continue
+                chunk.append(row)
+                if len(chunk) >= chunk_rows:
+                    flush()
+            if chunk:
+                flush()
+            stats.total_cells = cells_before + data_rows * data_width
+        
+        wb_out.save(output_path)
+    except BaseException:
+        # Bị hủy/lỗi giữa chừng: đóng các sheet write_only và xóa file tạm openpyxl
+        # đang ghi dở (nếu không chúng chỉ bị xóa khi thoát process)
+        for ws in wb_out.worksheets:
+            try:
+                ws.close()
+                ws._writer.cleanup()
+            except Exception:
+                pass
+        raise
+    finally:
+        wb_in.close()
+
+
+def _convert_excel_inplace(
+    input_path: Path,
+    output_path: Path,
+    rules: _ConversionRules,
+    stats: ConversionStats,
+    tracker: _ProgressTracker,
+    highlight_color: str | None = None,
+    font_aware: bool = False,
+) -> None:
+    """
+    Engine "inplace": load workbook 1 lần bằng openpyxl, chỉ ghi lại các cell chuỗi
+    cần convert (kèm highlight trong cùng lượt) rồi save 1 lần.
+    
+    Định dạng (font, fill, độ rộng cột, merge, number format), công thức và
+    VBA (.xlsm) được giữ nguyên. Cell công thức không bị đụng tới.
+    
+    font_aware: chia cell theo bảng mã suy ra từ font (font_encoding) và convert
+    mỗi nhóm bằng quy tắc tương ứng trong _FONT_RULES thay vì dùng detector.
+    """
+    from openpyxl import load_workbook
+    
+    try:
+        from openpyxl.cell.rich_text import CellRichText
+    except ImportError:  # openpyxl < 3.1: không đọc được rich text
+        CellRichText = None
+    
+    keep_vba = input_path.suffix.lower() == ".xlsm"
+    if CellRichText is not None:
+        wb = load_workbook(input_path, keep_vba=keep_vba, rich_text=True)
+    else:
+        wb = load_workbook(input_path, keep_vba=keep_vba)
+    fill = _make_fill(highlight_color) if highlight_color else None
+    groups = list(_FONT_RULES) if font_aware else [None]
+    
+    total_sheets = len(wb.worksheets)
+    for sheet_idx, ws in enumerate(wb.worksheets):
+        sheet = ws.title
+        tracker.start_sheet(sheet, sheet_idx, total_sheets)
+        stats.sheets_processed += 1
+        
+        if ws.max_row == 1 and ws.max_column == 1 and ws["A1"].value is None:
+            continue  # Sheet trống
+        
+        # Lấy giá trị chuỗi ra mảng (cell khác → None) rồi convert bằng engine vectorized;
+        # với font_aware mỗi nhóm font có một mảng riêng
+        rows = list(ws.iter_rows(min_row=1, min_col=1))
+        shape = (len(rows), ws.max_column)
+        group_values = {g: np.empty(shape, dtype=object) for g in groups}
+        cell_font_encoding = {}
+        rich_cells = {}
+        data_rows = data_width = 0
+        for i, row in enumerate(rows):
+            if i % STREAMING_CHUNK_ROWS == 0:
+                tracker.advance(i)
+            for j, cell in enumerate(row):
+                v = cell.value
+                if v is not None and v != "":
+                    data_rows, data_width = i + 1, max(data_width, j + 1)
+                if isinstance(v, str) and cell.data_type == "s":
+                    pass
+                elif CellRichText is not None and isinstance(v, CellRichText):
+                    rich_cells[(i, j)] = v
+                    v = str(v)
+                else:
+                    continue
+                g = font_encoding(cell.font.name if cell.font else None) if font_aware else None
+                if g is not None and (i, j) in rich_cells:
+                    # Cell font Unicode nhưng có run font TCVN3: không được skip cả cell
+                    cell_font_encoding[(i, j)] = g
+                    g = next((e for e in _run_encodings(rich_cells[(i, j)], g) if e != "unicode"), g)
+                group_values[g][i, j] = v
+        
+        # Vùng dữ liệu như pandas (cột/hàng trống ở cuối không tính)
+        stats.total_cells += data_rows * data_width
+        coords = []
+        converted = {}
+        first_log = len(stats.logs)
+        for g, values in group_values.items():
+            group_rules = rules
+            if g is not None:
+                is_unicode_text, convert = _FONT_RULES[g]
+                group_rules = replace(rules, is_unicode_text=is_unicode_text, convert=convert)
+            group_stats = ConversionStats()
+            group_coords = []
+            values = _convert_sheet_values(values, sheet, group_rules, group_stats, group_coords)
+            group_stats.total_cells = 0  # Đã tính 1 lần cho cả sheet
+            stats.merge(group_stats)
+            for _, r, c in group_coords:
+                converted[(r - 1, c - 1)] = values[r - 1, c - 1]
+            coords.extend(group_coords)
+        if len(groups) > 1:
+            # Giữ thứ tự log theo hàng như khi không chia nhóm
+            stats.logs[first_log:] = sorted(stats.logs[first_log:], key=lambda log: (log.row, log.col))
+        
+        # Chỉ ghi lại các cell đã đổi
+        sheet_logs = {(log.row, log.col): log for log in stats.logs[first_log:]} if font_aware else {}
+        for (i, j), value in converted.items():
+            cell = rows[i][j]
+            rich = rich_cells.get((i, j))
+            if rich is not None:
+                # Convert từng đoạn để giữ định dạng từng run
+                if font_aware:
+                    # Bảng mã theo font của từng run (run không có rFont dùng font của cell);
+                    # run Unicode chỉ convert khi user không skip
+                    keep_unicode = rules.skip_unicode and (i + 1, j) not in rules.force_convert.get(sheet, ())
+                    encodings = _run_encodings(rich, cell_font_encoding[(i, j)])
+                    for k, (part, g) in enumerate(zip(list(rich), encodings)):
+                        if g == "unicode" and keep_unicode:
+                            continue
+                        if isinstance(part, str):
+                            rich[k] = _FONT_RULES[g][1](part)
+                        else:
+                            part.text = _FONT_RULES[g][1](part.text)
+                else:
+                    for k, part in enumerate(rich):
+                        if isinstance(part, str):
+                            rich[k] = rules.convert(part)
+                        else:
+                            part.text = rules.convert(part.text)
+                cell.value = rich
+                if (i + 1, j) in sheet_logs:
+                    sheet_logs[(i + 1, j)].converted = str(rich)
+            else:
+                cell.value = value
+            if fill is not None:
+                cell.fill = fill
+        if fill is not None and coords:
+            print(f"🎨 Đã đánh dấu {len(coords)} cells ({sheet})")
+        tracker.advance(shape[0])
+    
+    wb.save(output_path)
+
+
+def _run_encodings(rich, cell_encoding: str) -> List[str]:
+    """Bảng mã (font_encoding) của từng đoạn rich text; đoạn không có rFont theo font của cell"""
+    encodings = []
+    for part in rich:
+        font = None if isinstance(part, str) else part.font
+        encodings.append(font_encoding(font.rFont) if font is not None and font.rFont else cell_encoding)
+    return encodings
+
+
+def _highlight_cell(ws, value, fill):
+    from openpyxl.cell import WriteOnlyCell
+    cell = WriteOnlyCell(ws, value=value)
+    cell.fill = fill
+    return cell
 
 
 def preview_conversion(
     input_path: str | Path,
     max_samples: int = 9999999,
+    direction: str = "to_unicode",
+    source_charset: str = "tcvn3",
+    detector: str = "whitelist",
+    progress_callback=None,
+    on_progress: Callable[[ProgressEvent], None] | None = None,
+    cancel_event=None,
 ) -> List[ConversionLog]:
     """
     Xem trước các cell sẽ được convert mà không thực sự ghi file.
@@ -364,54 +2268,75 @@ def preview_conversion(
     Args:
         input_path: Đường dẫn đến file Excel input
         max_samples: Số lượng mẫu tối đa để hiển thị (None = tất cả)
+        direction: "to_unicode" hoặc "to_tcvn3" (xem convert_excel)
+        source_charset: Bảng mã nguồn trong CHARSETS (xem convert_excel)
+        detector: "whitelist" hoặc "statistical" (xem convert_excel)
+        progress_callback: Hàm callback(sheet_name, sheet_index, total_sheets) trước mỗi sheet
+        on_progress: Hàm callback(ProgressEvent) trước và sau khi đọc mỗi sheet
+        cancel_event: Object có is_set(); đã set → ném ConversionCancelled ở sheet kế tiếp
         
     Returns:
         List[ConversionLog]: Danh sách các cell sẽ được convert
     """
+    _check_direction(direction, source_charset)
     input_path = Path(input_path)
-    load_tcvn3_map()
+    charset = get_charset_converter(source_charset)
+    is_unicode_text = charset.classifier(detector)
+    convert = unicode_to_tcvn3 if direction == "to_tcvn3" else charset.to_unicode
     
     samples = []
     xls = pd.ExcelFile(input_path, engine="openpyxl")
+    sheet_rows = None
+    if on_progress is not None:
+        from ooxml_converter import worksheet_row_counts
+        sheet_rows = worksheet_row_counts(input_path)
+    tracker = _ProgressTracker(progress_callback, on_progress, cancel_event, sheet_rows=sheet_rows)
     
-    for sheet in xls.sheet_names:
+    for sheet_idx, sheet in enumerate(xls.sheet_names):
+        if max_samples is not None and len(samples) >= max_samples:
+            break
+        tracker.start_sheet(sheet, sheet_idx, len(xls.sheet_names))
+        
         # Không dùng header tự động để đọc cả dòng 1
         df = pd.read_excel(xls, sheet_name=sheet, header=None, dtype=object)
+        tracker.advance(len(df))
+        values = np.array(df.to_numpy(dtype=object), dtype=object, order="C")
+        if values.size == 0:
+            continue
         
-        for row_idx in range(len(df)):
-            for col_idx in range(len(df.columns)):
-                # Kiểm tra giới hạn nếu có
-                if max_samples is not None and len(samples) >= max_samples:
-                    break
-                    
-                cell_value = df.iloc[row_idx, col_idx]
-                
-                if isinstance(cell_value, str) and cell_value.strip():
-                    original = cell_value
-                    is_unicode = looks_like_unicode_vietnamese(original)
-                    converted = tcvn3_to_unicode(original)
-                    
-                    # Log TẤT CẢ các cell có text (bao gồm cả Unicode)
-                    # để user có thể review đầy đủ
-                    log = ConversionLog(
-                        sheet=sheet,
-                        row=row_idx + 1,  # 1-indexed for Excel
-                        col=col_idx,
-                        col_name=f"Col_{col_idx}",
-                        original=original,
-                        converted=converted,
-                        was_unicode=is_unicode,
-                    )
-                    samples.append(log)
-            
-            # Break outer loop if we have enough samples
-            if max_samples is not None and len(samples) >= max_samples:
-                break
+        n_cols = values.shape[1]
+        flat = values.reshape(-1)
+        codes, uniques = pd.factorize(flat)
+        u_text = np.array(
+            [isinstance(u, str) and bool(u.strip()) for u in uniques] + [False], dtype=bool
+        )
+        positions = np.flatnonzero(u_text[codes])
+        if max_samples is not None:
+            positions = positions[:max_samples - len(samples)]
         
-        # Break sheet loop if we have enough samples
-        if max_samples is not None and len(samples) >= max_samples:
-            break
+        # Phân loại + convert mỗi giá trị unique 1 lần
+        results = {}
+        for pos in positions.tolist():
+            code = codes[pos]
+            if code not in results:
+                original = uniques[code]
+                results[code] = (is_unicode_text(original), convert(original))
+            is_unicode, converted = results[code]
+            row_idx, col_idx = divmod(pos, n_cols)
+            
+            # Log TẤT CẢ các cell có text (bao gồm cả Unicode)
+            # để user có thể review đầy đủ
+            samples.append(ConversionLog(
+                sheet=sheet,
+                row=row_idx + 1,  # 1-indexed for Excel
+                col=col_idx,
+                col_name=f"Col_{col_idx}",
+                original=uniques[code],
+                converted=converted,
+                was_unicode=is_unicode,
+            ))
     
+    tracker.finish()
     return samples
 
 
@@ -435,9 +2360,15 @@ def export_conversion_log(stats: ConversionStats, log_path: str | Path) -> None:
         f.write(f"  - Tổng số cells: {stats.total_cells:,}\n")
         f.write(f"  - Cells chứa text: {stats.string_cells:,}\n")
         f.write(f"  - Đã là Unicode chuẩn: {stats.already_unicode:,}\n")
+        if stats.already_legacy:
+            f.write(f"  - Đã là TCVN3: {stats.already_legacy:,}\n")
         f.write(f"  - Đã convert: {stats.converted_cells:,}\n")
         f.write(f"  - Không đổi: {stats.unchanged_cells:,}\n")
-        f.write(f"  - Số sheets: {stats.sheets_processed}\n\n")
+        f.write(f"  - Số sheets: {stats.sheets_processed}\n")
+        if stats.cache_hits or stats.cache_misses:
+            f.write(f"  - Memo cache: {stats.cache_hits:,} hit / {stats.cache_misses:,} miss"
+                    f" / {stats.cache_evictions:,} eviction\n")
+        f.write("\n")
         
         if stats.logs:
             f.write(f"📝 Chi tiết {len(stats.logs)} cells đã convert:\n")
@@ -453,9 +2384,711 @@ def export_conversion_log(stats: ConversionStats, log_path: str | Path) -> None:
     print(f"✅ Đã xuất log: {log_path}")
 
 
-if __name__ == "__main__":
-    # Ví dụ đường dẫn, đổi lại cho phù hợp
-    convert_excel(
-        r"D:\K\Code\Python\excel_tcvn3_converter\input_tcvn3.xlsx",
-        r"D:\K\Code\Python\excel_tcvn3_converter\output_unicode.xlsx",
+@dataclass
+class StringBatchResult:
+    """Kết quả convert_strings, cùng thứ tự với input"""
+    values: List[Any]
+    is_unicode: List[bool | None]  # Kết quả classifier; None với giá trị không phải chuỗi/chuỗi rỗng
+    stats: ConversionStats
+    unique_strings: int = 0
+
+
+def convert_strings(
+    values,
+    skip_unicode: bool = True,
+    direction: str = "to_unicode",
+    source_charset: str = "tcvn3",
+    detector: str = "whitelist",
+) -> StringBatchResult:
+    """
+    Convert một lô chuỗi (giá trị field từ database, ETL...) trong 1 lần gọi.
+    
+    - Chuỗi lặp lại trong lô chỉ được phân loại/convert 1 lần (factorize)
+    - Phân loại cả lô bằng numpy (_looks_like_unicode_batch) với detector "whitelist"
+    - Các chuỗi được nối bằng _BATCH_SEP và convert bằng đúng 1 lần str.translate
+      cho cả lô, thay vì 1 lần gọi tcvn3_to_unicode cho mỗi chuỗi
+    - Giá trị không phải chuỗi (None, số...) được trả về nguyên vẹn
+    
+    Args:
+        values: Iterable các chuỗi
+        skip_unicode: Bỏ qua chuỗi đã ở dạng đích (xem convert_excel)
+        direction: "to_unicode" hoặc "to_tcvn3" (xem convert_excel)
+        source_charset: Bảng mã nguồn trong CHARSETS (xem convert_excel)
+        detector: "whitelist" hoặc "statistical" (xem convert_excel)
+    
+    Returns:
+        StringBatchResult (stats đếm như cell: total_cells = số phần tử, không có logs)
+    """
+    rules = _build_rules(skip_unicode, None, direction, source_charset, detector)
+    # Bỏ qua memo cache: chuỗi nối của cả lô không nên chiếm chỗ trong cache
+    convert = _tcvn3_to_unicode if rules.convert is tcvn3_to_unicode else rules.convert
+    
+    if not isinstance(values, (list, tuple)):
+        values = list(values)
+    # np.empty + gán: không để numpy tự đoán shape/dtype từ nội dung chuỗi
+    flat = np.empty(len(values), dtype=object)
+    flat[:] = values
+    stats = ConversionStats(total_cells=len(flat))
+    codes, uniques = pd.factorize(flat)
+    
+    n = len(uniques)
+    # Phần tử cuối (mã -1: None/NaN) giữ giá trị trung tính
+    u_text = np.zeros(n + 1, dtype=bool)
+    u_text[:n] = [isinstance(u, str) and u != "" and not u.isspace() for u in uniques]
+    text_idx = np.flatnonzero(u_text)
+    texts = uniques[text_idx].tolist()
+    
+    if detector == "whitelist":
+        is_unicode = get_charset_converter(source_charset).is_unicode_batch(texts)
+    else:
+        is_unicode = np.fromiter(map(rules.is_unicode_text, texts), dtype=bool, count=len(texts))
+    u_unicode = np.full(n + 1, None, dtype=object)
+    u_unicode[text_idx] = is_unicode
+    
+    # Chuỗi đã ở dạng đích: Unicode (to_unicode) hoặc TCVN3 (to_tcvn3)
+    target = ~is_unicode if rules.to_tcvn3 else is_unicode
+    u_skip = np.zeros(n + 1, dtype=bool)
+    if rules.skip_unicode:
+        u_skip[text_idx[target]] = True
+    todo = text_idx[~u_skip[text_idx]]
+    
+    u_out = np.empty(n + 1, dtype=object)
+    u_out[:n] = uniques
+    todo_texts = uniques[todo].tolist()
+    joined = _BATCH_SEP.join(todo_texts)
+    parts = convert(joined).split(_BATCH_SEP) if todo_texts else []
+    if len(parts) == len(todo_texts):
+        u_out[todo] = parts
+    else:
+        # Có chuỗi chứa sẵn _BATCH_SEP: convert riêng từng chuỗi
+        u_out[todo] = [convert(t) for t in todo_texts]
+    u_changed = np.zeros(n + 1, dtype=bool)
+    u_changed[todo] = u_out[todo] != uniques[todo]
+    if rules.to_tcvn3:
+        u_lossy = np.zeros(n + 1, dtype=bool)
+        u_lossy[todo] = [bool(tcvn3_unrepresentable(t)) for t in todo_texts]
+        stats.lossy_cells = int(u_lossy[codes].sum())
+    
+    text_mask = u_text[codes]
+    skip_mask = u_skip[codes]
+    changed_mask = u_changed[codes]
+    n_skipped = int(skip_mask.sum())
+    if rules.to_tcvn3:
+        stats.already_legacy = n_skipped
+    else:
+        stats.already_unicode = n_skipped
+    stats.string_cells = int(text_mask.sum())
+    stats.converted_cells = int(changed_mask.sum())
+    stats.unchanged_cells = stats.string_cells - n_skipped - stats.converted_cells
+    
+    positions = np.flatnonzero(changed_mask)
+    flat[positions] = u_out[codes[positions]]
+    return StringBatchResult(flat.tolist(), u_unicode[codes].tolist(), stats, unique_strings=n)
+
+
+@dataclass
+class TextFileStats:
+    """Kết quả convert một file text/CSV"""
+    encoding: str  # Bảng mã input đã nhận diện (hoặc được chỉ định)
+    confidence: float
+    bytes_read: int = 0
+    bytes_written: int = 0
+    lines_converted: int = 0  # Chỉ tính với input đã là text (UTF-8...), không tính "tcvn3"
+
+
+# Các bảng mã 1 byte kiểu Windows/Latin: file .VnTime thô thường bị nhận nhầm thành chúng
+_SINGLE_BYTE_GUESSES = {
+    "ascii", "windows-1252", "iso-8859-1", "iso-8859-15", "windows-1250",
+    "windows-1254", "windows-1258", "iso-8859-2", "iso-8859-9", "maccyrillic",
+    "mac-roman", "ibm866", "windows-1251", "koi8-r", "tis-620",
+}
+
+
+def detect_file_encoding(path: str | Path, sample_size: int = 1 << 20) -> Tuple[str, float]:
+    """
+    Nhận diện bảng mã của file text từ một mẫu đầu file.
+    
+    Thứ tự: BOM → UTF-8 hợp lệ → chardet (nếu cài) → mặc định "tcvn3"
+    (byte .VnTime thô bị chardet coi là Windows-1252/Latin-1 nên cũng quy về "tcvn3").
+    
+    Returns:
+        (tên codec Python hoặc "tcvn3", độ tin cậy 0..1)
+    """
+    with Path(path).open("rb") as f:
+        sample = f.read(sample_size)
+    
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig", 1.0
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16", 1.0
+    if sample.isascii():
+        return "utf-8", 1.0
+    try:
+        # final=False: mẫu có thể cắt giữa một ký tự nhiều byte
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8", 0.99
+    except UnicodeDecodeError:
+        pass
+    
+    try:
+        import chardet
+    except ImportError:
+        chardet = None
+    if chardet is not None:
+        guess = chardet.detect(sample)
+        encoding = (guess.get("encoding") or "").lower()
+        confidence = guess.get("confidence") or 0.0
+        if encoding and encoding not in _SINGLE_BYTE_GUESSES and confidence >= 0.8:
+            return encoding, confidence
+    
+    label, confidence = detect_source_encoding(sample.decode("cp1252", errors="replace"))
+    return "tcvn3", confidence if label == "tcvn3" else 0.5
+
+
+def _text_split_point(text: str, limit: int) -> int:
+    """
+    Vị trí cắt text thành 2 đoạn (0 < vị trí ≤ limit): sau khoảng trắng cuối cùng
+    trước limit; không có khoảng trắng thì cắt ở limit nhưng không tách dấu rời
+    (combining mark, text NFD) khỏi chữ gốc.
+    """
+    cut = max(text.rfind(" ", 0, limit), text.rfind("\t", 0, limit)) + 1
+    if cut > 0:
+        return cut
+    cut = limit
+    while cut > 1 and unicodedata.combining(text[cut]):
+        cut -= 1
+    return cut
+
+
+def convert_text_file(
+    input_path: str | Path,
+    output_path: str | Path,
+    encoding: str | None = None,
+    skip_unicode: bool = True,
+    chunk_size: int = TEXT_CHUNK_BYTES,
+) -> TextFileStats:
+    """
+    Chuyển file text/CSV TCVN3 sang UTF-8, bộ nhớ cố định với file nhiều GB.
+    
+    - Byte .VnTime thô (dump FoxPro/Access): mmap file rồi decode từng khối lớn
+      qua bảng charmap 256 byte (codec "tcvn3") thẳng ra UTF-8, không qua bước
+      đọc nhầm cp1252 rồi sửa lại.
+    - File đã là text (UTF-8/UTF-16... chứa ký tự TCVN3 bị đọc nhầm): decode
+      incremental, convert từng dòng bằng tcvn3_to_unicode (bỏ qua dòng đã là
+      Unicode nếu skip_unicode). Dòng dài hơn chunk_size (file không có xuống
+      dòng) được ghi theo từng đoạn, cắt ở khoảng trắng, phân loại theo đoạn đầu
+      không phải ASCII.
+    
+    Args:
+        input_path: File input
+        output_path: File output (UTF-8, không BOM)
+        encoding: Bảng mã input; None = tự nhận diện (detect_file_encoding)
+        skip_unicode: Bỏ qua các dòng đã là Unicode chuẩn (chỉ với input dạng text)
+        chunk_size: Số byte mỗi khối đọc
+        
+    Returns:
+        TextFileStats
+    """
+    import mmap
+    
+    input_path = Path(input_path)
+    output_path = Path(output_path)
+    if encoding is None:
+        encoding, confidence = detect_file_encoding(input_path)
+    else:
+        encoding, confidence = encoding.lower(), 1.0
+    result = TextFileStats(encoding=encoding, confidence=confidence)
+    print(f"🔎 Bảng mã input: {encoding} ({confidence:.0%})")
+    
+    size = input_path.stat().st_size
+    with input_path.open("rb") as fin, output_path.open("wb") as fout:
+        if size == 0:
+            return result
+        with mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if encoding in TCVN3_CODEC_NAMES:
+                if _TCVN3_DECODING_TABLE is None:
+                    register_tcvn3_codec()
+                # Mã 1 byte: cắt khối ở đâu cũng được
+                for start in range(0, size, chunk_size):
+                    text = codecs.charmap_decode(
+                        mm[start:start + chunk_size], "strict", _TCVN3_DECODING_TABLE
+                    )[0]
+                    result.bytes_written += fout.write(text.encode("utf-8"))
+            else:
+                decoder = codecs.getincrementaldecoder(encoding)()
+                pending = ""
+                # Dòng quá dài được ghi thành nhiều đoạn: phân loại 1 lần theo đoạn đầu
+                # không phải ASCII, nhớ đã có đoạn nào bị đổi chưa
+                line_unicode = None
+                line_changed = False
+                for start in range(0, size, chunk_size):
+                    final = start + chunk_size >= size
+                    text = pending + decoder.decode(mm[start:start + chunk_size], final=final)
+                    lines = text.splitlines(keepends=True)
+                    # Dòng cuối chưa hết (chưa có xuống dòng) để dành cho khối sau
+                    pending = ""
+                    whole = len(lines)
+                    if lines and not final and not lines[-1].endswith(("\n", "\r")):
+                        pending = lines.pop()
+                        whole -= 1
+                        # File không có xuống dòng: không giữ cả file trong pending
+                        if len(pending) > chunk_size:
+                            cut = _text_split_point(pending, chunk_size)
+                            lines.append(pending[:cut])
+                            pending = pending[cut:]
+                    out = []
+                    for k, line in enumerate(lines):
+                        if line.isascii():
+                            converted = line  # Không có gì để convert, chưa đủ để phân loại
+                        else:
+                            if line_unicode is None:
+                                line_unicode = skip_unicode and looks_like_unicode_vietnamese(line)
+                            converted = line if line_unicode else tcvn3_to_unicode(line)
+                        line_changed = line_changed or converted != line
+                        if k < whole:
+                            result.lines_converted += line_changed
+                            line_unicode, line_changed = None, False
+                        out.append(converted)
+                    result.bytes_written += fout.write("".join(out).encode("utf-8"))
+        result.bytes_read = size
+    
+    print(f"✅ Ghi xong: {output_path} ({result.bytes_read:,} → {result.bytes_written:,} bytes)")
+    return result
+
+
+# Đuôi file → loại input cho convert_batch
+EXCEL_SUFFIXES = (".xlsx", ".xlsm")
+WORD_SUFFIXES = (".docx", ".docm")
+POWERPOINT_SUFFIXES = (".pptx", ".pptm")
+TEXT_SUFFIXES = (".txt", ".csv", ".tsv", ".prn")
+BATCH_SUFFIXES = EXCEL_SUFFIXES + WORD_SUFFIXES + POWERPOINT_SUFFIXES + TEXT_SUFFIXES
+
+# Ước lượng bộ nhớ một file cần khi convert (bội số kích thước file) cho memory_budget;
+# file .xlsx là zip nén nên DataFrame/workbook trong bộ nhớ lớn hơn nhiều lần
+BATCH_MEMORY_FACTOR = {"pandas": 40, "inplace": 40, "streaming": 4, "xml": 2}
+BATCH_PROCESS_OVERHEAD = 150 << 20
+# Số lần thử lại một file khi process worker chết đột ngột (hết bộ nhớ...)
+BATCH_MAX_ATTEMPTS = 2
+
+
+@dataclass
+class BatchFileResult:
+    """Kết quả convert một file trong convert_batch"""
+    input_path: str
+    output_path: str
+    size: int = 0
+    ok: bool = False
+    error: str | None = None
+    seconds: float = 0.0
+    stats: Any = None  # ConversionStats (Excel/Word/PowerPoint) hoặc TextFileStats
+    attempts: int = 0
+
+
+@dataclass
+class BatchResult:
+    """Kết quả convert_batch: từng file (theo thứ tự input) + thống kê cộng dồn"""
+    files: List[BatchFileResult]
+    totals: ConversionStats
+    
+    @property
+    def failed(self) -> List[BatchFileResult]:
+        return [r for r in self.files if not r.ok]
+
+
+def expand_inputs(inputs) -> List[Path]:
+    """
+    Mở rộng danh sách input: đường dẫn file, thư mục (các file hỗ trợ ngay trong
+    thư mục) hoặc glob ("data/**/*.xlsx"). Bỏ trùng, giữ thứ tự xuất hiện.
+    
+    Raises:
+        FileNotFoundError: File không tồn tại hoặc glob không khớp file nào
+    """
+    import glob
+    
+    if isinstance(inputs, (str, Path)):
+        inputs = [inputs]
+    found: Dict[Path, None] = {}
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            matches = sorted(p for p in path.iterdir() if p.suffix.lower() in BATCH_SUFFIXES)
+        elif glob.has_magic(str(item)):
+            matches = sorted(Path(p) for p in glob.glob(str(item), recursive=True))
+            if not any(m.is_file() for m in matches):
+                raise FileNotFoundError(f"Không có file nào khớp: {item}")
+        else:
+            matches = [path]
+        for m in matches:
+            if m.is_file() and not m.name.startswith("~$"):  # Bỏ file khóa của Office
+                found.setdefault(m, None)
+            elif not m.exists():
+                raise FileNotFoundError(f"Không tìm thấy input: {m}")
+    return list(found)
+
+
+def plan_batch(
+    inputs,
+    out_dir: str | Path,
+    output_template: str = "{stem}{suffix}",
+) -> List[BatchFileResult]:
+    """
+    Lập kế hoạch convert_batch (không convert): mỗi input → đường dẫn output,
+    sắp xếp file lớn trước.
+    
+    Args:
+        inputs: File, thư mục hoặc glob (xem expand_inputs)
+        out_dir: Thư mục output
+        output_template: Tên file output; biến {stem}, {suffix}, {name}, {parent}
+    """
+    out_dir = Path(out_dir)
+    plan = []
+    for path in expand_inputs(inputs):
+        output = out_dir / output_template.format(
+            stem=path.stem, suffix=path.suffix, name=path.name, parent=path.parent.name,
+        )
+        if output.resolve() == path.resolve():
+            raise ValueError(f"Output trùng với input: {path}")
+        plan.append(BatchFileResult(str(path), str(output), size=path.stat().st_size))
+    # File lớn trước: file khổng lồ không bị dồn về cuối làm pool chờ 1 process
+    plan.sort(key=lambda r: r.size, reverse=True)
+    return plan
+
+
+def _check_file_options(kind: str, options: dict, supported: Tuple[str, ...]) -> dict:
+    """
+    Tách các tùy chọn mà loại file hỗ trợ; tùy chọn khác khác giá trị mặc định của
+    convert_excel (loại file đó không làm được) → ValueError thay vì bỏ qua im lặng.
+    workers chỉ là mức song song nên luôn được bỏ qua.
+    """
+    import inspect
+    
+    defaults = {name: p.default for name, p in inspect.signature(convert_excel).parameters.items()}
+    unsupported = sorted(
+        k for k, v in options.items()
+        if k not in supported and k != "workers" and (k not in defaults or v != defaults[k])
     )
+    if unsupported:
+        raise ValueError(f"File {kind} không hỗ trợ tùy chọn: {', '.join(unsupported)}")
+    return {k: v for k, v in options.items() if k in supported}
+
+
+def convert_file(input_path: str | Path, output_path: str | Path, **options):
+    """
+    Convert một file bất kỳ theo đuôi: Excel → convert_excel, Word → convert_docx,
+    PowerPoint → convert_pptx, text/CSV → convert_text_file.
+    
+    Raises:
+        ValueError: Có tùy chọn (khác mặc định) mà loại file đó không hỗ trợ,
+            VD engine/highlight_converted với .docx, direction với file text
+    
+    Returns:
+        ConversionStats, hoặc TextFileStats với file text
+    """
+    suffix = Path(input_path).suffix.lower()
+    if suffix in WORD_SUFFIXES or suffix in POWERPOINT_SUFFIXES:
+        from ooxml_converter import convert_docx, convert_pptx
+        
+        fn = convert_docx if suffix in WORD_SUFFIXES else convert_pptx
+        keys = ("skip_unicode", "progress_callback", "direction", "source_charset", "detector")
+        return fn(input_path, output_path, **_check_file_options(suffix, options, keys))
+    if suffix in TEXT_SUFFIXES:
+        return convert_text_file(
+            input_path, output_path, **_check_file_options(suffix, options, ("skip_unicode",))
+        )
+    return convert_excel(input_path, output_path, **options)
+
+
+def _batch_task(item: BatchFileResult, options: dict, keep_logs: bool, quiet: bool) -> BatchFileResult:
+    """
+    Convert một file trong process worker; mọi lỗi được bắt lại và trả về trong kết quả.
+    
+    Song song theo file đã do pool bên ngoài đảm nhận: file chạy với workers=1 để engine
+    (VD "xml", mặc định số CPU) không tạo thêm pool lồng → số CPU × số CPU process.
+    """
+    import contextlib
+    
+    start = time.perf_counter()
+    redirect = contextlib.redirect_stdout(sys.stderr) if quiet else contextlib.nullcontext()
+    with redirect:
+        try:
+            Path(item.output_path).parent.mkdir(parents=True, exist_ok=True)
+            stats = convert_file(item.input_path, item.output_path, **{**options, "workers": 1})
+            if isinstance(stats, ConversionStats) and not keep_logs:
+                stats.logs = []
+            item.stats = stats
+            item.ok = True
+        except Exception as e:
+            item.ok = False
+            item.error = f"{type(e).__name__}: {e}"
+    item.seconds = time.perf_counter() - start
+    return item
+
+
+def _warm_worker(options: dict) -> None:
+    """
+    Initializer của process pool chạy lâu (watch, HTTP): load sẵn map, model và
+    import openpyxl trong từng process để file đầu tiên không phải chờ.
+    """
+    import openpyxl  # noqa: F401
+    
+    detector = options.get("detector", "whitelist")
+    _build_rules(
+        direction=options.get("direction", "to_unicode"),
+        source_charset=options.get("source_charset", "tcvn3"),
+        detector=detector,
+    )
+    if detector == "statistical":
+        load_encoding_model()
+
+
+def convert_batch(
+    inputs,
+    out_dir: str | Path,
+    workers: int | None = None,
+    memory_budget: int | None = None,
+    output_template: str = "{stem}{suffix}",
+    on_result: Callable[[BatchFileResult], None] | None = None,
+    keep_logs: bool = False,
+    quiet: bool = False,
+    **options,
+) -> BatchResult:
+    """
+    Convert nhiều file song song trong process pool.
+    
+    - File lớn được xếp chạy trước, file nhỏ lấp chỗ trống về sau
+    - memory_budget giới hạn tổng bộ nhớ ước lượng (BATCH_MEMORY_FACTOR theo engine)
+      của các file đang chạy cùng lúc; luôn chạy được ít nhất 1 file
+    - Lỗi của một file không ảnh hưởng file khác; process worker chết (hết bộ nhớ)
+      thì các file đang chạy được thử lại tối đa BATCH_MAX_ATTEMPTS lần
+    
+    Args:
+        inputs: File, thư mục hoặc glob (xem expand_inputs)
+        out_dir: Thư mục output
+        workers: Số process (None = số CPU)
+        memory_budget: Byte bộ nhớ tối đa cho các file đang chạy (None = không giới hạn)
+        output_template: Tên file output (xem plan_batch)
+        on_result: callback(BatchFileResult) mỗi khi một file xong (theo thứ tự xong)
+        keep_logs: Giữ ConversionStats.logs của từng file (mặc định bỏ để tiết kiệm bộ nhớ)
+        quiet: Chuyển thông báo của các hàm convert sang stderr (stdout dành cho JSON)
+        **options: Tùy chọn cho convert_file/convert_excel (engine, skip_unicode, ...)
+    
+    Returns:
+        BatchResult (files theo thứ tự kế hoạch: file lớn trước)
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from concurrent.futures.process import BrokenProcessPool
+    
+    plan = plan_batch(inputs, out_dir, output_template)
+    totals = ConversionStats()
+    if not plan:
+        return BatchResult([], totals)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(plan)))
+    factor = BATCH_MEMORY_FACTOR.get(options.get("engine", "pandas"), 40)
+    
+    def estimate(item: BatchFileResult) -> int:
+        return item.size * factor + BATCH_PROCESS_OVERHEAD
+    
+    queue = list(plan)
+    running = {}  # future -> (item, bộ nhớ ước lượng)
+    in_use = 0
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while queue or running:
+            # First-fit theo thứ tự giảm dần kích thước trong giới hạn bộ nhớ.
+            # File đang thử lại (sau khi process chết) chạy một mình để biết chắc thủ phạm
+            i = 0
+            while i < len(queue) and len(running) < workers:
+                if any(r.attempts > 1 for r, _ in running.values()):
+                    break
+                item = queue[i]
+                need = estimate(item)
+                if running and (item.attempts or (
+                        memory_budget is not None and in_use + need > memory_budget)):
+                    i += 1
+                    continue
+                queue.pop(i)
+                item.attempts += 1
+                running[pool.submit(_batch_task, item, options, keep_logs, quiet)] = (item, need)
+                in_use += need
+            
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                item, need = running.pop(future)
+                in_use -= need
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    if item.attempts < BATCH_MAX_ATTEMPTS:
+                        queue.insert(0, item)
+                        continue
+                    item.ok = False
+                    item.error = "BrokenProcessPool: process worker bị dừng đột ngột (hết bộ nhớ?)"
+                    result = item
+                # Kết quả từ process khác là object mới: chép vào item của kế hoạch
+                item.__dict__.update(result.__dict__)
+                if item.ok and isinstance(item.stats, ConversionStats):
+                    totals.merge(item.stats)
+                if on_result:
+                    on_result(item)
+            if broken:
+                # Pool hỏng: các file còn đang chạy cũng bị mất → tạo pool mới và thử lại
+                for item, need in running.values():
+                    queue.insert(0, item)
+                running.clear()
+                in_use = 0
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=workers)
+                queue.sort(key=lambda r: r.size, reverse=True)
+    finally:
+        pool.shutdown(cancel_futures=True)
+    
+    return BatchResult(plan, totals)
+
+
+def _stats_dict(stats) -> dict | None:
+    """ConversionStats/TextFileStats → dict cho JSON (bỏ logs)"""
+    if stats is None:
+        return None
+    from dataclasses import asdict
+    d = asdict(stats)
+    d.pop("logs", None)
+    return d
+
+
+def _result_dict(result: BatchFileResult) -> dict:
+    return {
+        "input": result.input_path,
+        "output": result.output_path,
+        "size": result.size,
+        "ok": result.ok,
+        "error": result.error,
+        "seconds": round(result.seconds, 3),
+        "stats": _stats_dict(result.stats),
+    }
+
+
+def _add_conversion_arguments(ap) -> None:
+    """Tùy chọn convert dùng chung cho các command line (batch, watch)"""
+    ap.add_argument("--engine", choices=ENGINES, default="pandas")
+    ap.add_argument("--direction", choices=DIRECTIONS, default="to_unicode")
+    ap.add_argument("--source-charset", choices=list(CHARSETS), default="tcvn3")
+    ap.add_argument("--detector", choices=DETECTORS, default="whitelist")
+    ap.add_argument("--no-skip-unicode", action="store_true", help="Convert cả cell đã là Unicode")
+    ap.add_argument("--highlight", action="store_true", help="Đánh dấu màu cell đã convert")
+    ap.add_argument("--remap-fonts", action="store_true", help="Đổi font .Vn* sang font Unicode")
+    ap.add_argument("--cache-dir", default=None, help="Thư mục cache kết quả theo nội dung")
+
+
+def _conversion_options(args) -> dict:
+    """Namespace của _add_conversion_arguments → **options cho convert_file"""
+    options = {
+        "engine": args.engine,
+        "direction": args.direction,
+        "source_charset": args.source_charset,
+        "detector": args.detector,
+        "skip_unicode": not args.no_skip_unicode,
+        "highlight_converted": args.highlight,
+        "remap_fonts": args.remap_fonts,
+    }
+    if args.cache_dir:
+        options["cache_dir"] = args.cache_dir
+    return options
+
+
+def main(argv: List[str] | None = None) -> int:
+    """
+    Command line: python -m convert_excel_tcvn3 INPUT... -o OUT_DIR [tùy chọn]
+    
+    Returns:
+        Exit code: 0 nếu mọi file thành công, 1 nếu có file lỗi, 2 nếu sai tham số
+        hoặc input không có file nào
+    """
+    import argparse
+    import contextlib
+    
+    ap = argparse.ArgumentParser(
+        prog="python -m convert_excel_tcvn3",
+        description="Convert file Excel/Word/PowerPoint/text TCVN3 sang Unicode (hàng loạt)",
+    )
+    ap.add_argument("inputs", nargs="+", help="File, thư mục hoặc glob (VD: \"data/**/*.xlsx\")")
+    ap.add_argument("-o", "--out-dir", default="output_unicode", help="Thư mục output")
+    ap.add_argument("-t", "--template", default="{stem}{suffix}",
+                    help="Tên file output, biến {stem} {suffix} {name} {parent}")
+    ap.add_argument("-j", "--jobs", type=int, default=None, help="Số process (mặc định: số CPU)")
+    _add_conversion_arguments(ap)
+    ap.add_argument("--memory-budget", type=int, default=None, metavar="MB",
+                    help="Giới hạn bộ nhớ ước lượng cho các file chạy cùng lúc")
+    ap.add_argument("--dry-run", action="store_true", help="Chỉ in kế hoạch, không convert")
+    fmt = ap.add_mutually_exclusive_group()
+    fmt.add_argument("--json", action="store_true", help="In kết quả dạng 1 JSON trên stdout")
+    fmt.add_argument("--jsonl", action="store_true", help="In mỗi file 1 dòng JSON khi xong")
+    args = ap.parse_args(argv)
+    
+    machine = args.json or args.jsonl
+    out = sys.stdout
+    
+    def emit(obj) -> None:
+        out.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        out.flush()
+    
+    # Stdout dành cho JSON: mọi thông báo khác sang stderr
+    redirect = contextlib.redirect_stdout(sys.stderr) if machine else contextlib.nullcontext()
+    with redirect:
+        try:
+            if args.dry_run:
+                plan = plan_batch(args.inputs, args.out_dir, args.template)
+                if not plan:
+                    raise FileNotFoundError("Không có file nào để convert")
+                rows = [{"input": r.input_path, "output": r.output_path, "size": r.size} for r in plan]
+                if args.json:
+                    emit({"dry_run": True, "files": rows})
+                elif args.jsonl:
+                    for row in rows:
+                        emit(row)
+                else:
+                    for row in rows:
+                        print(f"📄 {row['input']} → {row['output']} ({row['size']:,} bytes)")
+                    print(f"📋 {len(rows)} file (dry run, chưa convert)")
+                return 0
+            
+            def on_result(result: BatchFileResult) -> None:
+                if args.jsonl:
+                    emit(_result_dict(result))
+                elif not args.json:
+                    if result.ok:
+                        converted = getattr(result.stats, "converted_cells", None)
+                        detail = f"{converted:,} cells" if converted is not None else "text"
+                        print(f"✅ {result.input_path} → {result.output_path} ({detail}, {result.seconds:.1f}s)")
+                    else:
+                        print(f"❌ {result.input_path}: {result.error}")
+            
+            options = _conversion_options(args)
+            result = convert_batch(
+                args.inputs, args.out_dir, workers=args.jobs,
+                memory_budget=args.memory_budget << 20 if args.memory_budget else None,
+                output_template=args.template, on_result=on_result, quiet=machine, **options,
+            )
+            if not result.files:
+                raise FileNotFoundError("Không có file nào để convert")
+        except (FileNotFoundError, ValueError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+    
+    if args.json:
+        emit({"files": [_result_dict(r) for r in result.files], "totals": _stats_dict(result.totals)})
+    elif args.jsonl:
+        emit({"totals": _stats_dict(result.totals), "failed": len(result.failed)})
+    else:
+        t = result.totals
+        print(f"📊 {len(result.files) - len(result.failed)}/{len(result.files)} file thành công, "
+              f"{t.converted_cells:,} cells đã convert")
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    # Chạy main() của module đã import (không phải bản __main__) để process worker
+    # và pickle dùng chung đúng một bản module convert_excel_tcvn3
+    from convert_excel_tcvn3 import main as _main
+    sys.exit(_main())
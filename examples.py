@@ -5,6 +5,7 @@ Example script: Sử dụng các API mới
 
 from pathlib import Path
 from convert_excel_tcvn3 import (
+    convert_batch,
     convert_excel,
     preview_conversion,
     export_conversion_log,
@@ -83,23 +84,24 @@ def example_4_batch_conversion():
     
     input_dir = Path("input_folder")
     output_dir = Path("output_folder")
-    output_dir.mkdir(exist_ok=True)
     
-    excel_files = list(input_dir.glob("*.xlsx"))
-    print(f"\nTìm thấy {len(excel_files)} files Excel")
-    
-    for i, file in enumerate(excel_files, 1):
-        print(f"\n[{i}/{len(excel_files)}] Processing: {file.name}")
-        
-        output_file = output_dir / f"{file.stem}_unicode.xlsx"
-        
-        try:
-            stats = convert_excel(file, output_file, skip_unicode=True)
-            print(f"   ✅ Converted {stats.converted_cells} cells")
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
+    def on_result(result):
+        if result.ok:
+            print(f"   ✅ {result.input_path}: {result.stats.converted_cells} cells")
+        else:
+            print(f"   ❌ {result.input_path}: {result.error}")
+    
+    # Chạy song song (mỗi file 1 process, file lớn trước), lỗi file này không ảnh hưởng file khác
+    result = convert_batch(
+        input_dir / "*.xlsx",
+        output_dir,
+        output_template="{stem}_unicode{suffix}",
+        on_result=on_result,
+        skip_unicode=True,
+    )
     
-    print(f"\n✅ Hoàn thành batch conversion!")
+    print(f"\n✅ Hoàn thành batch conversion: {len(result.files)} files, "
+          f"{len(result.failed)} lỗi, {result.totals.converted_cells} cells đã convert")
 
 
 def example_5_check_unicode():
@@ -0,0 +1,549 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP service cục bộ cho convert_excel / preview_conversion (chỉ dùng thư viện chuẩn).
+
+Thay cho việc front-end gọi một process Python mới cho mỗi request:
+- Upload được stream thẳng ra file tạm (Content-Length hoặc chunked), không giữ
+  cả file trong bộ nhớ
+- Việc convert chạy trong process pool tạo 1 lần, nạp sẵn map (_warm_worker)
+- File kết quả được stream về theo khối, thống kê nằm ở header X-Conversion-Stats
+- Giới hạn số request đồng thời: tối đa `workers` job chạy, `max_queue` request
+  chờ; vượt quá thì trả 503 + Retry-After ngay, trước khi nhận upload
+
+Endpoint:
+  POST /convert?filename=a.xlsx&engine=xml&...  body = file → file đã convert
+  POST /preview?max_samples=50&...              body = file Excel → JSON các cell
+  POST /strings?direction=...                   body = mảng JSON hoặc mỗi dòng 1 chuỗi
+                                                → JSON chuỗi đã convert + phân loại
+  GET  /metrics                                 → JSON số request đang chạy/chờ...
+  GET  /health                                  → {"status": "ok"}
+
+Usage:
+  python http_converter.py --port 8765 -j 4
+  curl --data-binary @input_tcvn3.xlsx -o out.xlsx "http://127.0.0.1:8765/convert?filename=input_tcvn3.xlsx"
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import parse_qsl, quote, urlsplit
+
+from convert_excel_tcvn3 import (
+    BATCH_SUFFIXES,
+    CHARSETS,
+    DETECTORS,
+    DIRECTIONS,
+    ENGINES,
+    EXCEL_SUFFIXES,
+    BatchFileResult,
+    _batch_task,
+    _stats_dict,
+    _warm_worker,
+    convert_strings,
+    preview_conversion,
+)
+
+# Khối đọc/ghi khi stream upload/download
+HTTP_CHUNK = 1 << 16
+HTTP_MAX_HEADER_BYTES = 64 << 10
+HTTP_MAX_UPLOAD_BYTES = 512 << 20
+# Thời gian tối đa chờ client gửi xong phần header (giây)
+HTTP_HEADER_TIMEOUT = 30
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    411: "Length Required", 413: "Payload Too Large", 422: "Unprocessable Entity",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+_CONTENT_TYPES = {
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".xlsm": "application/vnd.ms-excel.sheet.macroEnabled.12",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".docm": "application/vnd.ms-word.document.macroEnabled.12",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ".pptm": "application/vnd.ms-powerpoint.presentation.macroEnabled.12",
+    ".csv": "text/csv; charset=utf-8",
+}
+# Tham số query → tùy chọn convert: (tên, các giá trị hợp lệ hoặc bool)
+_QUERY_OPTIONS = {
+    "engine": ENGINES,
+    "direction": DIRECTIONS,
+    "source_charset": tuple(CHARSETS),
+    "detector": DETECTORS,
+    "skip_unicode": bool,
+    "highlight_converted": bool,
+    "remap_fonts": bool,
+}
+# Tùy chọn có nghĩa với /strings
+_STRING_OPTIONS = ("skip_unicode", "direction", "source_charset", "detector")
+
+
+class HttpError(Exception):
+    """Lỗi trả về cho client với mã HTTP tương ứng"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _convert_job(input_path: str, output_path: str, options: dict) -> BatchFileResult:
+    """Chạy trong process worker: convert 1 file (lỗi được trả về trong kết quả)"""
+    result = _batch_task(BatchFileResult(input_path, output_path), options, keep_logs=False, quiet=True)
+    result.stats = _stats_dict(result.stats)
+    return result
+
+
+def _preview_job(input_path: str, max_samples: int, options: dict) -> List[dict]:
+    """Chạy trong process worker: preview_conversion → list dict"""
+    keys = ("direction", "source_charset", "detector")
+    samples = preview_conversion(
+        input_path, max_samples=max_samples, **{k: v for k, v in options.items() if k in keys}
+    )
+    return [asdict(s) for s in samples]
+
+
+def _strings_job(body: bytes, is_json: bool, options: dict) -> bytes:
+    """
+    Chạy trong process worker: parse body, convert_strings, trả về JSON đã encode
+    (chỉ 1 object bytes đi qua pickle mỗi chiều, không phải hàng triệu chuỗi).
+    """
+    text = body.decode("utf-8-sig")
+    if is_json:
+        values = json.loads(text)
+        if not isinstance(values, list):
+            raise ValueError("Body JSON phải là một mảng")
+    else:
+        values = [line[:-1] if line.endswith("\r") else line for line in text.split("\n")]
+        if values and values[-1] == "":
+            values.pop()  # Dòng trống sau newline cuối file
+    result = convert_strings(values, **{k: v for k, v in options.items() if k in _STRING_OPTIONS})
+    return json.dumps({
+        "values": result.values,
+        "is_unicode": result.is_unicode,
+        "unique_strings": result.unique_strings,
+        "stats": _stats_dict(result.stats),
+    }, ensure_ascii=False).encode("utf-8")
+
+
+class ConversionServer:
+    """
+    HTTP server asyncio (HTTP/1.1, keep-alive) bọc convert_file / preview_conversion.
+
+    Args:
+        host: Địa chỉ lắng nghe (mặc định chỉ máy cục bộ)
+        port: Cổng (0 = hệ điều hành chọn, xem self.port sau start())
+        workers: Số process convert = số job chạy đồng thời (None = số CPU)
+        max_queue: Số request được chờ thêm khi mọi worker bận (None = 2 x workers)
+        max_upload_bytes: Kích thước upload tối đa
+        tmp_dir: Thư mục chứa file tạm (None = thư mục tạm của hệ thống)
+        **options: Tùy chọn convert mặc định (engine, skip_unicode...), request ghi đè
+            được bằng tham số query cùng tên
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        workers: int | None = None,
+        max_queue: int | None = None,
+        max_upload_bytes: int = HTTP_MAX_UPLOAD_BYTES,
+        tmp_dir: str | Path | None = None,
+        **options,
+    ):
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_queue = 2 * self.workers if max_queue is None else max(0, max_queue)
+        self.max_upload_bytes = max_upload_bytes
+        self.tmp_dir = tmp_dir
+        self.options = options
+        self.pool: ProcessPoolExecutor | None = None
+        self.server: asyncio.AbstractServer | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self.started = time.time()
+        # Số liệu cho /metrics
+        self.inflight = 0  # request convert/preview đã nhận (đang upload, chờ hoặc chạy)
+        self.running = 0
+        self.counters: Dict[str, float] = {
+            "requests": 0, "completed": 0, "failed": 0, "rejected": 0,
+            "bytes_in": 0, "bytes_out": 0, "job_seconds": 0.0,
+        }
+
+    async def start(self) -> asyncio.AbstractServer:
+        self._new_pool()
+        self._slots = asyncio.Semaphore(self.workers)
+        self.server = await asyncio.start_server(
+            self._handle, self.host, self.port, limit=HTTP_MAX_HEADER_BYTES,
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started = time.time()
+        print(f"🌐 Đang phục vụ http://{self.host}:{self.port} ({self.workers} process)")
+        return self.server
+
+    async def serve_forever(self) -> None:
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def _new_pool(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_warm_worker, initargs=(self.options,),
+        )
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "inflight": self.inflight,
+            "running": self.running,
+            "queued": self.inflight - self.running,
+            **self.counters,
+            "job_seconds": round(self.counters["job_seconds"], 3),
+            "uptime_seconds": round(time.time() - self.started, 1),
+        }
+
+    # ------------------------------------------------------------------ HTTP
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_head(reader), HTTP_HEADER_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                        ConnectionError, ValueError):
+                    break
+                if request is None:
+                    break
+                method, target, version, headers = request
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+                self.counters["requests"] += 1
+                try:
+                    keep_alive = await self._route(method, target, headers, reader, writer, keep_alive)
+                except HttpError as e:
+                    if e.status == 503:
+                        self.counters["rejected"] += 1
+                    elif e.status in (422, 500):
+                        self.counters["failed"] += 1
+                    # Body có thể chưa đọc hết: đóng kết nối sau khi trả lỗi
+                    extra = {"Retry-After": "1"} if e.status == 503 else {}
+                    await _send_json(writer, e.status, {"error": str(e)}, False, extra)
+                    keep_alive = False
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _route(self, method, target, headers, reader, writer, keep_alive) -> bool:
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        if url.path == "/health":
+            _require_method(method, "GET")
+            await _send_json(writer, 200, {"status": "ok"}, keep_alive)
+            return keep_alive
+        if url.path == "/metrics":
+            _require_method(method, "GET")
+            await _send_json(writer, 200, self.metrics(), keep_alive)
+            return keep_alive
+        if url.path == "/strings":
+            _require_method(method, "POST")
+            return await self._convert_strings(query, headers, reader, writer, keep_alive)
+        if url.path not in ("/convert", "/preview"):
+            raise HttpError(404, f"Không có endpoint {url.path}")
+        _require_method(method, "POST")
+
+        filename = Path(query.pop("filename", None) or headers.get("x-filename") or "upload.xlsx").name
+        suffix = Path(filename).suffix.lower()
+        allowed = EXCEL_SUFFIXES if url.path == "/preview" else BATCH_SUFFIXES
+        if suffix not in allowed:
+            raise HttpError(400, f"Không hỗ trợ loại file {suffix or filename!r}")
+        max_samples = _int_param(query.pop("max_samples", "50"), "max_samples")
+        options = {**self.options, **_parse_options(query)}
+
+        with self._admit():
+            work_dir = Path(tempfile.mkdtemp(prefix="tcvn3_http_", dir=self.tmp_dir))
+            try:
+                return await self._convert_file(
+                    url.path, work_dir, filename, suffix, max_samples, options,
+                    headers, reader, writer, keep_alive,
+                )
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def _convert_file(self, endpoint, work_dir, filename, suffix, max_samples, options,
+                            headers, reader, writer, keep_alive) -> bool:
+        """/convert và /preview: stream upload ra file tạm, chạy job, trả kết quả"""
+        input_path = work_dir / ("input" + suffix)
+        received = await self._receive_body(reader, headers, input_path)
+        self.counters["bytes_in"] += received
+        if endpoint == "/preview":
+            samples = await self._run(_preview_job, str(input_path), max_samples, options)
+            self.counters["completed"] += 1
+            await _send_json(writer, 200, {"filename": filename, "samples": samples}, keep_alive)
+            return keep_alive
+
+        output_path = work_dir / ("output" + suffix)
+        result = await self._run(_convert_job, str(input_path), str(output_path), options)
+        if not result.ok:
+            raise HttpError(422, result.error)
+        self.counters["completed"] += 1
+        await self._send_file(writer, output_path, filename, result, keep_alive)
+        return keep_alive
+
+    async def _convert_strings(self, query, headers, reader, writer, keep_alive) -> bool:
+        """/strings: body (mảng JSON hoặc mỗi dòng 1 chuỗi) nhận vào bộ nhớ, convert cả lô"""
+        options = {**self.options, **_parse_options(query)}
+        content_type = headers.get("content-type", "").lower()
+        with self._admit():
+            body = bytearray()
+            async for block in self._iter_body(reader, headers):
+                body += block
+            self.counters["bytes_in"] += len(body)
+            is_json = "json" in content_type or body.lstrip()[:1] == b"["
+            payload = await self._run(_strings_job, bytes(body), is_json, options)
+        self.counters["completed"] += 1
+        _write_head(writer, 200, {
+            "Content-Type": "application/json; charset=utf-8",
+            "Content-Length": str(len(payload)),
+        }, keep_alive)
+        writer.write(payload)
+        await writer.drain()
+        self.counters["bytes_out"] += len(payload)
+        return keep_alive
+
+    @contextmanager
+    def _admit(self):
+        """Nhận request trước khi nhận upload: quá tải thì từ chối ngay bằng 503"""
+        if self.inflight >= self.workers + self.max_queue:
+            raise HttpError(503, "Server đang quá tải, thử lại sau")
+        self.inflight += 1
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+
+    async def _run(self, fn, *args):
+        """Chạy job trong process pool, tối đa self.workers job cùng lúc"""
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            self.running += 1
+            start = time.perf_counter()
+            try:
+                return await loop.run_in_executor(self.pool, fn, *args)
+            except BrokenProcessPool:
+                # Process worker chết (hết bộ nhớ...): tạo pool mới cho các request sau
+                self._new_pool()
+                raise HttpError(500, "Process worker bị dừng đột ngột (hết bộ nhớ?)")
+            except Exception as e:
+                raise HttpError(422, f"{type(e).__name__}: {e}")
+            finally:
+                self.running -= 1
+                self.counters["job_seconds"] += time.perf_counter() - start
+
+    async def _iter_body(self, reader: asyncio.StreamReader, headers: dict):
+        """Các khối của body request (Content-Length hoặc chunked), giới hạn max_upload_bytes"""
+        chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        if not chunked and "content-length" not in headers:
+            raise HttpError(411, "Cần Content-Length hoặc Transfer-Encoding: chunked")
+        total = 0
+        async for block in (_read_chunked(reader) if chunked
+                            else _read_length(reader, _int_param(headers["content-length"], "Content-Length"))):
+            total += len(block)
+            if total > self.max_upload_bytes:
+                raise HttpError(413, f"Body vượt quá {self.max_upload_bytes:,} bytes")
+            yield block
+        if total == 0:
+            raise HttpError(400, "Body rỗng")
+
+    async def _receive_body(self, reader: asyncio.StreamReader, headers: dict, path: Path) -> int:
+        """Stream body request ra file, trả về số byte"""
+        loop = asyncio.get_running_loop()
+        total = 0
+        with path.open("wb") as f:
+            async for block in self._iter_body(reader, headers):
+                total += len(block)
+                await loop.run_in_executor(None, f.write, block)
+        return total
+
+    async def _send_file(self, writer, path: Path, filename: str, result: BatchFileResult,
+                         keep_alive: bool) -> None:
+        loop = asyncio.get_running_loop()
+        size = path.stat().st_size
+        stats = json.dumps(result.stats, separators=(",", ":"))
+        head = {
+            "Content-Type": _CONTENT_TYPES.get(Path(filename).suffix.lower(), "application/octet-stream"),
+            "Content-Length": str(size),
+            "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
+            "X-Conversion-Stats": stats,
+            "X-Conversion-Seconds": f"{result.seconds:.3f}",
+        }
+        _write_head(writer, 200, head, keep_alive)
+        with path.open("rb") as f:
+            while True:
+                block = await loop.run_in_executor(None, f.read, HTTP_CHUNK)
+                if not block:
+                    break
+                writer.write(block)
+                await writer.drain()
+        self.counters["bytes_out"] += size
+
+
+async def _read_head(reader: asyncio.StreamReader):
+    """Đọc request line + header; None khi client đóng kết nối"""
+    try:
+        raw = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise
+    lines = raw.decode("latin-1").split("\r\n")
+    method, target, version = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    return method.upper(), target, version.strip(), headers
+
+
+async def _read_length(reader: asyncio.StreamReader, length: int):
+    while length > 0:
+        block = await reader.read(min(HTTP_CHUNK, length))
+        if not block:
+            raise HttpError(400, "Upload bị ngắt giữa chừng")
+        length -= len(block)
+        yield block
+
+
+async def _read_chunked(reader: asyncio.StreamReader):
+    while True:
+        size_line = await reader.readline()
+        try:
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+        except ValueError:
+            raise HttpError(400, "Chunk size không hợp lệ")
+        if size == 0:
+            # Bỏ qua trailer cho tới dòng trống
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            return
+        async for block in _read_length(reader, size):
+            yield block
+        await reader.readexactly(2)
+
+
+def _write_head(writer, status: int, headers: dict, keep_alive: bool) -> None:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+
+async def _send_json(writer, status: int, obj, keep_alive: bool, extra: dict | None = None) -> None:
+    body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    head = {"Content-Type": "application/json; charset=utf-8", "Content-Length": str(len(body)), **(extra or {})}
+    _write_head(writer, status, head, keep_alive)
+    writer.write(body)
+    await writer.drain()
+
+
+def _require_method(method: str, expected: str) -> None:
+    if method != expected:
+        raise HttpError(405, f"Chỉ hỗ trợ {expected}")
+
+
+def _int_param(value: str, name: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise HttpError(400, f"{name} phải là số nguyên: {value!r}")
+    if number < 0:
+        raise HttpError(400, f"{name} không được âm: {value!r}")
+    return number
+
+
+def _parse_options(query: Dict[str, str]) -> dict:
+    """Tham số query → tùy chọn convert (kiểm tra giá trị hợp lệ)"""
+    options = {}
+    for name, value in query.items():
+        allowed = _QUERY_OPTIONS.get(name)
+        if allowed is None:
+            raise HttpError(400, f"Tham số không hỗ trợ: {name}")
+        if allowed is bool:
+            if value.lower() not in ("1", "0", "true", "false", "yes", "no"):
+                raise HttpError(400, f"{name} phải là true/false: {value!r}")
+            options[name] = value.lower() in ("1", "true", "yes")
+        elif value not in allowed:
+            raise HttpError(400, f"{name} phải là một trong: {', '.join(allowed)}")
+        else:
+            options[name] = value
+    return options
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, **kwargs) -> None:
+    """Chạy ConversionServer cho đến khi Ctrl+C (tham số như ConversionServer)"""
+    server = ConversionServer(host, port, **kwargs)
+
+    async def run() -> None:
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("🛑 Đã dừng server")
+
+
+def main(argv: List[str] | None = None) -> int:
+    import argparse
+
+    from convert_excel_tcvn3 import _add_conversion_arguments, _conversion_options
+
+    ap = argparse.ArgumentParser(description="HTTP service convert TCVN3 sang Unicode")
+    ap.add_argument("--host", default="127.0.0.1", help="Địa chỉ lắng nghe (mặc định chỉ máy này)")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("-j", "--jobs", type=int, default=None, help="Số process (mặc định: số CPU)")
+    ap.add_argument("--max-queue", type=int, default=None, help="Số request chờ tối đa khi mọi worker bận")
+    ap.add_argument("--max-upload-mb", type=int, default=HTTP_MAX_UPLOAD_BYTES >> 20)
+    ap.add_argument("--tmp-dir", default=None, help="Thư mục file tạm")
+    _add_conversion_arguments(ap)
+    args = ap.parse_args(argv)
+
+    serve(
+        args.host, args.port, workers=args.jobs, max_queue=args.max_queue,
+        max_upload_bytes=args.max_upload_mb << 20, tmp_dir=args.tmp_dir, **_conversion_options(args),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
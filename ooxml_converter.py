@@ -0,0 +1,807 @@
+# -*- coding: utf-8 -*-
+"""
+Convert ở tầng zip cho file Office Open XML (.xlsx, .xlsm, .docx, .pptx).
+
+File .xlsx là một file zip: gần như toàn bộ chuỗi nằm 1 lần trong
+xl/sharedStrings.xml, các cell chỉ lưu chỉ số vào bảng này. Vì vậy chỉ cần:
+1. Stream xl/sharedStrings.xml qua parser SAX, convert mỗi <si> đúng 1 lần
+2. Stream các worksheet part (song song, mỗi sheet 1 process) để convert cell
+   inline string (t="inlineStr") mà một số chương trình xuất file cũ dùng
+3. Chép nguyên byte đã nén của mọi member khác (styles, drawings, VBA,
+   pivot cache...) sang zip mới, không giải nén, không parse, không nén lại
+
+Với Word/PowerPoint (convert_docx, convert_pptx) cũng vậy: chỉ các part chứa
+nội dung (document, header, footer, slide...) được stream để convert text trong
+<w:t> / <a:t>, mọi member khác được chép nguyên.
+
+Định dạng, công thức, macro được giữ nguyên tuyệt đối.
+"""
+from __future__ import annotations
+import copy
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import zipfile
+import xml.sax
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from xml.sax.handler import feature_external_ges, feature_external_pes, feature_namespaces
+from xml.sax.saxutils import XMLGenerator, escape
+from xml.sax.xmlreader import AttributesImpl
+
+import convert_excel_tcvn3 as _tcvn3
+from convert_excel_tcvn3 import (
+    ConversionLog,
+    ConversionStats,
+    _build_rules,
+    _ConversionRules,
+    _font_key,
+    _normalized_font_map,
+)
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+
+STYLES_PART = "xl/styles.xml"
+
+# Tên hiển thị trong ConversionLog cho các chuỗi của bảng shared strings
+SHARED_STRINGS_SHEET = "sharedStrings"
+
+_COPY_BLOCK = 1 << 20
+# copy_member_raw ghi thẳng vào zip đích qua thuộc tính nội bộ của zipfile
+# (fp, start_dir, _lock, _didModify, filelist, NameToInfo). Các thuộc tính này
+# ổn định trong khoảng phiên bản CPython dưới đây; ngoài khoảng → chép qua API công khai
+_RAW_COPY_VERSIONS = ((3, 8), (3, 14))
+_RAW_COPY_ATTRS = ("start_dir", "_lock", "_didModify", "filelist", "NameToInfo")
+_RAW_COPY_SUPPORTED = (
+    sys.implementation.name == "cpython"
+    and _RAW_COPY_VERSIONS[0] <= sys.version_info[:2] <= _RAW_COPY_VERSIONS[1]
+)
+_CELL_REF_RE = re.compile(r"\$?([A-Z]{1,3})\$?(\d+)$")
+# <dimension ref="A1:K800001"/> nằm ở đầu worksheet part (trước sheetData)
+_DIMENSION_RE = re.compile(rb"<(?:\w+:)?dimension\s+ref=\"([^\"]*)\"")
+_DIMENSION_SCAN_BYTES = 64 << 10
+
+# Part chứa nội dung text của Word / PowerPoint
+_DOCX_PART_RE = re.compile(r"word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$")
+_PPTX_PART_RE = re.compile(r"ppt/(slides/slide|notesSlides/notesSlide)\d+\.xml$")
+
+
+class _XmlWriter(XMLGenerator):
+    """XMLGenerator ghi khai báo XML kiểu Office và giữ \\r trong text ở dạng entity"""
+
+    def __init__(self, out):
+        super().__init__(out, encoding="utf-8", short_empty_elements=True)
+
+    def startDocument(self):
+        self._write(XML_DECLARATION)
+
+    def characters(self, content):
+        self._write_text(content)
+
+    def _write_text(self, content):
+        if content:
+            self._finish_pending_start_element()
+            # \r phải giữ dạng entity, nếu không sẽ bị chuẩn hóa thành \n khi đọc lại
+            self._write(escape(content, {"\r": "&#13;"}))
+
+
+class _PartRewriter(_XmlWriter):
+    """
+    Ghi lại một part XML theo kiểu streaming, chỉ thay nội dung chữ.
+
+    Mỗi phần tử unit_tag (vd. <si>) là một đơn vị quyết định: các sự kiện bên
+    trong được giữ tạm, text của các thẻ text_tags được gom lại và chuyển cho
+    on_unit(attrs, texts) → danh sách text mới (hoặc None nếu giữ nguyên), rồi
+    phát lại. Text trong skip_tags (vd. phiên âm <rPh>) không bị đụng tới.
+    Không dùng namespace nên tiền tố (x:, w:, a:...) được giữ nguyên như gốc;
+    unit_tag, text_tags, skip_tags là tên cục bộ (không tiền tố) nên <x:si><x:t>
+    cũng khớp như <si><t>.
+    font_map (key đã chuẩn hóa bằng _font_key): đổi luôn font của các run rich
+    text (<rPr><rFont val="..."/>) trong cùng lượt, số lần thay ghi vào remapped.
+    """
+
+    def __init__(self, out, unit_tag: str, text_tags: set, skip_tags: set = frozenset(),
+                 on_unit: Callable[[dict, List[str]], List[str] | None] = None,
+                 font_map: Dict[str, str] | None = None):
+        super().__init__(out)
+        self._unit_tag = unit_tag
+        self._text_tags = text_tags
+        self._skip_tags = skip_tags
+        self._on_unit = on_unit
+        self._font_map = font_map
+        self.remapped: Dict[Tuple[str, str], int] = {}
+        self._events: list | None = None
+        self._unit_attrs = None
+        self._unit_depth = 0
+        self._skip_depth = 0
+        self._text_buf: list | None = None
+
+    def characters(self, content):
+        if self._events is not None:
+            if self._text_buf is not None:
+                self._text_buf.append(content)
+            else:
+                self._events.append(("c", content))
+            return
+        self._write_text(content)
+
+    def startElement(self, name, attrs):
+        local = name.rsplit(":", 1)[-1]
+        if self._font_map and local == "rFont":
+            attrs = _remap_font_attrs(attrs, self._font_map, self.remapped)
+        if self._events is None:
+            if local != self._unit_tag:
+                super().startElement(name, attrs)
+                return
+            self._events = []
+            self._unit_attrs = dict(attrs.items())
+        if local == self._unit_tag:
+            self._unit_depth += 1
+        if local in self._skip_tags:
+            self._skip_depth += 1
+        self._events.append(("s", name, attrs.copy()))
+        if local in self._text_tags and not self._skip_depth:
+            self._text_buf = []
+
+    def endElement(self, name):
+        if self._events is None:
+            super().endElement(name)
+            return
+        local = name.rsplit(":", 1)[-1]
+        if self._text_buf is not None and local in self._text_tags:
+            self._events.append(("t", "".join(self._text_buf)))
+            self._text_buf = None
+        self._events.append(("e", name))
+        if local in self._skip_tags:
+            self._skip_depth -= 1
+        if local == self._unit_tag:
+            self._unit_depth -= 1
+            if not self._unit_depth:
+                self._flush_unit()
+
+    def _flush_unit(self):
+        events, self._events = self._events, None
+        texts = [ev[1] for ev in events if ev[0] == "t"]
+        new_texts = self._on_unit(self._unit_attrs, texts) if texts else None
+        if new_texts is None:
+            new_texts = texts
+        k = 0
+        for ev in events:
+            kind = ev[0]
+            if kind == "s":
+                super().startElement(ev[1], ev[2])
+            elif kind == "e":
+                super().endElement(ev[1])
+            elif kind == "t":
+                self._write_text(new_texts[k])
+                k += 1
+            else:
+                self._write_text(ev[1])
+
+
+def _rewrite_part(src, dst, rewriter: _PartRewriter) -> None:
+    """Parse src (file-like) theo kiểu streaming, kết quả ghi qua rewriter ra dst"""
+    parser = xml.sax.make_parser()
+    parser.setFeature(feature_namespaces, False)
+    # Không bao giờ tải entity bên ngoài (XXE)
+    parser.setFeature(feature_external_ges, False)
+    parser.setFeature(feature_external_pes, False)
+    parser.setContentHandler(rewriter)
+    parser.parse(src)
+
+
+def _remap_font_attrs(attrs, font_map: Dict[str, str], remapped: Dict[Tuple[str, str], int]):
+    """Đổi thuộc tính val (tên font) theo font_map và đếm vào remapped; không khớp → giữ nguyên attrs"""
+    old = attrs.get("val")
+    new = font_map.get(_font_key(old)) if old else None
+    if not new:
+        return attrs
+    remapped[(old, new)] = remapped.get((old, new), 0) + 1
+    return AttributesImpl({**dict(attrs.items()), "val": new})
+
+
+def _merge_remapped(total: Dict[Tuple[str, str], int], remapped: Dict[Tuple[str, str], int]) -> None:
+    for key, count in remapped.items():
+        total[key] = total.get(key, 0) + count
+
+
+class _FontRemapRewriter(_XmlWriter):
+    """
+    Đổi tên font theo font_map: bảng font của styles.xml (<font><name val="..."/>)
+    và font riêng của các run rich text (<rPr><rFont val="..."/>) trong shared
+    strings / cell inline string.
+    """
+
+    def __init__(self, out, font_map: Dict[str, str]):
+        super().__init__(out)
+        self._font_map = font_map  # Key đã chuẩn hóa bằng _font_key
+        self._stack: List[str] = []
+        self.remapped: Dict[Tuple[str, str], int] = {}
+
+    def startElement(self, name, attrs):
+        local = name.rsplit(":", 1)[-1]
+        if (local == "name" and self._stack and self._stack[-1] == "font") or local == "rFont":
+            attrs = _remap_font_attrs(attrs, self._font_map, self.remapped)
+        self._stack.append(local)
+        super().startElement(name, attrs)
+
+    def endElement(self, name):
+        self._stack.pop()
+        super().endElement(name)
+
+
+def _rewrite_fonts(zin: zipfile.ZipFile, zout: zipfile.ZipFile, info: zipfile.ZipInfo,
+                   font_map: Dict[str, str]) -> Dict[Tuple[str, str], int]:
+    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+    new_info.compress_type = zipfile.ZIP_DEFLATED
+    new_info.external_attr = info.external_attr
+    with zin.open(info) as src, zout.open(new_info, "w") as dst:
+        rewriter = _FontRemapRewriter(dst, font_map)
+        _rewrite_part(src, dst, rewriter)
+    return rewriter.remapped
+
+
+def _report_fonts(remapped: Dict[Tuple[str, str], int]) -> None:
+    for (old, new), count in remapped.items():
+        print(f"🔤 Đổi font: {old} → {new} ({count})")
+
+
+def remap_workbook_fonts(path: str | Path, font_map: Dict[str, str] | None = None) -> Dict[Tuple[str, str], int]:
+    """
+    Đổi font TCVN3 sang font Unicode trong bảng font của xl/styles.xml (sửa file tại chỗ).
+
+    Chỉ 1 lần rewrite styles.xml: mọi cell dùng font đó đổi theo, không tạo style
+    mới cho từng cell. Font riêng của các run rich text (<rFont>) trong
+    sharedStrings.xml và trong cell inline string của worksheet cũng được đổi;
+    các member khác được chép nguyên byte.
+
+    Args:
+        path: File .xlsx/.xlsm
+        font_map: Map bổ sung/ghi đè TCVN3_FONT_MAP ({font cũ: font mới})
+
+    Returns:
+        {(font cũ, font mới): số lần thay}
+    """
+    path = Path(path)
+    normalized = _normalized_font_map(font_map)
+    remapped = {}
+    fd, tmp = tempfile.mkstemp(suffix=path.suffix, dir=path.parent)
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(path) as zin, \
+                zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                name = info.filename
+                if name == STYLES_PART or _is_shared_strings(name) or (
+                        _is_worksheet(name) and _part_contains(zin, name, b"rFont")):
+                    _merge_remapped(remapped, _rewrite_fonts(zin, zout, info, normalized))
+                else:
+                    copy_member_raw(zin, zout, info)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    _report_fonts(remapped)
+    return remapped
+
+
+def _can_copy_raw(zin: zipfile.ZipFile, zout: zipfile.ZipFile, info: zipfile.ZipInfo) -> bool:
+    return (
+        _RAW_COPY_SUPPORTED
+        and not info.flag_bits & 0x1  # Không mã hóa
+        and info.file_size < zipfile.ZIP64_LIMIT
+        and info.compress_size < zipfile.ZIP64_LIMIT
+        and getattr(zin, "fp", None) is not None
+        and getattr(zout, "fp", None) is not None
+        and all(hasattr(zout, name) for name in _RAW_COPY_ATTRS)
+        and not getattr(zout, "_writing", False)  # Đang có member mở để ghi
+    )
+
+
+def copy_member_raw(zin: zipfile.ZipFile, zout: zipfile.ZipFile, info: zipfile.ZipInfo) -> None:
+    """
+    Chép một member sang zip mới, giữ nguyên byte đã nén (không giải nén/nén lại).
+
+    Đọc thẳng dữ liệu nén sau local header của zip nguồn, ghi local header mới
+    (CRC/kích thước lấy từ central directory). Cách này dùng thuộc tính nội bộ của
+    zipfile nên chỉ bật với các phiên bản CPython đã kiểm tra (_RAW_COPY_VERSIONS);
+    phiên bản khác hoặc member không hỗ trợ (mã hóa, zip64...) quay về
+    ZipFile.open(info, "w") với ZipInfo gốc: stream giải nén rồi nén lại.
+    """
+    if not _can_copy_raw(zin, zout, info):
+        with zin.open(info) as src, zout.open(copy.copy(info), "w") as dst:
+            shutil.copyfileobj(src, dst, _COPY_BLOCK)
+        return
+
+    fp = zin.fp
+    fp.seek(info.header_offset)
+    header = fp.read(zipfile.sizeFileHeader)
+    if header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Local header hỏng: {info.filename}")
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    fp.seek(info.header_offset + zipfile.sizeFileHeader + name_len + extra_len)
+
+    new_info = copy.copy(info)
+    # Kích thước đã biết trước → không cần data descriptor sau dữ liệu
+    new_info.flag_bits &= ~0x08
+    with zout._lock:
+        zout.fp.seek(zout.start_dir)
+        new_info.header_offset = zout.start_dir
+        zout.fp.write(new_info.FileHeader(False))
+        remaining = info.compress_size
+        while remaining:
+            block = fp.read(min(_COPY_BLOCK, remaining))
+            if not block:
+                raise zipfile.BadZipFile(f"Dữ liệu bị cắt cụt: {info.filename}")
+            zout.fp.write(block)
+            remaining -= len(block)
+        zout.start_dir = zout.fp.tell()
+        zout.filelist.append(new_info)
+        zout.NameToInfo[new_info.filename] = new_info
+        zout._didModify = True
+
+
+def _is_shared_strings(name: str) -> bool:
+    return name.startswith("xl/") and name.rsplit("/", 1)[-1].lower() == "sharedstrings.xml"
+
+
+def _is_worksheet(name: str) -> bool:
+    return name.startswith("xl/worksheets/") and name.endswith(".xml")
+
+
+def _convert_texts(
+    rules: _ConversionRules, stats: ConversionStats, texts: List[str]
+) -> Tuple[List[str] | None, str, str, bool]:
+    """
+    Quyết định skip/convert cho một đơn vị text (1 chuỗi shared string hoặc 1 cell inline).
+
+    Returns:
+        (text mới từng run hoặc None nếu giữ nguyên, chuỗi gốc, chuỗi sau convert, is_unicode)
+    """
+    stats.total_cells += 1
+    original = "".join(texts)
+    if not original.strip():
+        return None, original, original, True
+    stats.string_cells += 1
+
+    is_unicode = rules.is_unicode_text(original)
+    is_target = not is_unicode if rules.to_tcvn3 else is_unicode
+    if rules.skip_unicode and is_target:
+        if rules.to_tcvn3:
+            stats.already_legacy += 1
+        else:
+            stats.already_unicode += 1
+        return None, original, original, is_unicode
+
+    # Convert từng run để giữ định dạng rich text
+    new_texts = [rules.convert(t) for t in texts]
+    converted = "".join(new_texts)
+    if rules.to_tcvn3 and _tcvn3.tcvn3_unrepresentable(original):
+        stats.lossy_cells += 1
+    if converted == original:
+        stats.unchanged_cells += 1
+        return None, original, converted, is_unicode
+    stats.converted_cells += 1
+    return new_texts, original, converted, is_unicode
+
+
+class _SharedStringsConverter:
+    """Quyết định skip/convert cho từng <si> của bảng shared strings"""
+
+    def __init__(self, rules: _ConversionRules, stats: ConversionStats):
+        self.rules = rules
+        self.stats = stats
+        self.index = 0
+
+    def __call__(self, attrs: dict, texts: List[str]) -> List[str] | None:
+        index = self.index
+        self.index += 1
+        new_texts, original, converted, is_unicode = _convert_texts(self.rules, self.stats, texts)
+        if new_texts is not None:
+            self.stats.logs.append(ConversionLog(
+                sheet=SHARED_STRINGS_SHEET,
+                row=index + 1,  # Vị trí trong bảng shared strings (1-indexed)
+                col=0,
+                col_name="si",
+                original=original,
+                converted=converted,
+                was_unicode=is_unicode,
+            ))
+        return new_texts
+
+
+def _split_ref(ref: str) -> Tuple[int, int]:
+    """"B12" → (12, 1): hàng 1-indexed, cột 0-indexed như ConversionLog"""
+    m = _CELL_REF_RE.match(ref or "")
+    if m is None:
+        return 0, 0
+    col = 0
+    for ch in m.group(1):
+        col = col * 26 + ord(ch) - 64
+    return int(m.group(2)), col - 1
+
+
+class _InlineStringConverter:
+    """Quyết định skip/convert cho từng cell t="inlineStr" của một worksheet"""
+
+    def __init__(self, sheet: str, rules: _ConversionRules, stats: ConversionStats):
+        self.sheet = sheet
+        self.rules = rules
+        self.stats = stats
+
+    def __call__(self, attrs: dict, texts: List[str]) -> List[str] | None:
+        if attrs.get("t") != "inlineStr":
+            return None
+        new_texts, original, converted, is_unicode = _convert_texts(self.rules, self.stats, texts)
+        if new_texts is not None:
+            row, col = _split_ref(attrs.get("r"))
+            self.stats.logs.append(ConversionLog(
+                sheet=self.sheet,
+                row=row,
+                col=col,
+                col_name=f"Col_{col}",
+                original=original,
+                converted=converted,
+                was_unicode=is_unicode,
+            ))
+        return new_texts
+
+
+def _worksheet_names(zin: zipfile.ZipFile) -> Dict[str, str]:
+    """Map tên part worksheet (xl/worksheets/sheetN.xml) → tên sheet trong workbook"""
+    import xml.etree.ElementTree as ET
+
+    names = {}
+    try:
+        rels = ET.fromstring(zin.read("xl/_rels/workbook.xml.rels"))
+        targets = {}
+        for rel in rels:
+            target = rel.get("Target", "")
+            target = target.lstrip("/") if target.startswith("/") else "xl/" + target
+            targets[rel.get("Id")] = target
+        workbook = ET.fromstring(zin.read("xl/workbook.xml"))
+    except (KeyError, ET.ParseError):
+        return names
+    for el in workbook.iter():
+        if el.tag.rsplit("}", 1)[-1] != "sheet":
+            continue
+        rid = next((v for k, v in el.attrib.items() if k.rsplit("}", 1)[-1] == "id"), None)
+        if rid in targets:
+            names[targets[rid]] = el.get("name", "")
+    return names
+
+
+def worksheet_row_counts(path: str | Path, by_part: bool = False) -> Dict[str, int]:
+    """
+    Số hàng của từng worksheet theo thẻ <dimension> (chỉ đọc vài KB đầu mỗi part,
+    không parse sheet), dùng làm tổng số hàng cho tiến trình.
+
+    Args:
+        path: File .xlsx/.xlsm
+        by_part: True → khóa là tên part (xl/worksheets/sheet1.xml), False → tên sheet
+
+    Returns:
+        Dict {sheet: số hàng}; sheet không có dimension bị bỏ qua, file không phải
+        zip OOXML (VD .xls) → {}
+    """
+    counts = {}
+    try:
+        with zipfile.ZipFile(path) as zin:
+            names = _worksheet_names(zin)
+            for info in zin.infolist():
+                if not _is_worksheet(info.filename):
+                    continue
+                with zin.open(info) as f:
+                    m = _DIMENSION_RE.search(f.read(_DIMENSION_SCAN_BYTES))
+                if m is None:
+                    continue
+                rows = _split_ref(m.group(1).decode("ascii", "replace").rsplit(":", 1)[-1])[0]
+                key = info.filename if by_part else names.get(info.filename, Path(info.filename).stem)
+                counts[key] = rows
+    except (OSError, zipfile.BadZipFile):
+        return {}
+    return counts
+
+
+def _part_contains(zin: zipfile.ZipFile, name: str, needle: bytes) -> bool:
+    """Tìm needle trong part (giải nén theo khối, không giữ cả part trong bộ nhớ)"""
+    tail = b""
+    with zin.open(name) as f:
+        while True:
+            block = f.read(_COPY_BLOCK)
+            if not block:
+                return False
+            if needle in tail + block[:len(needle)] or needle in block:
+                return True
+            tail = block[-len(needle):]
+
+
+def _convert_worksheet_part(
+    input_path: Path,
+    part_name: str,
+    sheet: str,
+    rules: _ConversionRules,
+    backend: str,
+    out_path: Path,
+    font_map: Dict[str, str] | None = None,
+    memo_size: int | None = None,
+) -> Tuple[ConversionStats | None, Dict[Tuple[str, str], int]]:
+    """
+    Rewrite các cell inline string của một worksheet part ra out_path.
+    Chạy được trong process worker (mọi tham số đều pickle được); memo_size là cỡ
+    memo cache của process cha, số hit/miss được trả về trong stats của sheet.
+
+    Returns:
+        (ConversionStats của sheet hoặc None nếu sheet không có cell inline nào,
+        số lần đổi font <rFont> theo font_map). Nếu không có cell nào được đổi và
+        không đổi font nào, part gốc được chép nguyên
+    """
+    if backend != _tcvn3._CONVERTER_BACKEND:
+        _tcvn3.set_converter_backend(backend)
+    stats = ConversionStats()
+    with zipfile.ZipFile(input_path) as zin:
+        if not _part_contains(zin, part_name, b"inlineStr"):
+            return None, {}
+        with zin.open(part_name) as src, open(out_path, "wb") as dst, \
+                _tcvn3._memo_scope(memo_size, stats):
+            rewriter = _PartRewriter(
+                dst, unit_tag="c", text_tags={"t"}, skip_tags={"rPh"},
+                on_unit=_InlineStringConverter(sheet, rules, stats),
+                font_map=font_map,
+            )
+            _rewrite_part(src, dst, rewriter)
+    return stats, rewriter.remapped
+
+
+def _write_member(zout: zipfile.ZipFile, info: zipfile.ZipInfo, path: Path) -> None:
+    """Ghi file đã rewrite vào zip với tên, thời gian và quyền của member gốc"""
+    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+    new_info.compress_type = zipfile.ZIP_DEFLATED
+    new_info.external_attr = info.external_attr
+    with open(path, "rb") as src, zout.open(new_info, "w") as dst:
+        shutil.copyfileobj(src, dst, _COPY_BLOCK)
+
+
+def convert_xlsx_xml(
+    input_path: Path,
+    output_path: Path,
+    rules: _ConversionRules,
+    stats: ConversionStats,
+    progress_callback=None,
+    workers: int | None = None,
+    font_map: Dict[str, str] | None = None,
+) -> None:
+    """
+    Engine "xml": rewrite xl/sharedStrings.xml và các cell inline string trong
+    worksheet, chép nguyên byte mọi part khác.
+
+    Thống kê của shared strings tính trên từng chuỗi của bảng (mỗi chuỗi 1 lần dù
+    được dùng ở nhiều cell; log có sheet="sharedStrings", row = vị trí chuỗi);
+    cell inline string được tính từng cell với tên sheet và tọa độ thật.
+    Worksheet có cell inline string được parse song song trong process pool (chỉ
+    khi có từ 2 worksheet như vậy); worksheet không có cell inline nào cần đổi
+    được chép nguyên.
+
+    Args:
+        input_path: File .xlsx/.xlsm nguồn
+        output_path: File kết quả
+        rules: Quy tắc skip/convert (không hỗ trợ skip_selection theo từng cell)
+        stats: ConversionStats được cộng dồn
+        progress_callback: callback(part_name, part_index, total_parts)
+        workers: Số process parse worksheet (None = số CPU); luôn giới hạn bởi số
+            worksheet có cell inline string, 1 = chạy tuần tự
+        font_map: Nếu khác None, đổi font TCVN3 trong xl/styles.xml và <rFont> của
+            các run rich text ngay trong lượt này (như remap_workbook_fonts,
+            font_map bổ sung/ghi đè TCVN3_FONT_MAP)
+    """
+    if rules.force_convert:
+        raise ValueError('engine="xml" không hỗ trợ skip_selection theo từng cell')
+
+    with zipfile.ZipFile(input_path) as zin:
+        infos = zin.infolist()
+        sheet_names = _worksheet_names(zin)
+        sheets = [info for info in infos if _is_worksheet(info.filename)]
+        # Chỉ worksheet có cell inline string mới cần parse; không có/chỉ 1 → không mở pool
+        inline_sheets = [info for info in sheets if _part_contains(zin, info.filename, b"inlineStr")]
+    targets = [info for info in infos if _is_shared_strings(info.filename)] + sheets
+    stats.sheets_processed += len(sheets)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(inline_sheets)))
+    backend = _tcvn3._CONVERTER_BACKEND
+    memo_size = _tcvn3._MEMO.maxsize if _tcvn3._MEMO is not None else None
+    normalized = _normalized_font_map(font_map) if font_map is not None else None
+    remapped = {}
+
+    with tempfile.TemporaryDirectory(prefix="tcvn3_xml_") as tmp, \
+            zipfile.ZipFile(input_path) as zin, \
+            zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zout:
+        tmp = Path(tmp)
+        jobs = {}
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            for k, info in enumerate(inline_sheets):
+                args = (
+                    input_path, info.filename,
+                    sheet_names.get(info.filename, Path(info.filename).stem),
+                    rules, backend, tmp / f"sheet{k}.xml", normalized, memo_size,
+                )
+                jobs[info.filename] = (
+                    pool.submit(_convert_worksheet_part, *args) if pool else args
+                )
+
+            done = 0
+            for info in infos:
+                if info.filename in jobs:
+                    job = jobs[info.filename]
+                    sheet_stats, sheet_fonts = job.result() if pool else _convert_worksheet_part(*job)
+                    if sheet_stats is not None:
+                        stats.merge(sheet_stats)
+                    _merge_remapped(remapped, sheet_fonts)
+                    if sheet_stats is not None and (sheet_stats.converted_cells or sheet_fonts):
+                        _write_member(zout, info, tmp / f"sheet{inline_sheets.index(info)}.xml")
+                    else:
+                        copy_member_raw(zin, zout, info)
+                elif _is_worksheet(info.filename):
+                    copy_member_raw(zin, zout, info)
+                elif _is_shared_strings(info.filename):
+                    new_info = zipfile.ZipInfo(info.filename, info.date_time)
+                    new_info.compress_type = zipfile.ZIP_DEFLATED
+                    new_info.external_attr = info.external_attr
+                    with zin.open(info) as src, zout.open(new_info, "w") as dst:
+                        rewriter = _PartRewriter(
+                            dst, unit_tag="si", text_tags={"t"}, skip_tags={"rPh"},
+                            on_unit=_SharedStringsConverter(rules, stats),
+                            font_map=normalized,
+                        )
+                        _rewrite_part(src, dst, rewriter)
+                    _merge_remapped(remapped, rewriter.remapped)
+                elif normalized is not None and info.filename == STYLES_PART:
+                    _merge_remapped(remapped, _rewrite_fonts(zin, zout, info, normalized))
+                    continue
+                else:
+                    copy_member_raw(zin, zout, info)
+                    continue
+                if progress_callback:
+                    progress_callback(info.filename, done, len(targets))
+                done += 1
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+    _report_fonts(remapped)
+
+
+class _ParagraphConverter:
+    """Quyết định skip/convert cho từng đoạn văn (<w:p> / <a:p>) của một part"""
+
+    def __init__(self, part: str, tag: str, rules: _ConversionRules, stats: ConversionStats):
+        self.part = part
+        self.tag = tag
+        self.rules = rules
+        self.stats = stats
+        self.index = 0
+
+    def __call__(self, attrs: dict, texts: List[str]) -> List[str] | None:
+        self.index += 1
+        # Cả đoạn văn được phân loại 1 lần, convert từng run để giữ định dạng
+        new_texts, original, converted, is_unicode = _convert_texts(self.rules, self.stats, texts)
+        if new_texts is not None:
+            self.stats.logs.append(ConversionLog(
+                sheet=self.part,
+                row=self.index,  # Thứ tự đoạn văn trong part (1-indexed)
+                col=0,
+                col_name=self.tag,
+                original=original,
+                converted=converted,
+                was_unicode=is_unicode,
+            ))
+        return new_texts
+
+
+def _convert_document_parts(
+    input_path: Path,
+    output_path: Path,
+    part_re: re.Pattern,
+    prefix: str,
+    rules: _ConversionRules,
+    progress_callback=None,
+) -> ConversionStats:
+    """
+    Rewrite các part khớp part_re (đoạn văn <p>, text trong <t>, khớp theo tên cục bộ
+    với mọi tiền tố), chép nguyên mọi member khác. prefix ("w"/"a") chỉ dùng làm
+    col_name trong log.
+    """
+    stats = ConversionStats()
+
+    with zipfile.ZipFile(input_path) as zin, \
+            zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zout:
+        infos = zin.infolist()
+        targets = [info for info in infos if part_re.match(info.filename)]
+        for info in infos:
+            if info not in targets:
+                copy_member_raw(zin, zout, info)
+                continue
+            if progress_callback:
+                progress_callback(info.filename, targets.index(info), len(targets))
+            stats.sheets_processed += 1
+            new_info = zipfile.ZipInfo(info.filename, info.date_time)
+            new_info.compress_type = zipfile.ZIP_DEFLATED
+            new_info.external_attr = info.external_attr
+            with zin.open(info) as src, zout.open(new_info, "w") as dst:
+                rewriter = _PartRewriter(
+                    dst, unit_tag="p", text_tags={"t"},
+                    on_unit=_ParagraphConverter(info.filename, f"{prefix}:p", rules, stats),
+                )
+                _rewrite_part(src, dst, rewriter)
+
+    print(f"✅ Ghi xong: {output_path}")
+    return stats
+
+
+def convert_docx(
+    input_path: str | Path,
+    output_path: str | Path,
+    skip_unicode: bool = True,
+    progress_callback=None,
+    direction: str = "to_unicode",
+    source_charset: str = "tcvn3",
+    detector: str = "whitelist",
+) -> ConversionStats:
+    """
+    Chuyển file Word (.docx/.docm) TCVN3 sang Unicode.
+
+    Stream word/document.xml, header, footer, footnote, endnote; mỗi đoạn văn
+    <w:p> được phân loại 1 lần, text trong các run <w:t> được convert riêng nên
+    định dạng từng run giữ nguyên. Mọi member khác (ảnh, style, macro...) được
+    chép nguyên byte. Log có sheet = tên part, row = thứ tự đoạn văn.
+
+    Args:
+        input_path: File Word input
+        output_path: File Word output
+        skip_unicode: Bỏ qua các đoạn văn đã là Unicode chuẩn
+        progress_callback: callback(part_name, part_index, total_parts)
+        direction, source_charset, detector: Như convert_excel
+
+    Returns:
+        ConversionStats (sheets_processed = số part đã xử lý)
+    """
+    rules = _build_rules(skip_unicode, None, direction, source_charset, detector)
+    return _convert_document_parts(
+        Path(input_path), Path(output_path), _DOCX_PART_RE, "w", rules, progress_callback
+    )
+
+
+def convert_pptx(
+    input_path: str | Path,
+    output_path: str | Path,
+    skip_unicode: bool = True,
+    progress_callback=None,
+    direction: str = "to_unicode",
+    source_charset: str = "tcvn3",
+    detector: str = "whitelist",
+) -> ConversionStats:
+    """
+    Chuyển file PowerPoint (.pptx/.pptm) TCVN3 sang Unicode.
+
+    Stream các slide và notes slide; mỗi đoạn văn <a:p> được phân loại 1 lần,
+    text trong các run <a:t> được convert riêng. Mọi member khác được chép nguyên byte.
+
+    Args:
+        input_path: File PowerPoint input
+        output_path: File PowerPoint output
+        skip_unicode: Bỏ qua các đoạn văn đã là Unicode chuẩn
+        progress_callback: callback(part_name, part_index, total_parts)
+        direction, source_charset, detector: Như convert_excel
+
+    Returns:
+        ConversionStats (sheets_processed = số part đã xử lý)
+    """
+    rules = _build_rules(skip_unicode, None, direction, source_charset, detector)
+    return _convert_document_parts(
+        Path(input_path), Path(output_path), _PPTX_PART_RE, "a", rules, progress_callback
+    )
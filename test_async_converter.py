@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Test API asyncio: tiến trình qua ConversionProgress, hủy task, executor dạng process
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from async_converter import ConversionProgress, convert_excel_async, preview_conversion_async
+
+
+def make_workbook(path, rows=200, write_only=False):
+    # write_only ghi nhanh hơn nhưng không có <dimension>: tổng số hàng không biết trước
+    wb = Workbook(write_only=write_only)
+    if not write_only:
+        wb.remove(wb.active)
+    for name in ("A", "B"):
+        ws = wb.create_sheet(name)
+        for i in range(rows):
+            ws.append(["Hµ Néi", i, "Thµnh phè"])
+    wb.save(path)
+    return path
+
+
+async def collect(progress):
+    return [event async for event in progress]
+
+
+def test_progress_events_and_result(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+    out = tmp_path / "out.xlsx"
+
+    async def run():
+        progress = ConversionProgress()
+        task = asyncio.create_task(convert_excel_async(
+            src, out, progress=progress, engine="streaming",
+            progress_every_rows=50, progress_interval_ms=0,
+        ))
+        events = await collect(progress)
+        return await task, events
+
+    stats, events = asyncio.run(run())
+    assert stats.converted_cells == 2 * 200 * 2
+    assert load_workbook(out)["B"]["C200"].value == "Thành phố"
+    assert [e.rows_done for e in events] == sorted(e.rows_done for e in events)
+    assert events[-1].percent == 100 and events[-1].total_rows == 400
+    assert {e.sheet for e in events} >= {"A", "B"}
+
+
+def test_cancel_stops_worker_and_removes_output(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx", rows=5000, write_only=True)
+    out = tmp_path / "out.xlsx"
+
+    async def run():
+        progress = ConversionProgress()
+        task = asyncio.create_task(convert_excel_async(
+            src, out, progress=progress, engine="streaming",
+            progress_every_rows=100, progress_interval_ms=0,
+        ))
+        first = await progress.__anext__()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # Iterator kết thúc sau khi hủy
+        rest = await collect(progress)
+        return first, rest
+
+    first, rest = asyncio.run(run())
+    assert all(e.rows_done < 10000 for e in [first, *rest])
+    assert not out.exists()
+    assert [p.name for p in tmp_path.iterdir()] == ["in.xlsx"]  # Không còn file .partial
+
+
+def test_timeout_cancels_preview(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx", rows=5000, write_only=True)
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(preview_conversion_async(src), timeout=0.05)
+
+    asyncio.run(run())
+
+
+def test_process_executor_forwards_progress(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+    out = tmp_path / "out.xlsx"
+
+    async def run():
+        progress = ConversionProgress()
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            task = asyncio.create_task(convert_excel_async(
+                src, out, executor=executor, progress=progress, engine="streaming",
+                progress_every_rows=50, progress_interval_ms=0,
+            ))
+            events = await collect(progress)
+            return await task, events
+
+    stats, events = asyncio.run(run())
+    assert stats.converted_cells == 800
+    assert events and events[-1].percent == 100
+
+
+def test_rejects_on_progress_and_cancel_event(tmp_path):
+    with pytest.raises(TypeError):
+        asyncio.run(convert_excel_async(tmp_path / "in.xlsx", tmp_path / "out.xlsx", on_progress=print))
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Test convert_batch, command line batch và _batch_task
+"""
+import json
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import ooxml_converter
+from convert_excel_tcvn3 import (
+    BatchFileResult,
+    _batch_task,
+    convert_batch,
+    convert_file,
+    main,
+    plan_batch,
+    register_tcvn3_codec,
+)
+
+SAMPLE = Path(__file__).parent / "input_tcvn3.xlsx"
+
+
+def test_batch_task_runs_engine_with_one_worker(tmp_path):
+    # Pool của batch đã song song theo file: engine xml không được tạo pool lồng
+    seen = {}
+    original = ooxml_converter.convert_xlsx_xml
+    
+    def spy(*args, **kwargs):
+        seen["workers"] = kwargs.get("workers")
+        return original(*args, **kwargs)
+    
+    with mock.patch.object(ooxml_converter, "convert_xlsx_xml", spy):
+        item = _batch_task(BatchFileResult(str(SAMPLE), str(tmp_path / "out.xlsx")),
+                           {"engine": "xml"}, keep_logs=False, quiet=True)
+    assert item.ok, item.error
+    assert seen["workers"] == 1
+
+
+def test_convert_file_rejects_options_the_file_type_ignores(tmp_path):
+    text = tmp_path / "a.txt"
+    text.write_text("Hµ Néi\n", encoding="utf-8")
+    for options in ({"direction": "to_tcvn3"}, {"source_charset": "vni"}, {"detector": "statistical"}):
+        with pytest.raises(ValueError, match=next(iter(options))):
+            convert_file(text, tmp_path / "out.txt", **options)
+    
+    docx = tmp_path / "a.docx"
+    with zipfile.ZipFile(docx, "w") as z:
+        z.writestr("word/document.xml", "<w:document><w:p><w:r><w:t>Hµ Néi</w:t></w:r></w:p></w:document>")
+    for options in ({"engine": "inplace"}, {"highlight_converted": True}, {"remap_fonts": True}):
+        with pytest.raises(ValueError, match=next(iter(options))):
+            convert_file(docx, tmp_path / "out.docx", **options)
+    
+    # Giá trị mặc định và workers (mức song song) không gây lỗi
+    stats = convert_file(text, tmp_path / "out.txt", engine="pandas", highlight_converted=False, workers=1)
+    assert (tmp_path / "out.txt").read_text(encoding="utf-8") == "Hà Nội\n"
+    stats = convert_file(docx, tmp_path / "out.docx", direction="to_unicode", workers=1)
+    assert stats.converted_cells == 1
+
+
+def test_cli_glob_without_matches_fails(tmp_path, capsys):
+    code = main([str(tmp_path / "*.xlsx"), "-o", str(tmp_path / "out")])
+    assert code == 2
+    assert "Không có file nào khớp" in capsys.readouterr().err
+
+
+def test_cli_empty_directory_fails(tmp_path, capsys):
+    (tmp_path / "in").mkdir()
+    code = main([str(tmp_path / "in"), "-o", str(tmp_path / "out"), "--json"])
+    assert code == 2
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert "Không có file nào để convert" in captured.err
+
+
+def make_inbox(tmp_path):
+    """Thư mục input: 2 workbook (lớn/nhỏ), 1 CSV .VnTime, 1 file hỏng, 1 file khóa Office"""
+    register_tcvn3_codec()
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    for name, rows in (("small.xlsx", 1), ("big.xlsx", 300)):
+        wb = Workbook()
+        for i in range(rows):
+            wb.active.append(["Hµ Néi", i])
+        wb.save(inbox / name)
+    (inbox / "list.csv").write_bytes("Tên\nHà Nội\n".encode("tcvn3"))
+    (inbox / "broken.xlsx").write_bytes(b"khong phai file excel")
+    (inbox / "~$small.xlsx").write_bytes(b"lock")
+    return inbox
+
+
+def test_plan_batch_orders_by_size_and_applies_template(tmp_path):
+    inbox = make_inbox(tmp_path)
+    plan = plan_batch([inbox], tmp_path / "out", "{parent}_{stem}{suffix}")
+    names = [Path(item.input_path).name for item in plan]
+    assert sorted(names) == ["big.xlsx", "broken.xlsx", "list.csv", "small.xlsx"]
+    assert [item.size for item in plan] == sorted((item.size for item in plan), reverse=True)
+    assert Path(plan[0].output_path) == tmp_path / "out" / "inbox_big.xlsx"
+
+
+def test_convert_batch_isolates_failures(tmp_path):
+    inbox = make_inbox(tmp_path)
+    out = tmp_path / "out"
+    seen = []
+    result = convert_batch(inbox, out, workers=2, on_result=seen.append, quiet=True)
+    
+    assert len(seen) == len(result.files) == 4
+    assert [Path(item.input_path).name for item in result.failed] == ["broken.xlsx"]
+    assert load_workbook(out / "big.xlsx").active["A300"].value == "Hà Nội"
+    assert (out / "list.csv").read_text(encoding="utf-8") == "Tên\nHà Nội\n"
+    excel = [item.stats for item in result.files if item.ok and item.input_path.endswith(".xlsx")]
+    assert result.totals.converted_cells == sum(s.converted_cells for s in excel) == 301
+
+
+def test_cli_json_output_and_exit_code(tmp_path, capsys):
+    inbox = make_inbox(tmp_path)
+    code = main([str(inbox / "*.xlsx"), "-o", str(tmp_path / "out"), "-j", "1", "--json"])
+    assert code == 1  # broken.xlsx lỗi
+    report = json.loads(capsys.readouterr().out)
+    by_name = {Path(f["input"]).name: f for f in report["files"]}
+    assert sorted(by_name) == ["big.xlsx", "broken.xlsx", "small.xlsx"]
+    assert not by_name["broken.xlsx"]["ok"] and by_name["broken.xlsx"]["error"]
+    assert report["totals"]["converted_cells"] == 301
+
+
+def test_cli_jsonl_and_dry_run(tmp_path, capsys):
+    inbox = make_inbox(tmp_path)
+    out = tmp_path / "out"
+    assert main([str(inbox / "small.xlsx"), str(inbox / "list.csv"), "-o", str(out), "--dry-run", "--jsonl"]) == 0
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [Path(r["input"]).name for r in rows] == ["small.xlsx", "list.csv"]
+    assert not out.exists() or not any(out.iterdir())
+    
+    assert main([str(inbox / "small.xlsx"), str(inbox / "list.csv"), "-o", str(out), "--jsonl"]) == 0
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert all(line["ok"] for line in lines[:-1])
+    assert lines[-1] == {"totals": lines[-1]["totals"], "failed": 0}
+    assert lines[-1]["totals"]["converted_cells"] == 1
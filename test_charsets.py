@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Test nhận diện và convert của từng bảng mã trong registry (VNI, cp1258, VIQR)
+"""
+import pytest
+
+from convert_excel_tcvn3 import convert_strings, get_charset_converter
+
+
+@pytest.mark.parametrize("charset, text, expected", [
+    ("vni", "Toâi", "Tôi"),
+    ("vni", "khoâng", "không"),
+    ("vni", "Ñaø Naüng", "Đà Nẵng"),
+    ("cp1258", "HaÌ Nôòi", "Hà Nội"),
+    ("cp1258", "Viêòt", "Việt"),
+    ("viqr", "Vie^.t Nam", "Việt Nam"),
+    ("viqr", "Ngu+o+`i lao ddo^.ng", "Người lao động"),
+    ("viqr", "Xin cha`o ba.n.", "Xin chào bạn."),
+])
+def test_legacy_text_is_converted(charset, text, expected):
+    conv = get_charset_converter(charset)
+    assert not conv.is_unicode(text)
+    result = convert_strings([text], source_charset=charset)
+    assert result.values == [expected]
+
+
+@pytest.mark.parametrize("charset", ["vni", "cp1258", "viqr"])
+@pytest.mark.parametrize("text", ["Hà Nội", "Tôi không biết", "Thành phố Hồ Chí Minh", "hoà bình", "123"])
+def test_unicode_text_is_skipped(charset, text):
+    assert get_charset_converter(charset).is_unicode(text)
+    assert convert_strings([text], source_charset=charset).values == [text]
+
+
+@pytest.mark.parametrize("text", ["address", "www.example.com", "Are you sure?", "Is it so?", "don't"])
+def test_viqr_leaves_english_alone(text):
+    conv = get_charset_converter("viqr")
+    assert conv.is_unicode(text)
+    assert conv.to_unicode(text) == text
+
+
+def test_viqr_escape():
+    conv = get_charset_converter("viqr")
+    assert conv.to_unicode("ddi\\.") == "đi."
+    assert conv.to_unicode("Ba.n co' kho?e kho^ng\\?") == "Bạn có khỏe không?"
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Test checkpoint/resume và cache kết quả của convert_excel
+"""
+import json
+import threading
+from unittest import mock
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import convert_excel_tcvn3
+from convert_excel_tcvn3 import ConversionCancelled, convert_excel
+
+
+def make_workbook(path, sheets=3):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for k in range(sheets):
+        ws = wb.create_sheet(f"S{k}")
+        ws.append(["Hµ Néi", k])
+        ws.append(["Th¸nh phè", "Hà Nội"])
+    wb.save(path)
+    return path
+
+
+def cancel_at_sheet(src, out, sheet_idx, **kwargs):
+    """
+    Convert với checkpoint, đặt lệnh hủy khi sheet thứ sheet_idx bắt đầu: lệnh hủy
+    được kiểm tra sau sheet đó, nên các sheet 0..sheet_idx đã có trong checkpoint
+    """
+    cancel = threading.Event()
+
+    def on_progress(event):
+        if event.sheet_idx == sheet_idx:
+            cancel.set()
+
+    with pytest.raises(ConversionCancelled):
+        convert_excel(src, out, checkpoint=True, on_progress=on_progress, cancel_event=cancel, **kwargs)
+
+
+def count_sheet_conversions(**kwargs):
+    """Gọi convert_excel, trả về (stats, số sheet thực sự được đọc + convert)"""
+    original = convert_excel_tcvn3._convert_pandas_sheet
+    with mock.patch.object(convert_excel_tcvn3, "_convert_pandas_sheet", wraps=original) as spy:
+        stats = convert_excel(**kwargs)
+    return stats, spy.call_count
+
+
+def read_values(path):
+    return {name: df.fillna("").values.tolist()
+            for name, df in pd.read_excel(path, sheet_name=None, header=None).items()}
+
+
+def test_resume_skips_finished_sheets(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+    out = tmp_path / "out.xlsx"
+    ckpt_dir = tmp_path / "out.xlsx.checkpoint"
+    cancel_at_sheet(src, out, 1)
+    assert not out.exists()
+    state = json.loads((ckpt_dir / "state.json").read_text(encoding="utf-8"))
+    assert sorted(state["done"]) == ["S0", "S1"]
+
+    stats, converted = count_sheet_conversions(input_path=src, output_path=out, resume=True)
+    assert converted == 1  # Chỉ còn S2
+    assert not ckpt_dir.exists()
+
+    fresh = convert_excel(src, tmp_path / "fresh.xlsx")
+    assert read_values(out) == read_values(tmp_path / "fresh.xlsx")
+    assert (stats.total_cells, stats.converted_cells, stats.sheets_processed, len(stats.logs)) == (
+        fresh.total_cells, fresh.converted_cells, fresh.sheets_processed, len(fresh.logs))
+
+
+def test_resume_after_input_change_starts_over(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+    out = tmp_path / "out.xlsx"
+    cancel_at_sheet(src, out, 1)
+    make_workbook(src, sheets=4)  # Input bị thay: checkpoint cũ không còn đúng
+
+    stats, converted = count_sheet_conversions(input_path=src, output_path=out, resume=True)
+    assert converted == 4
+    assert stats.sheets_processed == 4
+    assert load_workbook(out)["S3"]["A1"].value == "Hà Nội"
+
+
+def test_resume_after_map_change_starts_over(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+    out = tmp_path / "out.xlsx"
+    cancel_at_sheet(src, out, 1)
+    # File map đổi giữa hai lần chạy
+    with mock.patch.object(convert_excel_tcvn3, "_map_version", lambda *args: "map-moi"):
+        _, converted = count_sheet_conversions(input_path=src, output_path=out, resume=True)
+    assert converted == 3
+
+
+def test_resume_after_backend_change_starts_over(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+    out = tmp_path / "out.xlsx"
+    cancel_at_sheet(src, out, 1)
+    state = json.loads((tmp_path / "out.xlsx.checkpoint" / "state.json").read_text(encoding="utf-8"))
+    assert state["fingerprint"]["backend"] == "translate" and state["fingerprint"]["map"]
+
+    convert_excel_tcvn3.set_converter_backend("regex")
+    try:
+        _, converted = count_sheet_conversions(input_path=src, output_path=out, resume=True)
+    finally:
+        convert_excel_tcvn3.set_converter_backend("translate")
+    assert converted == 3
+
+
+def test_resume_with_highlight_invalidates_checkpoint(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+    out = tmp_path / "out.xlsx"
+    cancel_at_sheet(src, out, 1)
+
+    convert_excel(src, out, resume=True, highlight_converted=True)
+    wb = load_workbook(out)
+    assert all(wb[s]["A1"].fill.fgColor.rgb == "00FFFF00" for s in wb.sheetnames)
+
+
+def test_cache_key_includes_highlight(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+    cache = tmp_path / "cache"
+    convert_excel(src, tmp_path / "plain.xlsx", cache_dir=cache)
+    convert_excel(src, tmp_path / "hl.xlsx", cache_dir=cache, highlight_converted=True)
+    wb = load_workbook(tmp_path / "hl.xlsx")
+    assert wb["S0"]["A1"].fill.fgColor.rgb == "00FFFF00"
+
+
+def test_cache_hit_skips_conversion(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+    cache = tmp_path / "cache"
+    first, converted = count_sheet_conversions(input_path=src, output_path=tmp_path / "a.xlsx", cache_dir=cache)
+    assert converted == 3
+
+    # Cùng nội dung, khác tên/vị trí: vẫn dùng kết quả trong cache
+    copy = tmp_path / "copy.xlsx"
+    copy.write_bytes(src.read_bytes())
+    second, converted = count_sheet_conversions(input_path=copy, output_path=tmp_path / "b.xlsx", cache_dir=cache)
+    assert converted == 0
+    assert (tmp_path / "b.xlsx").read_bytes() == (tmp_path / "a.xlsx").read_bytes()
+    assert (second.converted_cells, len(second.logs)) == (first.converted_cells, len(first.logs))
+
+
+def test_cache_miss_on_option_or_content_change(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+    cache = tmp_path / "cache"
+    convert_excel(src, tmp_path / "a.xlsx", cache_dir=cache)
+    _, converted = count_sheet_conversions(
+        input_path=src, output_path=tmp_path / "b.xlsx", cache_dir=cache, skip_unicode=False)
+    assert converted == 3
+    make_workbook(src, sheets=2)
+    _, converted = count_sheet_conversions(input_path=src, output_path=tmp_path / "c.xlsx", cache_dir=cache)
+    assert converted == 2
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = tmp_path / "cache"
+    a = make_workbook(tmp_path / "a.xlsx", sheets=1)
+    b = make_workbook(tmp_path / "b.xlsx", sheets=2)
+    convert_excel(a, tmp_path / "out_a.xlsx", cache_dir=cache)
+    entry_size = sum(f.stat().st_size for f in cache.glob("??/*/*"))
+    # Chỉ đủ chỗ cho khoảng 1 entry: entry của a (dùng lâu nhất) bị xóa khi lưu b
+    convert_excel(b, tmp_path / "out_b.xlsx", cache_dir=cache, cache_max_bytes=entry_size * 3 // 2)
+    assert len(list(cache.glob("??/*"))) == 1
+    _, converted = count_sheet_conversions(
+        input_path=a, output_path=tmp_path / "out_a2.xlsx", cache_dir=cache)
+    assert converted == 1
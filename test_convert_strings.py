@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Test convert_strings: kết quả và thống kê giống hệt convert từng chuỗi
+"""
+import math
+import random
+
+from convert_excel_tcvn3 import (
+    convert_strings,
+    looks_like_unicode_vietnamese,
+    tcvn3_to_unicode,
+    unicode_to_tcvn3,
+)
+
+WORDS = ["Hà Nội", "Thành phố", "Đồng bằng", "sông Cửu Long", "Việt Nam", "abc", "123", "A-01"]
+
+
+def expected_one(value, skip_unicode=True):
+    if not isinstance(value, str) or not value.strip():
+        return value
+    if skip_unicode and looks_like_unicode_vietnamese(value):
+        return value
+    return tcvn3_to_unicode(value)
+
+
+def test_mixed_values():
+    values = ["Hµ Néi", None, 5, "", "Hà Nội", "Hµ Néi", "  ", 2.5, "abc"]
+    result = convert_strings(values)
+    assert result.values == ["Hà Nội", None, 5, "", "Hà Nội", "Hà Nội", "  ", 2.5, "abc"]
+    assert result.is_unicode == [False, None, None, None, True, False, None, None, True]
+    stats = result.stats
+    assert (stats.total_cells, stats.string_cells, stats.converted_cells) == (9, 4, 2)
+    assert (stats.already_unicode, stats.unchanged_cells) == (2, 0)
+    assert result.unique_strings == 7  # None không tính
+
+
+def test_matches_per_string_conversion():
+    rng = random.Random(7)
+    values = []
+    for _ in range(500):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        values.append(unicode_to_tcvn3(text) if rng.random() < 0.5 else text)
+    values += [None, math.nan, 0]
+    result = convert_strings(values)
+    expected = [expected_one(v) for v in values]
+    assert result.values[:-2] == expected[:-2]
+    assert math.isnan(result.values[-2]) and result.values[-1] == 0
+    assert result.stats.converted_cells == sum(
+        isinstance(v, str) and e != v for v, e in zip(values, expected))
+
+
+def test_separator_inside_value_and_no_skip():
+    values = ["Hµ\x00Néi", "Hà Nội"]
+    assert convert_strings(values).values == ["Hà\x00Nội", "Hà Nội"]
+    # skip_unicode=False: chuỗi Unicode cũng đi qua bảng convert
+    result = convert_strings(values, skip_unicode=False)
+    assert result.values == [expected_one(v, skip_unicode=False) for v in values]
+
+
+def test_to_tcvn3_direction():
+    values = ["Hà Nội", "Hµ Néi", None]
+    result = convert_strings(values, direction="to_tcvn3")
+    assert result.values == [unicode_to_tcvn3("Hà Nội"), "Hµ Néi", None]
+    assert (result.stats.converted_cells, result.stats.already_legacy) == (1, 1)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Test các backend convert TCVN3 → Unicode (CONVERTER_BACKENDS) cho kết quả giống hệt nhau
+"""
+import json
+
+import pytest
+
+import convert_excel_tcvn3
+from convert_excel_tcvn3 import (
+    CONVERTER_BACKENDS,
+    MAP_JSON,
+    disable_memo_cache,
+    enable_memo_cache,
+    set_converter_backend,
+    tcvn3_to_unicode,
+)
+
+with MAP_JSON.open(encoding="utf-8") as f:
+    MAP = json.load(f)
+
+SENTENCES = [
+    "Céng hoµ x· héi chñ nghÜa ViÖt Nam",
+    "§éc lËp - Tù do - H¹nh phóc",
+    "Thµnh phè Hå ChÝ Minh, ngµy 30 th¸ng 4 n¨m 1975",
+    "B¸o c¸o tæng kÕt: 1.234,5 triÖu ®ång (t¨ng 12%)",
+    "Hµ Néi\tH¶i Phßng\n§µ N½ng",
+]
+
+
+def convert_all(text):
+    return {name: tcvn3_to_unicode(text, backend=name) for name in CONVERTER_BACKENDS}
+
+
+@pytest.mark.parametrize("key", sorted(MAP))
+def test_backends_agree_on_every_map_key(key):
+    for text in (key, key.upper(), f"A{key}b {key}{key}", f"x{key.upper()}Y"):
+        results = convert_all(text)
+        assert len(set(results.values())) == 1, (text, results)
+    assert convert_all(key)["translate"] == MAP[key]
+
+
+@pytest.mark.parametrize("text", SENTENCES + [s.upper() for s in SENTENCES])
+def test_backends_agree_on_sentences(text):
+    results = convert_all(text)
+    assert len(set(results.values())) == 1, results
+
+
+def test_set_converter_backend_switches_default():
+    text = SENTENCES[0]
+    expected = tcvn3_to_unicode(text, backend="translate")
+    enable_memo_cache()
+    try:
+        for name in CONVERTER_BACKENDS:
+            set_converter_backend(name)
+            assert convert_excel_tcvn3._CONVERTER_BACKEND == name
+            assert tcvn3_to_unicode(text) == expected
+    finally:
+        set_converter_backend("translate")
+        disable_memo_cache()
+    with pytest.raises(ValueError):
+        set_converter_backend("khong-co")
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""
+Test detect_source_encoding: chuỗi quá ngắn/chỉ ký hiệu, mẫu TCVN3, Unicode, VNI
+"""
+import pytest
+
+from convert_excel_tcvn3 import DETECT_MIN_LETTERS, convert_strings, detect_source_encoding
+
+
+@pytest.mark.parametrize("text", ["®", "©", "¸", "µ", "ACME®", "© 2024 ACME", "10 µm"])
+def test_symbols_are_not_tcvn3(text):
+    assert detect_source_encoding(text)[0] != "tcvn3"
+
+
+@pytest.mark.parametrize("text", ["Hµ Néi", "Thµnh phè", "B¸o c¸o", "x·", "®i", "®Ó", "quan träng"])
+def test_tcvn3_samples(text):
+    label, confidence = detect_source_encoding(text)
+    assert label == "tcvn3" and confidence > 0.9
+
+
+@pytest.mark.parametrize("text", ["Hà Nội", "Thành phố Hồ Chí Minh", "Cộng hòa xã hội"])
+def test_unicode_samples(text):
+    assert detect_source_encoding(text)[0] == "unicode"
+
+
+@pytest.mark.parametrize("text", ["Haø Noäi", "Thaønh phoá", "Coäng hoøa xaõ hoäi"])
+def test_vni_samples_are_not_tcvn3(text):
+    label, confidence = detect_source_encoding(text)
+    assert label == "vni" and confidence > 0.9
+
+
+def test_min_letters():
+    assert DETECT_MIN_LETTERS == 2
+    assert detect_source_encoding("®")[0] != "tcvn3"
+    assert detect_source_encoding("®i")[0] == "tcvn3"
+
+
+def test_statistical_detector_keeps_symbols():
+    # tcvn3_to_unicode("ACME®") == "ACMEđ": chỉ detector quyết định có convert hay không
+    values = ["®", "©", "ACME®", "Haø Noäi", "Hµ Néi"]
+    result = convert_strings(values, detector="statistical")
+    assert result.values == ["®", "©", "ACME®", "Haø Noäi", "Hà Nội"]
+    assert result.stats.converted_cells == 1
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Test các engine của convert_excel cho cùng kết quả với engine pandas
+"""
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font, PatternFill
+
+from convert_excel_tcvn3 import convert_excel
+
+SAMPLE = Path(__file__).parent / "input_tcvn3.xlsx"
+STAT_FIELDS = ("total_cells", "string_cells", "already_unicode", "converted_cells",
+               "unchanged_cells", "sheets_processed")
+
+
+def make_workbook(path):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Data"
+    ws.append(["Hµ Néi", 1, None, None])
+    ws.append(["Thµnh phè", "Hà Nội", 2.5])
+    ws.append([None, None])
+    ws.append(["abc", None, "Hµ Néi", None, None])
+    # Ô trống có định dạng ở xa: vùng dimension rộng hơn vùng dữ liệu
+    ws["H10"].fill = PatternFill("solid", start_color="FFFF00")
+    wb.create_sheet("Empty")
+    ws = wb.create_sheet("Offset")
+    ws["C5"] = "Thµnh phè"
+    wb.save(path)
+
+
+def read_values(path):
+    sheets = pd.read_excel(path, sheet_name=None, header=None)
+    return {name: df.fillna("").values.tolist() for name, df in sheets.items()}
+
+
+def run(tmp_path, engine, **kwargs):
+    src = tmp_path / "in.xlsx"
+    if not src.exists():
+        make_workbook(src)
+    out = tmp_path / f"out_{engine}.xlsx"
+    stats = convert_excel(str(src), str(out), engine=engine, **kwargs)
+    return stats, read_values(out)
+
+
+def stat_values(stats):
+    return {f: getattr(stats, f) for f in STAT_FIELDS}
+
+
+def test_streaming_matches_pandas(tmp_path):
+    expected_stats, expected = run(tmp_path, "pandas")
+    stats, values = run(tmp_path, "streaming")
+    assert values == expected
+    assert stat_values(stats) == stat_values(expected_stats)
+    assert expected["Data"][0][0] == "Hà Nội"
+
+
+def test_total_cells_ignores_trailing_empty_columns(tmp_path):
+    # Data: 4 hàng × 3 cột, Empty: 0, Offset: 5 × 3 (giống shape của pandas)
+    for engine in ("pandas", "streaming"):
+        stats, _ = run(tmp_path, engine)
+        assert stats.total_cells == 4 * 3 + 5 * 3, engine
+
+
+def test_inplace_matches_pandas(tmp_path):
+    expected_stats, expected = run(tmp_path, "pandas")
+    stats, values = run(tmp_path, "inplace")
+    assert values == expected
+    assert stat_values(stats) == stat_values(expected_stats)
+
+
+def test_inplace_keeps_formatting_and_formulas(tmp_path):
+    src, out = tmp_path / "fmt.xlsx", tmp_path / "fmt_out.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    ws["A1"] = "Hµ Néi"
+    ws["A1"].font = Font(bold=True, color="FF0000")
+    ws["A1"].fill = PatternFill("solid", start_color="00FF00")
+    ws["B1"] = 2
+    ws["B2"] = "=B1*2"
+    ws.column_dimensions["A"].width = 33
+    ws.merge_cells("C1:D1")
+    wb.save(src)
+
+    convert_excel(str(src), str(out), engine="inplace")
+    ws = load_workbook(out).active
+    assert ws["A1"].value == "Hà Nội"
+    assert ws["A1"].font.bold and ws["A1"].font.color.rgb.endswith("FF0000")
+    assert ws["A1"].fill.start_color.rgb.endswith("00FF00")
+    assert ws["B2"].value == "=B1*2"
+    assert ws.column_dimensions["A"].width == 33
+    assert "C1:D1" in {str(r) for r in ws.merged_cells.ranges}
+
+
+def test_xml_engine_matches_pandas_and_copies_other_parts(tmp_path):
+    # File mẫu từ Excel: chuỗi nằm trong xl/sharedStrings.xml
+    expected_stats = convert_excel(str(SAMPLE), str(tmp_path / "pandas.xlsx"), engine="pandas")
+    stats = convert_excel(str(SAMPLE), str(tmp_path / "xml.xlsx"), engine="xml", workers=1)
+    assert read_values(tmp_path / "xml.xlsx") == read_values(tmp_path / "pandas.xlsx")
+    assert stats.converted_cells > 0 and expected_stats.converted_cells > 0
+
+    with zipfile.ZipFile(SAMPLE) as zin, zipfile.ZipFile(tmp_path / "xml.xlsx") as zout:
+        assert zout.namelist() == zin.namelist()
+        for info in zin.infolist():
+            if info.filename == "xl/sharedStrings.xml":
+                continue
+            out = zout.getinfo(info.filename)
+            assert zout.read(out) == zin.read(info), info.filename
+            assert (out.compress_type, out.CRC) == (info.compress_type, info.CRC)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_xml_engine_inline_strings_match_pandas(tmp_path, workers):
+    # openpyxl ghi chuỗi dạng inline string trong worksheet
+    expected_stats, expected = run(tmp_path, "pandas")
+    stats, values = run(tmp_path, "xml", workers=workers)
+    assert values == expected
+    assert (stats.converted_cells, stats.sheets_processed) == (
+        expected_stats.converted_cells, expected_stats.sheets_processed)
+    assert [(log.sheet, log.row, log.col, log.converted) for log in stats.logs] == [
+        (log.sheet, log.row, log.col, log.converted) for log in expected_stats.logs]
+
+
+def test_pandas_workers_match_sequential(tmp_path):
+    src = tmp_path / "multi.xlsx"
+    wb = Workbook()
+    wb.remove(wb.active)
+    for k in range(4):
+        ws = wb.create_sheet(f"S{k}")
+        for i in range(20 * (k + 1)):  # Sheet lớn nhỏ khác nhau: xong không theo thứ tự
+            ws.append(["Hµ Néi", i, "Thµnh phè" if i % 3 else "Hà Nội"])
+    wb.save(src)
+
+    def convert(workers):
+        out = tmp_path / f"out_{workers}.xlsx"
+        stats = convert_excel(str(src), str(out), workers=workers, highlight_converted=True)
+        fills = {ws.title: [c.coordinate for row in ws.iter_rows() for c in row
+                            if c.fill.fill_type == "solid"]
+                 for ws in load_workbook(out).worksheets}
+        logs = [(log.sheet, log.row, log.col, log.original, log.converted) for log in stats.logs]
+        return stat_values(stats), logs, read_values(out), fills
+
+    assert convert(2) == convert(1)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Test font_encoding và engine inplace với font_aware: font TCVN3 thường/chữ hoa, font Unicode, rich text nhiều font
+"""
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+from openpyxl.styles import Font
+
+from convert_excel_tcvn3 import convert_excel, font_encoding
+
+
+@pytest.mark.parametrize("name, expected", [
+    (".VnTime", "tcvn3"),
+    ("VnTime", "tcvn3"),
+    (".VnArial Narrow", "tcvn3"),
+    (".VnTimeH", "tcvn3_upper"),
+    (".VnArialH", "tcvn3_upper"),
+    ("Times New Roman", "unicode"),
+    ("VNI-Times", "unicode"),
+    ("", "unicode"),
+    (None, "unicode"),
+])
+def test_font_encoding(name, expected):
+    assert font_encoding(name) == expected
+
+
+def make_workbook(path):
+    wb = Workbook()
+    ws = wb.active
+    for row, (text, font) in enumerate([
+        ("Hµ Néi", ".VnTime"),
+        ("Hµ Néi", ".VnTimeH"),
+        ("Cà phê", "Times New Roman"),
+        # Font Unicode: chuỗi TCVN3 vẫn giữ nguyên vì font quyết định bảng mã
+        ("Thµnh phè", "Arial"),
+    ], start=1):
+        ws.cell(row, 1, text).font = Font(name=font)
+    # Cell font Unicode, chỉ một run dùng .VnTime
+    ws["B1"] = CellRichText([TextBlock(InlineFont(rFont=".VnTime", b=True), "Hµ Néi"), " - Cà phê"])
+    ws["B1"].font = Font(name="Arial")
+    # Cell font .VnTime, run chữ hoa và run Unicode
+    ws["B2"] = CellRichText(["Thµnh phè ", TextBlock(InlineFont(rFont=".VnTimeH"), "Hµ Néi"),
+                             TextBlock(InlineFont(rFont="Arial"), " Cà phê")])
+    ws["B2"].font = Font(name=".VnTime")
+    wb.save(path)
+    return path
+
+
+def run(tmp_path, **kwargs):
+    src = make_workbook(tmp_path / "in.xlsx")
+    out = tmp_path / "out.xlsx"
+    stats = convert_excel(src, out, engine="inplace", font_aware=True, **kwargs)
+    wb = load_workbook(out, rich_text=True)
+    return stats, wb.active
+
+
+def test_font_decides_encoding(tmp_path):
+    stats, ws = run(tmp_path)
+    assert [ws.cell(r, 1).value for r in range(1, 5)] == ["Hà Nội", "HÀ NỘI", "Cà phê", "Thµnh phè"]
+    assert stats.converted_cells == 4
+
+
+def test_rich_text_run_font_in_unicode_cell(tmp_path):
+    stats, ws = run(tmp_path)
+    rich = ws["B1"].value
+    assert [part if isinstance(part, str) else part.text for part in rich] == ["Hà Nội", " - Cà phê"]
+    assert rich[0].font.b  # Định dạng run giữ nguyên
+    assert any(log.row == 1 and log.col == 1 and log.converted == "Hà Nội - Cà phê" for log in stats.logs)
+
+
+def test_rich_text_mixed_fonts(tmp_path):
+    _, ws = run(tmp_path)
+    rich = ws["B2"].value
+    assert [part if isinstance(part, str) else part.text for part in rich] == [
+        "Thành phố ", "HÀ NỘI", " Cà phê"]
+
+
+def test_rich_text_without_skip_unicode(tmp_path):
+    # Không skip: đoạn font Unicode cũng đi qua bảng TCVN3 (ê → ờ)
+    _, ws = run(tmp_path, skip_unicode=False)
+    rich = ws["B1"].value
+    assert [part if isinstance(part, str) else part.text for part in rich] == ["Hà Nội", " - Cà phờ"]
+    assert ws["A3"].value == "Cà phờ"
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Test ConversionServer qua HTTP thật: server chạy trên cổng ngẫu nhiên trong một
+thread riêng, client là http.client của thư viện chuẩn
+"""
+import asyncio
+import http.client
+import io
+import json
+import socket
+import threading
+import time
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from http_converter import ConversionServer
+
+
+@pytest.fixture
+def server():
+    """ConversionServer(workers=1, max_queue=0) đang chạy; trả về object server"""
+    srv = ConversionServer(port=0, workers=1, max_queue=0)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    
+    async def shutdown():
+        await srv.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(srv.start())
+        started.set()
+        loop.run_forever()
+        loop.close()
+    
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(60)
+    yield srv
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(60)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(60)
+
+
+def request(srv, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", srv.port, timeout=60)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        resp = conn.getresponse()
+        return resp.status, dict(resp.getheaders()), resp.read()
+    finally:
+        conn.close()
+
+
+def workbook_bytes():
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Hµ Néi", "Hà Nội", 1])
+    ws.append(["Thµnh phè", None, 2])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_health_and_metrics(server):
+    status, _, body = request(server, "GET", "/health")
+    assert status == 200 and json.loads(body) == {"status": "ok"}
+    status, _, body = request(server, "GET", "/metrics")
+    metrics = json.loads(body)
+    assert status == 200
+    assert metrics["workers"] == 1 and metrics["inflight"] == 0
+
+
+def test_convert(server):
+    status, headers, body = request(server, "POST", "/convert?filename=bang.xlsx", workbook_bytes())
+    assert status == 200
+    stats = json.loads(headers["X-Conversion-Stats"])
+    assert stats["converted_cells"] == 2 and stats["already_unicode"] == 1
+    ws = load_workbook(io.BytesIO(body)).active
+    assert [c.value for c in ws[1]] == ["Hà Nội", "Hà Nội", 1]
+    assert ws["A2"].value == "Thành phố"
+
+
+def test_preview(server):
+    status, _, body = request(server, "POST", "/preview?filename=bang.xlsx", workbook_bytes())
+    samples = json.loads(body)["samples"]
+    assert status == 200
+    assert {(s["original"], s["converted"]) for s in samples} >= {("Hµ Néi", "Hà Nội")}
+
+
+def test_strings(server):
+    payload = json.dumps(["Hµ Néi", "Hà Nội", "Hµ Néi"]).encode("utf-8")
+    status, _, body = request(server, "POST", "/strings", payload, {"Content-Type": "application/json"})
+    result = json.loads(body)
+    assert status == 200
+    assert result["values"] == ["Hà Nội", "Hà Nội", "Hà Nội"]
+    assert result["is_unicode"] == [False, True, False]
+
+
+def test_rejects_with_503_when_admission_full(server):
+    # Request thứ nhất giữ chỗ duy nhất (workers=1, max_queue=0) vì body chưa gửi xong
+    body = workbook_bytes()
+    sock = socket.create_connection(("127.0.0.1", server.port), timeout=60)
+    try:
+        sock.sendall(
+            b"POST /convert?filename=a.xlsx HTTP/1.1\r\nHost: x\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body[:10]
+        )
+        deadline = time.monotonic() + 30
+        while server.metrics()["inflight"] < 1:
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+        
+        status, headers, _ = request(server, "POST", "/convert?filename=b.xlsx", body)
+        assert status == 503
+        assert headers["Retry-After"] == "1"
+        assert json.loads(request(server, "GET", "/metrics")[2])["rejected"] == 1
+    finally:
+        sock.close()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Test MemoCache (LRU, eviction) và bộ đếm hit/miss/eviction trong ConversionStats
+"""
+import threading
+
+import pytest
+from openpyxl import Workbook
+
+import convert_excel_tcvn3
+from convert_excel_tcvn3 import (
+    ConversionStats,
+    MemoCache,
+    _memo_scope,
+    convert_excel,
+    disable_memo_cache,
+    enable_memo_cache,
+    tcvn3_to_unicode,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_shared_memo():
+    disable_memo_cache()
+    yield
+    disable_memo_cache()
+
+
+def test_lru_eviction():
+    cache = MemoCache(maxsize=2)
+    computed = []
+
+    def compute(s):
+        computed.append(s)
+        return s.upper()
+
+    for s in ["a", "b", "a", "c", "b"]:
+        assert cache.lookup(s, 0, compute) == s.upper()
+    # "a" vừa được dùng nên "b" bị loại khi thêm "c"; thêm lại "b" thì loại "a"
+    assert computed == ["a", "b", "c", "b"]
+    assert (cache.hits, cache.misses, cache.evictions, len(cache)) == (1, 4, 2, 2)
+    cache.lookup("c", 0, compute)
+    assert computed[-1] == "b"  # "c" vẫn còn trong cache
+
+    with pytest.raises(ValueError):
+        MemoCache(maxsize=0)
+
+
+def test_slots_share_one_entry():
+    cache = MemoCache(maxsize=1)
+    cache.lookup("x", 0, str.upper)
+    cache.lookup("x", 1, str.isupper)
+    assert (len(cache), cache.evictions) == (1, 0)
+
+
+def test_scope_counts_only_own_thread():
+    enable_memo_cache(maxsize=1000)
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def run(name, words):
+        stats = ConversionStats()
+        with _memo_scope(None, stats):
+            barrier.wait()
+            for w in words:
+                tcvn3_to_unicode(w)
+            barrier.wait()  # Cả hai thread còn trong scope khi thread kia tra cache
+        results[name] = stats
+
+    words_a = ["Hµ Néi"] * 5 + ["Thµnh phè"]
+    words_b = ["B¸o c¸o"] * 20
+    threads = [threading.Thread(target=run, args=("a", words_a)),
+               threading.Thread(target=run, args=("b", words_b))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    a, b = results["a"], results["b"]
+    assert (a.cache_hits, a.cache_misses) == (4, 2)
+    assert (b.cache_hits, b.cache_misses) == (19, 1)
+
+
+def test_scope_counts_evictions():
+    stats = ConversionStats()
+    with _memo_scope(2, stats) as memo:
+        for w in ["Hµ", "Néi", "Thµnh", "Hµ"]:
+            tcvn3_to_unicode(w)
+        assert len(memo) == 2
+    assert (stats.cache_hits, stats.cache_misses, stats.cache_evictions) == (0, 4, 2)
+    assert convert_excel_tcvn3._MEMO is None  # Cache riêng của scope đã tắt
+
+
+def make_workbook(path):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name in ("A", "B"):
+        ws = wb.create_sheet(name)
+        for i in range(30):
+            ws.append(["Hµ Néi", f"Thµnh phè {i % 3}"])
+    wb.save(path)
+    return path
+
+
+@pytest.mark.parametrize("engine", ["pandas", "xml"])
+def test_worker_counts_are_merged(tmp_path, engine):
+    src = make_workbook(tmp_path / "in.xlsx")
+    one = convert_excel(src, tmp_path / "one.xlsx", engine=engine, memo_size=100, workers=1)
+    two = convert_excel(src, tmp_path / "two.xlsx", engine=engine, memo_size=100, workers=2)
+    assert one.cache_misses > 0
+    # Số lần tra cache như nhau; worker có cache riêng nên hit/miss có thể chia khác
+    assert two.cache_hits + two.cache_misses == one.cache_hits + one.cache_misses
+    assert two.converted_cells == one.converted_cells
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Test convert_docx / convert_pptx: đoạn văn chia nhiều run, header/footer, chép nguyên part khác
+"""
+import re
+import zipfile
+
+from ooxml_converter import convert_docx, convert_pptx
+
+W_NS = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+A_NS = ('xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+        'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"')
+XML_HEAD = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+IMAGE = bytes(range(256)) * 8
+
+
+def w_paragraph(*runs):
+    # Run đầu in đậm: định dạng từng run phải giữ nguyên
+    body = "".join(
+        f'<w:r>{"<w:rPr><w:b/></w:rPr>" if k == 0 else ""}<w:t xml:space="preserve">{text}</w:t></w:r>'
+        for k, text in enumerate(runs)
+    )
+    return f"<w:p>{body}</w:p>"
+
+
+def a_paragraph(*runs):
+    return "<a:p>" + "".join(f'<a:r><a:rPr lang="vi-VN"/><a:t>{text}</a:t></a:r>' for text in runs) + "</a:p>"
+
+
+def write_zip(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+
+
+def make_docx(path):
+    members = {
+        "[Content_Types].xml": XML_HEAD + "<Types/>",
+        "word/document.xml": (
+            f"{XML_HEAD}<w:document {W_NS}><w:body>"
+            + w_paragraph("Céng hoµ ", "x· héi ", "chñ nghÜa")
+            + w_paragraph("Cà phê ", "Điện Biên")
+            + "</w:body></w:document>"
+        ),
+        "word/header1.xml": f"{XML_HEAD}<w:hdr {W_NS}>{w_paragraph('Hµ ', 'Néi')}</w:hdr>",
+        "word/footer1.xml": f"{XML_HEAD}<w:ftr {W_NS}>{w_paragraph('Trang ', '1')}</w:ftr>",
+        # Không phải part text: chép nguyên kể cả khi chứa chuỗi TCVN3
+        "word/styles.xml": f"{XML_HEAD}<w:styles {W_NS}><w:style w:styleId='Hµ'/></w:styles>",
+        "word/media/image1.png": IMAGE,
+    }
+    write_zip(path, members)
+    return members
+
+
+def make_pptx(path):
+    members = {
+        "[Content_Types].xml": XML_HEAD + "<Types/>",
+        "ppt/slides/slide1.xml": (
+            f"{XML_HEAD}<p:sld {A_NS}><p:txBody>"
+            + a_paragraph("Thµnh ", "phè ", "Hå ChÝ Minh")
+            + a_paragraph("Cà phê")
+            + "</p:txBody></p:sld>"
+        ),
+        "ppt/notesSlides/notesSlide1.xml": (
+            f"{XML_HEAD}<p:notes {A_NS}>{a_paragraph('Ghi chó ', 'quan träng')}</p:notes>"
+        ),
+        # Layout không phải part text: chép nguyên
+        "ppt/slideLayouts/slideLayout1.xml": (
+            f"{XML_HEAD}<p:sldLayout {A_NS}>{a_paragraph('Hµ Néi')}</p:sldLayout>"
+        ),
+        "ppt/media/image1.png": IMAGE,
+    }
+    write_zip(path, members)
+    return members
+
+
+def paragraphs(xml, prefix):
+    """Text từng đoạn văn: danh sách text các run"""
+    return [re.findall(rf"<{prefix}:t[^>]*>([^<]*)</{prefix}:t>", p)
+            for p in re.findall(rf"<{prefix}:p>.*?</{prefix}:p>", xml)]
+
+
+def check_untouched(src, out, names):
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(out) as zout:
+        assert zout.namelist() == zin.namelist()
+        for name in names:
+            assert zout.read(name) == zin.read(name), name
+
+
+def test_docx_runs_headers_and_footers(tmp_path):
+    src, out = tmp_path / "in.docx", tmp_path / "out.docx"
+    make_docx(src)
+    stats = convert_docx(src, out)
+    with zipfile.ZipFile(out) as z:
+        document = z.read("word/document.xml").decode("utf-8")
+        header = z.read("word/header1.xml").decode("utf-8")
+        footer = z.read("word/footer1.xml").decode("utf-8")
+    assert paragraphs(document, "w") == [["Cộng hoà ", "xã hội ", "chủ nghĩa"], ["Cà phê ", "Điện Biên"]]
+    assert paragraphs(header, "w") == [["Hà ", "Nội"]]
+    assert paragraphs(footer, "w") == [["Trang ", "1"]]
+    assert document.count("<w:b/>") == 2  # Định dạng run giữ nguyên
+    check_untouched(src, out, ["[Content_Types].xml", "word/styles.xml", "word/media/image1.png"])
+
+    assert (stats.sheets_processed, stats.converted_cells, stats.already_unicode) == (3, 2, 2)
+    assert [(log.sheet, log.row, log.converted) for log in stats.logs] == [
+        ("word/document.xml", 1, "Cộng hoà xã hội chủ nghĩa"),
+        ("word/header1.xml", 1, "Hà Nội"),
+    ]
+
+
+def test_docx_without_skip_unicode_converts_every_paragraph(tmp_path):
+    src, out = tmp_path / "in.docx", tmp_path / "out.docx"
+    make_docx(src)
+    stats = convert_docx(src, out, skip_unicode=False)
+    with zipfile.ZipFile(out) as z:
+        document = z.read("word/document.xml").decode("utf-8")
+    # Đoạn đã là Unicode cũng đi qua bảng TCVN3 (ê → ờ)
+    assert paragraphs(document, "w")[1] == ["Cà phờ ", "Điện Biờn"]
+    assert stats.already_unicode == 0
+
+
+def test_pptx_slides_and_notes(tmp_path):
+    src, out = tmp_path / "in.pptx", tmp_path / "out.pptx"
+    make_pptx(src)
+    stats = convert_pptx(src, out)
+    with zipfile.ZipFile(out) as z:
+        slide = z.read("ppt/slides/slide1.xml").decode("utf-8")
+        notes = z.read("ppt/notesSlides/notesSlide1.xml").decode("utf-8")
+    assert paragraphs(slide, "a") == [["Thành ", "phố ", "Hồ Chí Minh"], ["Cà phê"]]
+    assert paragraphs(notes, "a") == [["Ghi chú ", "quan trọng"]]
+    check_untouched(src, out, ["[Content_Types].xml", "ppt/slideLayouts/slideLayout1.xml",
+                               "ppt/media/image1.png"])
+    assert (stats.sheets_processed, stats.converted_cells, stats.already_unicode) == (2, 2, 1)
+
+    stats = convert_pptx(src, out, skip_unicode=False)
+    with zipfile.ZipFile(out) as z:
+        assert paragraphs(z.read("ppt/slides/slide1.xml").decode("utf-8"), "a")[1] == ["Cà phờ"]
+
+
+def test_docx_with_other_prefix(tmp_path):
+    # Cùng namespace WordprocessingML nhưng tiền tố khác "w"
+    src, out = tmp_path / "in.docx", tmp_path / "out.docx"
+    ns = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    write_zip(src, {
+        "word/document.xml": (
+            f'{XML_HEAD}<ns0:document xmlns:ns0="{ns}"><ns0:body><ns0:p>'
+            '<ns0:r><ns0:t>Hµ </ns0:t></ns0:r><ns0:r><ns0:t>Néi</ns0:t></ns0:r>'
+            '</ns0:p></ns0:body></ns0:document>'
+        ),
+    })
+    stats = convert_docx(src, out)
+    with zipfile.ZipFile(out) as z:
+        document = z.read("word/document.xml").decode("utf-8")
+    assert paragraphs(document, "ns0") == [["Hà ", "Nội"]]
+    assert stats.converted_cells == 1
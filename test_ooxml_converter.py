@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Test ooxml_converter: chép member zip, remap font, engine xml
+"""
+import zipfile
+from unittest import mock
+
+import pytest
+from openpyxl import Workbook
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+from openpyxl.styles import Font
+
+import ooxml_converter
+from convert_excel_tcvn3 import convert_excel
+from ooxml_converter import copy_member_raw
+
+MEMBERS = {
+    "a.xml": ("<root>" + "Hµ Néi " * 2000 + "</root>").encode("utf-8"),
+    "b.bin": bytes(range(256)) * 64,
+    "empty.txt": b"",
+}
+
+
+def make_zip(path):
+    with zipfile.ZipFile(path, "w") as z:
+        for name, data in MEMBERS.items():
+            z.writestr(name, data, zipfile.ZIP_DEFLATED if name != "b.bin" else zipfile.ZIP_STORED)
+
+
+def copy_all(src, dst):
+    """Chép mọi member, trả về các lần gọi ZipFile.open(..., "w")"""
+    original = zipfile.ZipFile.open
+    writes = []
+
+    def spy(self, name, mode="r", *args, **kwargs):
+        if mode == "w":
+            writes.append(name)
+        return original(self, name, mode, *args, **kwargs)
+
+    with mock.patch.object(zipfile.ZipFile, "open", spy):
+        with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                copy_member_raw(zin, zout, info)
+    return writes
+
+
+def check_copy(src, dst):
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst) as zout:
+        assert zout.testzip() is None
+        assert zout.namelist() == zin.namelist()
+        for info in zin.infolist():
+            out = zout.getinfo(info.filename)
+            assert zout.read(out) == MEMBERS[info.filename]
+            assert (out.compress_type, out.CRC) == (info.compress_type, info.CRC)
+
+
+@pytest.mark.skipif(not ooxml_converter._RAW_COPY_SUPPORTED, reason="Phiên bản Python chưa kiểm tra chép raw")
+def test_copy_member_raw_keeps_compressed_bytes(tmp_path):
+    src, dst = tmp_path / "src.zip", tmp_path / "dst.zip"
+    make_zip(src)
+    assert copy_all(src, dst) == []  # Không giải nén/nén lại
+    check_copy(src, dst)
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst) as zout:
+        for info in zin.infolist():
+            assert zout.getinfo(info.filename).compress_size == info.compress_size
+
+
+def test_copy_member_falls_back_to_public_api(tmp_path):
+    src, dst = tmp_path / "src.zip", tmp_path / "dst.zip"
+    make_zip(src)
+    with mock.patch.object(ooxml_converter, "_RAW_COPY_SUPPORTED", False):
+        writes = copy_all(src, dst)
+    assert len(writes) == len(MEMBERS)
+    check_copy(src, dst)
+
+
+SHARED_STRINGS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="1" uniqueCount="1">'
+    '<si><r><rPr><rFont val=".VnTime"/><sz val="11"/></rPr><t>Hµ Néi</t></r>'
+    '<r><rPr><rFont val="Arial"/></rPr><t> 1</t></r></si></sst>'
+)
+
+
+def make_rich_workbook(path):
+    """Workbook có font .VnTime ở bảng font, ở run của shared string và của cell inline string"""
+    wb = Workbook()
+    ws = wb.active
+    ws["A1"] = CellRichText([TextBlock(InlineFont(rFont=".VnTime"), "Thµnh phè"), " x"])
+    ws["A2"] = "Hµ Néi"
+    ws["A2"].font = Font(name=".VnTime")
+    wb.save(path)
+    with zipfile.ZipFile(path, "a") as z:
+        z.writestr("xl/sharedStrings.xml", SHARED_STRINGS)
+
+
+def part_fonts(path):
+    with zipfile.ZipFile(path) as z:
+        return {name: z.read(name).decode("utf-8")
+                for name in ("xl/styles.xml", "xl/sharedStrings.xml", "xl/worksheets/sheet1.xml")}
+
+
+def test_remap_workbook_fonts_rewrites_rich_text_runs(tmp_path):
+    path = tmp_path / "rich.xlsx"
+    make_rich_workbook(path)
+    remapped = ooxml_converter.remap_workbook_fonts(path)
+    parts = part_fonts(path)
+    for name, xml in parts.items():
+        assert ".VnTime" not in xml, name
+    assert 'val="Times New Roman"' in parts["xl/sharedStrings.xml"]
+    assert 'val="Arial"' in parts["xl/sharedStrings.xml"]
+    assert 'rFont val="Times New Roman"' in parts["xl/worksheets/sheet1.xml"]
+    assert remapped[(".VnTime", "Times New Roman")] >= 3
+
+
+def test_xml_engine_remaps_rich_text_fonts(tmp_path):
+    src, out = tmp_path / "rich.xlsx", tmp_path / "out.xlsx"
+    make_rich_workbook(src)
+    stats = convert_excel(str(src), str(out), engine="xml", remap_fonts=True, workers=1)
+    parts = part_fonts(out)
+    for name, xml in parts.items():
+        assert ".VnTime" not in xml, name
+    assert "Hà Nội" in parts["xl/sharedStrings.xml"]
+    assert "Thành phố" in parts["xl/worksheets/sheet1.xml"]
+    assert stats.converted_cells == 3
+
+
+SS_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+PREFIXED_SHEET = (
+    f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<x:worksheet xmlns:x="{SS_NS}">'
+    '<x:sheetData><x:row r="1">'
+    '<x:c r="A1" t="s"><x:v>0</x:v></x:c>'
+    '<x:c r="B1" t="inlineStr"><x:is><x:t>Thµnh phè</x:t></x:is></x:c>'
+    '</x:row></x:sheetData></x:worksheet>'
+)
+PREFIXED_SHARED_STRINGS = (
+    f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<x:sst xmlns:x="{SS_NS}" count="1" uniqueCount="1">'
+    '<x:si><x:r><x:t>Hµ </x:t></x:r><x:r><x:t>Néi</x:t></x:r>'
+    '<x:rPh sb="0" eb="1"><x:t>Hµ</x:t></x:rPh></x:si></x:sst>'
+)
+
+
+def make_prefixed_workbook(path):
+    """Workbook có worksheet và shared strings dùng tiền tố x: thay cho namespace mặc định"""
+    wb = Workbook()
+    wb.active.title = "Data"
+    wb.active["A1"] = "placeholder"
+    wb.save(path)
+    with zipfile.ZipFile(path) as z:
+        members = {info.filename: z.read(info) for info in z.infolist()}
+    members["xl/worksheets/sheet1.xml"] = PREFIXED_SHEET.encode("utf-8")
+    members["xl/sharedStrings.xml"] = PREFIXED_SHARED_STRINGS.encode("utf-8")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        for name, data in members.items():
+            z.writestr(name, data)
+
+
+def test_xml_engine_matches_prefixed_tags(tmp_path):
+    src, out = tmp_path / "prefixed.xlsx", tmp_path / "out.xlsx"
+    make_prefixed_workbook(src)
+    stats = convert_excel(str(src), str(out), engine="xml", workers=1)
+    with zipfile.ZipFile(out) as z:
+        shared = z.read("xl/sharedStrings.xml").decode("utf-8")
+        sheet = z.read("xl/worksheets/sheet1.xml").decode("utf-8")
+    assert "<x:t>Hà </x:t>" in shared and "<x:t>Nội</x:t>" in shared
+    assert '<x:rPh sb="0" eb="1"><x:t>Hµ</x:t></x:rPh>' in shared  # Phiên âm không đổi
+    assert "<x:t>Thành phố</x:t>" in sheet
+    assert stats.converted_cells == 2
+    assert {(log.sheet, log.converted) for log in stats.logs} == {
+        ("sharedStrings", "Hà Nội"), ("Data", "Thành phố")}
+
+
+def make_sheets_workbook(path, kinds):
+    """Mỗi sheet chỉ có chuỗi ("s", openpyxl ghi thành inline string) hoặc chỉ có số ("n")"""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for k, kind in enumerate(kinds):
+        ws = wb.create_sheet(f"S{k}")
+        for i in range(5):
+            ws.append(["Hµ Néi", "Thµnh phè"] if kind == "s" else [i, i * 2])
+    wb.save(path)
+
+
+@pytest.mark.parametrize("kinds, workers, expected", [
+    ("snn", None, None),  # 1 sheet có inline string: không mở pool dù có 8 CPU
+    ("nnn", 8, None),
+    ("ssn", None, 2),  # Giới hạn bởi số sheet có inline string
+    ("ssn", 8, 2),
+    ("sss", 2, 2),
+    ("sss", 1, None),
+])
+def test_xml_engine_pool_only_for_inline_sheets(tmp_path, kinds, workers, expected):
+    src, out = tmp_path / "in.xlsx", tmp_path / "out.xlsx"
+    make_sheets_workbook(src, kinds)
+    started = []
+    original = ooxml_converter.ProcessPoolExecutor
+
+    def spy(max_workers):
+        started.append(max_workers)
+        return original(max_workers=max_workers)
+
+    with mock.patch.object(ooxml_converter, "ProcessPoolExecutor", spy), \
+            mock.patch.object(ooxml_converter.os, "cpu_count", lambda: 8):
+        stats = convert_excel(str(src), str(out), engine="xml", workers=workers)
+    assert started == ([expected] if expected else [])
+    assert stats.converted_cells == 10 * kinds.count("s")
+    assert stats.sheets_processed == len(kinds)
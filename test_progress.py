@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Test tiến trình theo hàng (on_progress), hủy (cancel_event) và dọn file dở dang của convert_excel
+"""
+import threading
+
+import pytest
+from openpyxl import Workbook
+
+from convert_excel_tcvn3 import (
+    ENGINES,
+    STREAMING_CHUNK_ROWS,
+    ConversionCancelled,
+    convert_excel,
+    preview_conversion,
+)
+
+ROWS = 120
+
+
+def make_workbook(path):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name in ("A", "B", "C"):
+        ws = wb.create_sheet(name)
+        for i in range(ROWS):
+            ws.append(["Hµ Néi", i])
+    wb.save(path)
+    return path
+
+
+def engine_options(engine):
+    return {"workers": 1} if engine == "xml" else {}
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_progress_events(tmp_path, engine):
+    src = make_workbook(tmp_path / "in.xlsx")
+    events, legacy = [], []
+    convert_excel(src, tmp_path / "out.xlsx", engine=engine, on_progress=events.append,
+                  progress_callback=lambda *args: legacy.append(args),
+                  progress_every_rows=25, progress_interval_ms=0, **engine_options(engine))
+    assert events
+    rows = [e.rows_done for e in events]
+    assert rows == sorted(rows)
+    assert all(e.total_rows == 3 * ROWS for e in events)
+    last = events[-1]
+    assert (last.rows_done, last.percent, last.eta) == (3 * ROWS, 100, 0)
+    assert legacy and all(total == 3 for _, _, total in legacy)
+
+
+def test_streaming_reports_within_sheet(tmp_path):
+    # Engine streaming báo sau mỗi khối STREAMING_CHUNK_ROWS hàng
+    rows = 2 * STREAMING_CHUNK_ROWS + 100
+    src = tmp_path / "big.xlsx"
+    wb = Workbook()
+    for i in range(rows):
+        wb.active.append(["Hµ Néi", i])
+    wb.save(src)
+    events = []
+    convert_excel(src, tmp_path / "out.xlsx", engine="streaming", on_progress=events.append,
+                  progress_every_rows=1, progress_interval_ms=0)
+    inside = [e.sheet_rows_done for e in events if 0 < e.sheet_rows_done < e.sheet_rows]
+    assert inside == [STREAMING_CHUNK_ROWS, 2 * STREAMING_CHUNK_ROWS]
+    assert events[-1].sheet_rows == rows
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_cancel_keeps_existing_output_and_removes_partial(tmp_path, engine):
+    src = make_workbook(tmp_path / "in.xlsx")
+    out = tmp_path / "out.xlsx"
+    out.write_bytes(b"ket qua cu")
+    cancel = threading.Event()
+
+    with pytest.raises(ConversionCancelled):
+        convert_excel(src, out, engine=engine, cancel_event=cancel,
+                      on_progress=lambda event: cancel.set(),
+                      progress_every_rows=25, progress_interval_ms=0, **engine_options(engine))
+    assert out.read_bytes() == b"ket qua cu"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["in.xlsx", "out.xlsx"]
+
+
+def test_error_in_callback_removes_partial(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+
+    def fail(event):
+        if event.sheet_idx == 1:
+            raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        convert_excel(src, tmp_path / "out.xlsx", engine="streaming", on_progress=fail)
+    assert [p.name for p in tmp_path.iterdir()] == ["in.xlsx"]
+
+
+def test_preview_cancel(tmp_path):
+    src = make_workbook(tmp_path / "in.xlsx")
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(ConversionCancelled):
+        preview_conversion(src, cancel_event=cancel)
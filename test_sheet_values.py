@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Test _convert_sheet_values (engine vectorized) cho kết quả, thống kê và log giống hệt
+cách cũ duyệt df.iloc từng cell
+"""
+import math
+import random
+
+import pandas as pd
+import pytest
+
+from convert_excel_tcvn3 import ConversionLog, ConversionStats, _build_rules, _convert_sheet_values
+
+SHEET = "Sheet1"
+STAT_FIELDS = ("total_cells", "string_cells", "converted_cells", "already_unicode",
+               "already_legacy", "unchanged_cells")
+
+
+def reference_convert(df, sheet, rules, skip_selection):
+    """Vòng lặp df.iloc từng cell như engine cũ, trả về (DataFrame mới, ConversionStats, tọa độ highlight)"""
+    df = df.copy()
+    stats = ConversionStats()
+    coords = []
+    for row_idx in range(len(df)):
+        for col_idx in range(len(df.columns)):
+            cell_value = df.iloc[row_idx, col_idx]
+            stats.total_cells += 1
+            if not (isinstance(cell_value, str) and cell_value.strip()):
+                continue
+            stats.string_cells += 1
+            original = cell_value
+            cell_id = f"{sheet}_{row_idx + 1}_{col_idx}"
+            is_unicode = rules.is_unicode_text(original)
+            already_target = not is_unicode if rules.to_tcvn3 else is_unicode
+            if rules.skip_unicode and already_target and skip_selection.get(cell_id, True):
+                if rules.to_tcvn3:
+                    stats.already_legacy += 1
+                else:
+                    stats.already_unicode += 1
+                continue
+            converted = rules.convert(original)
+            if converted != original:
+                stats.converted_cells += 1
+                df.iloc[row_idx, col_idx] = converted
+                coords.append((sheet, row_idx + 1, col_idx + 1))
+                stats.logs.append(ConversionLog(
+                    sheet=sheet, row=row_idx + 1, col=col_idx, col_name=f"Col_{col_idx}",
+                    original=original, converted=converted, was_unicode=is_unicode,
+                ))
+            else:
+                stats.unchanged_cells += 1
+    return df, stats, coords
+
+
+def cells(values):
+    """Giá trị từng cell để so sánh: NaN thay bằng một nhãn (NaN != NaN), None giữ nguyên"""
+    return [["<NaN>" if isinstance(v, float) and math.isnan(v) else v for v in row] for row in values.tolist()]
+
+
+MIXED = pd.DataFrame([
+    ["Hµ Néi", math.nan, 5, "Hà Nội", ""],
+    ["Hµ Néi", None, 2.5, "   ", "abc"],
+    ["Thµnh phè", "Thµnh phè", 0, "Cà phê", "Hµ Néi"],
+    [math.nan, "Việt Nam", -1, "A-01", "Hà Nội"],
+], dtype=object)
+
+
+def random_frame(seed=3, rows=60, cols=6):
+    rng = random.Random(seed)
+    pool = ["Hµ Néi", "Thµnh phè", "B¸o c¸o", "Hà Nội", "Việt Nam", "abc", "", " ",
+            math.nan, None, 0, 1.5, 42, "Cà phê", "®i häc"]
+    return pd.DataFrame([[rng.choice(pool) for _ in range(cols)] for _ in range(rows)], dtype=object)
+
+
+@pytest.mark.parametrize("frame", [MIXED, random_frame()], ids=["mixed", "random"])
+@pytest.mark.parametrize("direction", ["to_unicode", "to_tcvn3"])
+@pytest.mark.parametrize("skip_unicode", [True, False])
+def test_matches_per_cell_loop(frame, direction, skip_unicode):
+    # Ép convert 1 cell đã ở dạng đích (ô "Hà Nội" hàng 1 cột 3)
+    skip_selection = {f"{SHEET}_1_3": False, f"{SHEET}_2_0": True}
+    rules = _build_rules(skip_unicode, skip_selection, direction)
+    expected_df, expected, expected_coords = reference_convert(frame, SHEET, rules, skip_selection)
+
+    stats = ConversionStats()
+    coords = []
+    values = _convert_sheet_values(frame.to_numpy(dtype=object), SHEET, rules, stats, coords)
+
+    assert cells(values) == cells(expected_df.to_numpy(dtype=object))
+    assert [getattr(stats, f) for f in STAT_FIELDS] == [getattr(expected, f) for f in STAT_FIELDS]
+    assert stats.logs == expected.logs
+    assert coords == expected_coords
+
+
+def test_row_offset_shifts_rows():
+    rules = _build_rules()
+    whole = ConversionStats()
+    _convert_sheet_values(MIXED.to_numpy(dtype=object), SHEET, rules, whole)
+    # Xử lý theo 2 khối hàng cho cùng log và thống kê
+    parts = ConversionStats()
+    for start in (0, 2):
+        chunk = MIXED.iloc[start:start + 2].to_numpy(dtype=object)
+        _convert_sheet_values(chunk, SHEET, rules, parts, row_offset=start)
+    assert parts.logs == whole.logs
+    assert [getattr(parts, f) for f in STAT_FIELDS] == [getattr(whole, f) for f in STAT_FIELDS]
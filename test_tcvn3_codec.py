@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Test 2 chiều TCVN3 ↔ Unicode và codec "tcvn3"
+"""
+import codecs
+
+import pytest
+
+from convert_excel_tcvn3 import (
+    convert_strings,
+    register_tcvn3_codec,
+    tcvn3_to_unicode,
+    tcvn3_unrepresentable,
+    unicode_to_tcvn3,
+)
+
+register_tcvn3_codec()
+
+TEXT = "Cộng hòa xã hội chủ nghĩa Việt Nam. Độc lập - Tự do - Hạnh phúc. Ưu tiên Ơn Ă Â Ê Ô Đ"
+
+
+def test_round_trip_representable_text():
+    assert tcvn3_unrepresentable(TEXT) == ""
+    assert tcvn3_to_unicode(unicode_to_tcvn3(TEXT)) == TEXT
+
+
+def test_uppercase_toned_letters_are_lowercased_and_reported():
+    # Ò, Ý trùng mã TCVN3 của "ề", "í": trước đây bị giữ nguyên và đọc lại sai
+    assert tcvn3_to_unicode(unicode_to_tcvn3("ÒNG Ý")) == "òNG ý"
+    assert tcvn3_unrepresentable("ÒNG Ý") == "ÒÝ"
+    result = convert_strings(["ÒNG Ý", "Hà Nội"], direction="to_tcvn3")
+    assert result.stats.lossy_cells == 1
+
+
+def test_codec_round_trip():
+    data = TEXT.encode("tcvn3")
+    assert data.decode("tcvn3") == TEXT
+    # Codec đọc đúng như convert chuỗi .VnTime mà Excel hiển thị theo cp1252
+    assert data.decode("tcvn3") == tcvn3_to_unicode(data.decode("cp1252"))
+    assert "Hµ Néi".encode("cp1252").decode("vntime") == "Hà Nội"
+
+
+def test_codec_iterdecode_and_incremental_encoder():
+    data = TEXT.encode("tcvn3")
+    chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+    assert "".join(codecs.iterdecode(chunks, "tcvn3")) == TEXT
+    encoder = codecs.getincrementalencoder("tcvn3")()
+    encoded = b"".join(encoder.encode(TEXT[i:i + 5]) for i in range(0, len(TEXT), 5))
+    assert encoded + encoder.encode("", final=True) == data
+
+
+def test_codec_stream_file(tmp_path):
+    path = tmp_path / "vntime.txt"
+    with open(path, "w", encoding="tcvn3", newline="") as f:
+        f.write(TEXT + "\n")
+    assert path.read_bytes() == TEXT.encode("tcvn3") + b"\n"
+    with open(path, encoding="tcvn3", newline="") as f:
+        assert f.read() == TEXT + "\n"
+
+
+def test_codec_errors():
+    with pytest.raises(UnicodeEncodeError):
+        "Hà Nội 中".encode("tcvn3")
+    assert "Hà 中".encode("tcvn3", errors="replace").decode("tcvn3") == "Hà ?"
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Test convert_text_file (file text/CSV) và detect_file_encoding
+"""
+import unicodedata
+from unittest import mock
+
+import pytest
+
+import convert_excel_tcvn3
+from convert_excel_tcvn3 import (
+    _text_split_point,
+    convert_text_file,
+    detect_file_encoding,
+    register_tcvn3_codec,
+)
+
+register_tcvn3_codec()
+
+LINES = [
+    "Mã,Tên,Ghi chú\n",
+    "1,Hà Nội,Thủ đô\n",
+    "2,Thành phố Hồ Chí Minh,Đông dân nhất\n",
+    "3,Cần Thơ,Đồng bằng sông Cửu Long\n",
+]
+TEXT = "".join(LINES)
+
+
+@pytest.mark.parametrize("chunk_size", [5, 1 << 20])
+def test_raw_vntime_bytes(tmp_path, chunk_size):
+    src, out = tmp_path / "in.csv", tmp_path / "out.csv"
+    src.write_bytes(TEXT.encode("tcvn3"))
+    assert detect_file_encoding(src)[0] == "tcvn3"
+    result = convert_text_file(src, out, chunk_size=chunk_size)
+    assert out.read_text(encoding="utf-8") == TEXT
+    assert (result.encoding, result.bytes_read) == ("tcvn3", src.stat().st_size)
+    assert result.bytes_written == out.stat().st_size
+
+
+@pytest.mark.parametrize("chunk_size", [3, 1 << 20])
+def test_utf8_file_with_misread_lines(tmp_path, chunk_size):
+    # Dòng .VnTime bị đọc nhầm cp1252 rồi lưu UTF-8, trộn với dòng đã là Unicode;
+    # chunk_size nhỏ cắt ngang cả ký tự nhiều byte lẫn dòng
+    src, out = tmp_path / "in.csv", tmp_path / "out.csv"
+    mixed = [LINES[0], LINES[1].encode("tcvn3").decode("cp1252"), LINES[2],
+             LINES[3].encode("tcvn3").decode("cp1252")]
+    src.write_text("".join(mixed), encoding="utf-8")
+    result = convert_text_file(src, out, chunk_size=chunk_size)
+    assert result.encoding == "utf-8"
+    assert out.read_text(encoding="utf-8") == TEXT
+    assert result.lines_converted == 2
+
+
+def test_utf16_bom_and_empty_file(tmp_path):
+    src, out = tmp_path / "in.txt", tmp_path / "out.txt"
+    src.write_text(TEXT, encoding="utf-16")
+    assert convert_text_file(src, out).encoding == "utf-16"
+    assert out.read_text(encoding="utf-8") == TEXT
+
+    src.write_bytes(b"")
+    assert convert_text_file(src, out).bytes_written == 0
+    assert out.read_bytes() == b""
+
+
+def test_long_line_is_written_in_pieces(tmp_path):
+    # File không có xuống dòng: không giữ cả file trong bộ nhớ chờ hết dòng
+    src, out = tmp_path / "in.txt", tmp_path / "out.txt"
+    words = ["Hà Nội", "Thành phố", "Cần Thơ", "abc", "12345"] * 400
+    text = " ".join(words)
+    src.write_text(" ".join(w.encode("tcvn3").decode("cp1252") for w in words), encoding="utf-8")
+    seen = []
+    original = convert_excel_tcvn3.tcvn3_to_unicode
+
+    def spy(s, *args, **kwargs):
+        seen.append(len(s))
+        return original(s, *args, **kwargs)
+
+    with mock.patch.object(convert_excel_tcvn3, "tcvn3_to_unicode", spy):
+        result = convert_text_file(src, out, encoding="utf-8", chunk_size=256)
+    assert out.read_text(encoding="utf-8") == text
+    assert result.lines_converted == 1
+    assert len(seen) > 10 and max(seen) <= 2 * 256
+
+
+def test_text_split_point():
+    assert _text_split_point("abc def ghi", 9) == 8  # Sau khoảng trắng cuối trước giới hạn
+    assert _text_split_point("abcdefgh", 4) == 4
+    nfd = unicodedata.normalize("NFD", "ộộộộ")  # Mỗi chữ = 1 chữ gốc + 2 dấu rời
+    cut = _text_split_point(nfd, 4)
+    assert cut == 3 and not unicodedata.combining(nfd[cut])
@@ -2,7 +2,16 @@
 """
 Script demo các tính năng mới
 """
-from convert_excel_tcvn3 import looks_like_unicode_vietnamese
+import random
+import sys
+import unicodedata
+
+from convert_excel_tcvn3 import (
+    _VIET_UNI_OK,
+    _looks_like_unicode_vietnamese,
+    load_tcvn3_map,
+    looks_like_unicode_vietnamese,
+)
 
 # Test cases
 test_cases = [
@@ -36,3 +45,45 @@ print()
 print("📝 Tổng kết:")
 print("✅ = Bỏ qua (đã là Unicode chuẩn)")
 print("🔄 = Cần convert (có thể là TCVN3)")
+
+
+def reference_looks_like_unicode_vietnamese(s: str) -> bool:
+    """Bản 2 lượt duyệt (isalpha + whitelist/unicodedata) trước khi compile thành regex"""
+    if not s or not s.strip():
+        return True
+    if not any(ch.isalpha() for ch in s):
+        return True
+    for ch in s:
+        if ch in _VIET_UNI_OK:
+            continue
+        if unicodedata.category(ch).startswith(('Z', 'P', 'C', 'S')):
+            continue
+        return False
+    return True
+
+
+def generate_corpus(n: int = 200_000, seed: int = 2024):
+    """Sinh chuỗi ngẫu nhiên trộn tiếng Việt, TCVN3, ASCII, ký hiệu, dấu rời, chữ số lạ..."""
+    rng = random.Random(seed)
+    pools = [
+        "abcxyzABCXYZ0123456789 .,;:-/",
+        "àáạảãâầấậẩẫăằắặẳẵđêềếệểễôồốộổỗơờớợởỡưừứựửữĐƯƠ",
+        "".join(load_tcvn3_map()),
+        "©®µ°±×÷€£¥₫‰…“”‘’\t\n",
+        "\u0300\u0301\u0303\u0309\u0323",  # dấu rời (category M)
+        "²³½٣߂",  # chữ số/số không thuộc whitelist (category N)
+        "中文한국어ÆØÅßñçΩ",
+        "😀🎉𝐀𝟙𠀋",  # ngoài BMP: emoji, chữ/số toán học, CJK mở rộng
+    ]
+    for _ in range(n):
+        k = rng.randint(0, 12)
+        if rng.random() < 0.05:
+            # Code point bất kỳ trong toàn bảng Unicode
+            yield "".join(chr(rng.randint(0, sys.maxunicode)) for _ in range(k))
+        else:
+            yield "".join(rng.choice(rng.choice(pools)) for _ in range(k))
+
+
+def test_compiled_check_matches_reference():
+    for text in generate_corpus():
+        assert _looks_like_unicode_vietnamese(text) == reference_looks_like_unicode_vietnamese(text), repr(text)
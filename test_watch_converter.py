@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Test watch_converter: journal (file lỗi, backoff thử lại) và watch_folder(once=True)
+"""
+import json
+import time
+from pathlib import Path
+from unittest import mock
+
+from openpyxl import Workbook, load_workbook
+
+import watch_converter
+from convert_excel_tcvn3 import BatchFileResult
+from watch_converter import JOURNAL_NAME, WatchJournal, watch_folder
+
+SIG = (100, 123456789)
+
+
+def result(ok, error=None):
+    return BatchFileResult("in/a.xlsx", "out/a.xlsx", ok=ok, error=error)
+
+
+def test_journal_success_is_done(tmp_path):
+    journal = WatchJournal(tmp_path / "j.jsonl")
+    assert journal.should_convert("in/a.xlsx", SIG)
+    journal.record(result(True), SIG)
+    assert journal.is_done("in/a.xlsx", SIG)
+    assert not journal.should_convert("in/a.xlsx", SIG)
+    # File bị thay nội dung → convert lại
+    assert journal.should_convert("in/a.xlsx", (101, 123456789))
+    journal.close()
+
+
+def test_journal_failures_retry_with_backoff(tmp_path):
+    journal = WatchJournal(tmp_path / "j.jsonl", max_failures=3, retry_delay=10)
+    entry = journal.record(result(False, "boom"), SIG, now=1000)
+    assert not journal.is_done("in/a.xlsx", SIG)
+    assert (entry["failures"], entry["retry_at"]) == (1, 1010)
+    assert not journal.should_convert("in/a.xlsx", SIG, now=1005)
+    assert journal.should_convert("in/a.xlsx", SIG, now=1010)
+
+    entry = journal.record(result(False, "boom"), SIG, now=1010)
+    assert (entry["failures"], entry["retry_at"]) == (2, 1030)  # Gấp đôi
+    entry = journal.record(result(False, "boom"), SIG, now=1030)
+    assert (entry["failures"], entry["retry_at"]) == (3, None)  # Hết lượt
+    assert not journal.should_convert("in/a.xlsx", SIG, now=10 ** 9)
+    # Phiên bản mới của file được thử lại từ đầu
+    assert journal.should_convert("in/a.xlsx", (1, 2), now=1030)
+    journal.close()
+
+    # Trạng thái lỗi còn nguyên sau khi khởi động lại
+    reopened = WatchJournal(tmp_path / "j.jsonl", max_failures=3)
+    assert not reopened.should_convert("in/a.xlsx", SIG, now=10 ** 9)
+    reopened.close()
+
+
+def test_journal_success_resets_failures(tmp_path):
+    journal = WatchJournal(tmp_path / "j.jsonl", retry_delay=0)
+    journal.record(result(False, "boom"), SIG, now=0)
+    journal.record(result(True), SIG)
+    entry = journal.record(result(False, "boom"), SIG, now=0)
+    assert entry["failures"] == 1
+    journal.close()
+
+
+def make_inbox(tmp_path):
+    inbox, outbox = tmp_path / "inbox", tmp_path / "outbox"
+    inbox.mkdir()
+    wb = Workbook()
+    wb.active.append(["Hµ Néi", 1])
+    wb.save(inbox / "good.xlsx")
+    (inbox / "bad.xlsx").write_bytes(b"khong phai file excel")
+    return inbox, outbox
+
+
+def run_once(inbox, outbox, **kwargs):
+    return watch_folder(inbox, outbox, workers=1, poll_interval=0.05, settle=0,
+                        once=True, quiet=True, **kwargs)
+
+
+def journal_entries(outbox):
+    lines = (outbox / JOURNAL_NAME).read_text(encoding="utf-8").splitlines()
+    return [json.loads(line) for line in lines]
+
+
+def test_watch_once_records_failures_and_retries(tmp_path):
+    inbox, outbox = make_inbox(tmp_path)
+    stats = run_once(inbox, outbox, retry_delay=3600)
+    assert (stats.files_converted, stats.files_failed) == (1, 1)
+    assert load_workbook(outbox / "good.xlsx").active["A1"].value == "Hà Nội"
+    bad = [e for e in journal_entries(outbox) if e["input"].endswith("bad.xlsx")]
+    assert len(bad) == 1 and not bad[0]["ok"] and bad[0]["failures"] == 1
+
+    # Lần chạy sau: file đã xong không convert lại, file lỗi còn trong thời gian chờ
+    stats = run_once(inbox, outbox, retry_delay=3600)
+    assert (stats.files_converted, stats.files_failed) == (0, 0)
+
+    # Hết thời gian chờ: file lỗi được thử lại, file đã xong thì không
+    later = time.time() + 7200
+    with mock.patch.object(watch_converter.time, "time", lambda: later):
+        stats = run_once(inbox, outbox, retry_delay=3600, max_failures=2)
+    assert (stats.files_converted, stats.files_failed) == (0, 1)
+    last = journal_entries(outbox)[-1]
+    assert last["input"].endswith("bad.xlsx")
+    assert (last["failures"], last["retry_at"]) == (2, None)
+
+
+def test_scanner_waits_until_file_settles(tmp_path):
+    path = tmp_path / "a.xlsx"
+    path.write_bytes(b"1")
+    scanner = watch_converter.FolderScanner(tmp_path, settle=2.0)
+    assert scanner.poll(now=0) == {}
+    assert scanner.poll(now=1) == {}  # Chưa đứng yên đủ 2 giây
+    path.write_bytes(b"12")  # Vẫn đang chép: đếm lại từ đầu
+    assert scanner.poll(now=2.5) == {}
+    assert scanner.poll(now=4) == {}
+    ready = scanner.poll(now=4.5)
+    assert list(ready) == [str(path)] and ready[str(path)][0] == 2
+    (tmp_path / "~$a.xlsx").write_bytes(b"lock")  # File khóa của Office bị bỏ qua
+    assert list(scanner.poll(now=10)) == [str(path)]
+
+
+def test_watch_cli_once_jsonl(tmp_path, capsys):
+    inbox, outbox = make_inbox(tmp_path)
+    code = watch_converter.main([str(inbox), "-o", str(outbox), "--once", "--jsonl",
+                                 "--settle", "0", "--poll", "0.05", "-j", "1"])
+    assert code == 1  # bad.xlsx lỗi
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert {Path(line["input"]).name: line["ok"] for line in lines} == {
+        "good.xlsx": True, "bad.xlsx": False}
+    # Không để lại file tạm trong thư mục output
+    assert sorted(p.name for p in outbox.iterdir()) == [JOURNAL_NAME, "good.xlsx"]
@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+"""
+Theo dõi một thư mục và convert file TCVN3 ngay khi được chép vào.
+
+- FolderScanner: mỗi lần poll chỉ đọc mtime + size (os.scandir), không mở file;
+  nếu mtime của thư mục không đổi và không có file đang chờ thì bỏ qua cả lần liệt kê
+- Debounce: file chỉ được xử lý khi (size, mtime) đứng yên đủ `settle` giây và mở
+  đọc được (đã chép xong, không còn bị khóa)
+- Process pool tạo 1 lần và nạp sẵn map (_warm_worker), không khởi động lại process
+  cho từng file; số file đang chờ/đang chạy trong pool bị giới hạn bởi queue_size
+- Kết quả được ghi ra file tạm trong thư mục output rồi os.replace: người dùng
+  không bao giờ thấy file output dở dang
+- WatchJournal: file JSONL ghi lại kết quả từng file (tên, size, mtime), fsync từng
+  dòng; khởi động lại (kể cả sau khi bị kill) không convert lại file đã xong.
+  File lỗi được ghi riêng (số lần lỗi, thời điểm thử lại) và được thử lại với
+  backoff tăng dần, tối đa max_failures lần cho mỗi phiên bản file
+
+Usage:
+  python watch_converter.py D:\\Share\\TCVN3 -o D:\\Share\\Unicode
+  python watch_converter.py inbox -o outbox --engine xml -j 4 --jsonl
+  python watch_converter.py inbox -o outbox --once   # xử lý những gì đang có rồi thoát
+"""
+from __future__ import annotations
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from convert_excel_tcvn3 import (
+    BATCH_MAX_ATTEMPTS,
+    BATCH_SUFFIXES,
+    BatchFileResult,
+    ConversionStats,
+    _batch_task,
+    _warm_worker,
+)
+
+# Tên journal mặc định (trong thư mục output)
+JOURNAL_NAME = ".tcvn3_watch.jsonl"
+# Cứ mỗi WATCH_RESCAN_EVERY lần poll thì liệt kê lại thư mục kể cả khi mtime thư mục
+# không đổi (ghi đè nội dung file có sẵn, share mạng không cập nhật mtime thư mục...)
+WATCH_RESCAN_EVERY = 10
+# File lỗi được thử lại sau WATCH_RETRY_DELAY giây, gấp đôi sau mỗi lần lỗi tiếp theo
+# (tối đa WATCH_RETRY_MAX_DELAY); lỗi WATCH_MAX_FAILURES lần thì bỏ qua tới khi file đổi
+WATCH_RETRY_DELAY = 5.0
+WATCH_RETRY_MAX_DELAY = 300.0
+WATCH_MAX_FAILURES = 5
+
+# (size, mtime_ns) của một file
+Signature = Tuple[int, int]
+
+
+class WatchJournal:
+    """
+    Nhật ký các file đã xử lý (JSONL, mỗi dòng 1 file).
+
+    Mỗi dòng được flush + fsync ngay sau khi ghi nên bị kill giữa chừng chỉ có thể
+    mất dòng cuối (dòng hỏng được bỏ qua khi đọc lại); file đó sẽ được convert lại,
+    ghi đè cùng một output. Một file được coi là đã xong khi dòng gần nhất của nó
+    thành công và size + mtime khớp; file bị thay nội dung sẽ được convert lại.
+
+    Lần convert lỗi cũng được ghi (ok=false) kèm số lần lỗi liên tiếp của cùng
+    phiên bản file ("failures") và thời điểm được thử lại ("retry_at", epoch
+    giây, nên backoff vẫn đúng sau khi khởi động lại): chờ retry_delay giây, gấp
+    đôi sau mỗi lần lỗi (tối đa WATCH_RETRY_MAX_DELAY). Sau max_failures lần lỗi
+    "retry_at" là null: file chỉ được thử lại khi size/mtime thay đổi.
+    """
+
+    def __init__(self, path: str | Path, max_failures: int = WATCH_MAX_FAILURES,
+                 retry_delay: float = WATCH_RETRY_DELAY):
+        self.path = Path(path)
+        self.max_failures = max(1, max_failures)
+        self.retry_delay = retry_delay
+        self.entries: Dict[str, dict] = {}  # input -> dòng gần nhất
+        lines = 0
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[entry["input"]] = entry
+                        lines += 1
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if lines > 2 * len(self.entries) + 100:
+            self.compact()
+        self._file = self.path.open("a", encoding="utf-8")
+
+    def _entry(self, input_path: str, signature: Signature) -> dict | None:
+        """Dòng gần nhất của file nếu cùng phiên bản (size + mtime), ngược lại None"""
+        entry = self.entries.get(input_path)
+        if entry is None or (entry["size"], entry["mtime_ns"]) != tuple(signature):
+            return None
+        return entry
+
+    def is_done(self, input_path: str, signature: Signature) -> bool:
+        entry = self._entry(input_path, signature)
+        return entry is not None and entry.get("ok", True)
+
+    def should_convert(self, input_path: str, signature: Signature, now: float | None = None) -> bool:
+        """
+        File có cần convert không: chưa xử lý, đã đổi nội dung, hoặc lần lỗi trước
+        đã hết thời gian chờ (chưa quá max_failures lần).
+        """
+        entry = self._entry(input_path, signature)
+        if entry is None:
+            return True
+        if entry.get("ok", True):
+            return False
+        # Dòng lỗi của journal cũ (chưa có "retry_at") → thử lại ngay
+        retry_at = entry.get("retry_at", 0)
+        return retry_at is not None and (time.time() if now is None else now) >= retry_at
+
+    def record(self, result: BatchFileResult, signature: Signature, now: float | None = None) -> dict:
+        """Ghi kết quả 1 lần convert, trả về dòng journal (có "failures"/"retry_at" nếu lỗi)"""
+        entry = {
+            "input": result.input_path,
+            "size": signature[0],
+            "mtime_ns": signature[1],
+            "output": result.output_path,
+            "ok": result.ok,
+            "error": result.error,
+            "seconds": round(result.seconds, 3),
+            "at": datetime.now().isoformat(timespec="seconds"),
+        }
+        if not result.ok:
+            prev = self._entry(result.input_path, signature)
+            failures = (prev.get("failures", 1) if prev and not prev.get("ok", True) else 0) + 1
+            entry["failures"] = failures
+            if failures >= self.max_failures:
+                entry["retry_at"] = None
+            else:
+                delay = min(WATCH_RETRY_MAX_DELAY, self.retry_delay * 2 ** (failures - 1))
+                entry["retry_at"] = round((time.time() if now is None else now) + delay, 3)
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.entries[result.input_path] = entry
+        return entry
+
+    def compact(self) -> None:
+        """Ghi lại journal chỉ với dòng gần nhất của mỗi file (file tạm + os.replace)"""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class FolderScanner:
+    """
+    Poll một thư mục (không đệ quy), trả về các file đã chép xong.
+
+    Args:
+        directory: Thư mục theo dõi
+        settle: Số giây (size, mtime) phải đứng yên trước khi file được coi là chép xong
+        suffixes: Đuôi file được xử lý
+    """
+
+    def __init__(self, directory: str | Path, settle: float = 2.0,
+                 suffixes: Tuple[str, ...] = BATCH_SUFFIXES):
+        self.directory = Path(directory)
+        self.settle = settle
+        self.suffixes = suffixes
+        self.pending: Dict[str, Tuple[Signature, float]] = {}  # đường dẫn -> (chữ ký, lúc thấy)
+        self.ready: Dict[str, Signature] = {}
+        self._dir_mtime = None
+        self._polls = 0
+
+    def poll(self, now: float | None = None) -> Dict[str, Signature]:
+        """
+        Quét thư mục 1 lần.
+
+        Returns:
+            {đường dẫn: (size, mtime_ns)} của mọi file đã đứng yên (kể cả file đã
+            trả về ở lần trước, để caller tự lọc theo journal)
+        """
+        now = time.monotonic() if now is None else now
+        self._polls += 1
+        dir_mtime = self.directory.stat().st_mtime_ns
+        if (dir_mtime == self._dir_mtime and not self.pending
+                and self._polls % WATCH_RESCAN_EVERY):
+            return self.ready
+        self._dir_mtime = dir_mtime
+
+        seen = set()
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                name = entry.name
+                # Bỏ file khóa của Office (~$...), file ẩn/file tạm, thư mục
+                if (name.startswith(("~$", ".")) or not name.lower().endswith(self.suffixes)
+                        or not entry.is_file()):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue  # File vừa bị xóa/đổi tên
+                path = entry.path
+                sig = (st.st_size, st.st_mtime_ns)
+                seen.add(path)
+                if self.ready.get(path) == sig:
+                    continue
+                self.ready.pop(path, None)
+                prev = self.pending.get(path)
+                if prev is None or prev[0] != sig:
+                    self.pending[path] = (sig, now)
+                elif now - prev[1] >= self.settle and _can_open(path):
+                    del self.pending[path]
+                    self.ready[path] = sig
+
+        for path in list(self.pending):
+            if path not in seen:
+                del self.pending[path]
+        for path in list(self.ready):
+            if path not in seen:
+                del self.ready[path]
+        return self.ready
+
+
+def _can_open(path: str) -> bool:
+    """File còn bị chương trình chép giữ khóa (Windows) thì chưa xử lý"""
+    try:
+        with open(path, "rb"):
+            return True
+    except OSError:
+        return False
+
+
+@dataclass
+class WatchStats:
+    """Thống kê của watch_folder"""
+    files_converted: int = 0
+    files_failed: int = 0
+    totals: ConversionStats = field(default_factory=ConversionStats)
+
+
+def _watch_task(item: BatchFileResult, options: dict, quiet: bool) -> BatchFileResult:
+    """
+    Convert một file trong process worker ra file tạm cùng thư mục output rồi os.replace
+    vào tên thật (cùng ổ đĩa nên thay thế là nguyên tử).
+    """
+    final = Path(item.output_path)
+    # Giữ đuôi file: engine pandas/openpyxl chọn định dạng theo đuôi
+    tmp = final.with_name(f".{final.stem}.{os.getpid()}.tmp{final.suffix}")
+    item.output_path = str(tmp)
+    try:
+        item = _batch_task(item, options, keep_logs=False, quiet=quiet)
+        if item.ok:
+            os.replace(tmp, final)
+    finally:
+        item.output_path = str(final)
+        if tmp.exists():
+            tmp.unlink()
+    return item
+
+
+def watch_folder(
+    in_dir: str | Path,
+    out_dir: str | Path,
+    workers: int | None = None,
+    poll_interval: float = 1.0,
+    settle: float = 2.0,
+    queue_size: int | None = None,
+    output_template: str = "{stem}{suffix}",
+    journal_path: str | Path | None = None,
+    on_result: Callable[[BatchFileResult], None] | None = None,
+    stop_event: threading.Event | None = None,
+    once: bool = False,
+    quiet: bool = False,
+    max_failures: int = WATCH_MAX_FAILURES,
+    retry_delay: float = WATCH_RETRY_DELAY,
+    **options,
+) -> WatchStats:
+    """
+    Theo dõi in_dir và convert mọi file (Excel/Word/PowerPoint/text) được chép vào
+    sang out_dir, cho đến khi stop_event được set (hoặc Ctrl+C).
+
+    Args:
+        in_dir: Thư mục theo dõi
+        out_dir: Thư mục output (phải khác in_dir)
+        workers: Số process của pool (None = số CPU)
+        poll_interval: Số giây giữa 2 lần quét thư mục
+        settle: Số giây file phải đứng yên (xem FolderScanner)
+        queue_size: Số file tối đa đã giao cho pool mà chưa xong (None = 2 x workers);
+            file sẵn sàng vượt quá giới hạn được nhận ở các lần quét sau
+        output_template: Tên file output (xem plan_batch)
+        journal_path: File journal (None = out_dir/.tcvn3_watch.jsonl)
+        on_result: callback(BatchFileResult) mỗi khi một file xong
+        stop_event: threading.Event để dừng từ thread khác; các file đang chạy được
+            chạy nốt và ghi journal trước khi hàm trả về
+        once: Xử lý các file hiện có (sau debounce) rồi trả về, dùng cho cron/scheduler.
+            File lỗi đang chờ backoff không được chờ: lần chạy sau sẽ thử lại khi tới hạn
+        quiet: Chuyển thông báo của các hàm convert sang stderr
+        max_failures: Số lần lỗi tối đa của một phiên bản file trước khi bỏ qua
+            (được thử lại khi file thay đổi)
+        retry_delay: Số giây chờ trước lần thử lại đầu tiên, gấp đôi sau mỗi lần lỗi
+        **options: Tùy chọn cho convert_file/convert_excel (engine, skip_unicode, ...)
+
+    Returns:
+        WatchStats
+    """
+    in_dir, out_dir = Path(in_dir), Path(out_dir)
+    if not in_dir.is_dir():
+        raise FileNotFoundError(f"Không tìm thấy thư mục: {in_dir}")
+    if in_dir.resolve() == out_dir.resolve():
+        raise ValueError("Thư mục output phải khác thư mục theo dõi")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, workers or os.cpu_count() or 1)
+    queue_size = max(1, queue_size or 2 * workers)
+    stop_event = stop_event or threading.Event()
+
+    # Đường dẫn tuyệt đối: journal khớp dù chạy lại từ thư mục làm việc khác
+    scanner = FolderScanner(in_dir.resolve(), settle)
+    journal = WatchJournal(journal_path or out_dir / JOURNAL_NAME, max_failures, retry_delay)
+    stats = WatchStats()
+    running = {}  # future -> (item, chữ ký)
+    attempts: Dict[Tuple[str, Signature], int] = {}
+
+    def new_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker, initargs=(options,))
+
+    def finished(item: BatchFileResult, sig: Signature) -> None:
+        entry = journal.record(item, sig)
+        attempts.pop((item.input_path, sig), None)
+        if item.ok:
+            stats.files_converted += 1
+            if isinstance(item.stats, ConversionStats):
+                stats.totals.merge(item.stats)
+        else:
+            stats.files_failed += 1
+            if entry["retry_at"] is None:
+                print(f"⏸️ Bỏ qua {item.input_path} sau {entry['failures']} lần lỗi (chờ file thay đổi)")
+        if on_result:
+            on_result(item)
+
+    pool = new_pool()
+    print(f"👀 Đang theo dõi {in_dir} → {out_dir} ({workers} process)")
+    try:
+        next_scan = 0.0
+        while True:
+            now = time.monotonic()
+            backlog = 0
+            if not stop_event.is_set():
+                if now >= next_scan:
+                    next_scan = now + poll_interval
+                    scanner.poll(now)
+                # Giao file sẵn sàng mỗi khi pool có chỗ, không chờ lần quét sau.
+                # File cũ trước: độ trễ công bằng khi có nhiều file chép vào cùng lúc
+                in_flight = {item.input_path for item, _ in running.values()}
+                wall = time.time()
+                for path, sig in sorted(scanner.ready.items(), key=lambda kv: kv[1][1]):
+                    if path in in_flight or not journal.should_convert(path, sig, wall):
+                        continue
+                    if len(running) >= queue_size:
+                        backlog += 1
+                        continue
+                    src = Path(path)
+                    item = BatchFileResult(
+                        path,
+                        str(out_dir / output_template.format(
+                            stem=src.stem, suffix=src.suffix, name=src.name, parent=src.parent.name,
+                        )),
+                        size=sig[0],
+                    )
+                    item.attempts = attempts[(path, sig)] = attempts.get((path, sig), 0) + 1
+                    running[pool.submit(_watch_task, item, options, quiet)] = (item, sig)
+
+            if not running:
+                if stop_event.is_set() or (once and not scanner.pending and not backlog):
+                    break
+                stop_event.wait(max(0.0, next_scan - time.monotonic()))
+                continue
+
+            timeout = None if stop_event.is_set() else max(0.0, next_scan - time.monotonic())
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                item, sig = running.pop(future)
+                try:
+                    item = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    if item.attempts < BATCH_MAX_ATTEMPTS:
+                        continue  # Chưa ghi journal: vẫn trong scanner.ready, được giao lại
+                    item.ok = False
+                    item.error = "BrokenProcessPool: process worker bị dừng đột ngột (hết bộ nhớ?)"
+                finished(item, sig)
+            if broken:
+                # Các file khác đang chạy trong pool hỏng cũng mất: được giao lại ở vòng sau
+                running.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = new_pool()
+    finally:
+        pool.shutdown(cancel_futures=True)
+        journal.close()
+    print(f"🛑 Dừng theo dõi: {stats.files_converted} file đã convert, {stats.files_failed} lỗi")
+    return stats
+
+
+def main(argv: List[str] | None = None) -> int:
+    import argparse
+    import contextlib
+
+    from convert_excel_tcvn3 import _add_conversion_arguments, _conversion_options, _result_dict
+
+    ap = argparse.ArgumentParser(description="Theo dõi thư mục và convert file TCVN3 sang Unicode")
+    ap.add_argument("in_dir", help="Thư mục theo dõi")
+    ap.add_argument("-o", "--out-dir", required=True, help="Thư mục output")
+    ap.add_argument("-t", "--template", default="{stem}{suffix}",
+                    help="Tên file output, biến {stem} {suffix} {name} {parent}")
+    ap.add_argument("-j", "--jobs", type=int, default=None, help="Số process (mặc định: số CPU)")
+    ap.add_argument("--poll", type=float, default=1.0, help="Số giây giữa 2 lần quét")
+    ap.add_argument("--settle", type=float, default=2.0, help="Số giây file phải đứng yên")
+    ap.add_argument("--queue-size", type=int, default=None, help="Số file tối đa chờ trong pool")
+    ap.add_argument("--journal", default=None, help="File journal (mặc định trong thư mục output)")
+    ap.add_argument("--once", action="store_true", help="Xử lý các file hiện có rồi thoát")
+    ap.add_argument("--max-failures", type=int, default=WATCH_MAX_FAILURES,
+                    help="Số lần lỗi tối đa của một file trước khi bỏ qua")
+    ap.add_argument("--retry-delay", type=float, default=WATCH_RETRY_DELAY,
+                    help="Số giây chờ trước khi thử lại file lỗi (gấp đôi sau mỗi lần lỗi)")
+    ap.add_argument("--jsonl", action="store_true", help="In mỗi file 1 dòng JSON khi xong")
+    _add_conversion_arguments(ap)
+    args = ap.parse_args(argv)
+
+    out = sys.stdout
+
+    def on_result(result: BatchFileResult) -> None:
+        if args.jsonl:
+            out.write(json.dumps(_result_dict(result), ensure_ascii=False) + "\n")
+            out.flush()
+        elif result.ok:
+            print(f"✅ {result.input_path} → {result.output_path} ({result.seconds:.1f}s)")
+        else:
+            print(f"❌ {result.input_path}: {result.error}")
+
+    redirect = contextlib.redirect_stdout(sys.stderr) if args.jsonl else contextlib.nullcontext()
+    stop = threading.Event()
+    try:
+        with redirect:
+            stats = watch_folder(
+                args.in_dir, args.out_dir, workers=args.jobs, poll_interval=args.poll,
+                settle=args.settle, queue_size=args.queue_size, output_template=args.template,
+                journal_path=args.journal, on_result=on_result, stop_event=stop,
+                once=args.once, quiet=args.jsonl, max_failures=args.max_failures,
+                retry_delay=args.retry_delay, **_conversion_options(args),
+            )
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 0
+    return 1 if stats.files_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())